@@ -1,5 +1,10 @@
+import asyncio
 import logging
-import httpx
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 from livekit.agents import (
     Agent,
@@ -8,44 +13,108 @@ from livekit.agents import (
     JobProcess,
     WorkerOptions,
     cli,
-    function_tool,
-    llm,
+    NOT_GIVEN,
 )
-from livekit.plugins import deepgram, openai, elevenlabs, groq
-from livekit.plugins.turn_detector.multilingual import MultilingualModel
 
 from config import Config
+from audio_cache import GreetingAudioCache
+from availability_cache import availability_cache, next_business_days
+from booking_queue import booking_queue
+from call_log import CallEventWriter, attach_call_log
+from config_cache import AgentConfigCache
+from context_compactor import ContextCompactor
+from endpointing import EndpointingController, endpointing_totals
+from http_client import http_pool, resilience
+from knowledge import knowledge_index
+from load_monitor import ProcessLoadReporter, WorkerLoadMonitor
+from phrase_cache import phrase_cache
+from recorder import CallRecorder, LocalRecordingStorage, recording_key, recording_totals
+from turn_metrics import CallMetrics, MetricsAggregator, MetricsPublisher, MetricsServer, registry
+from resources import TTS_MODEL, TTS_VOICE_SETTINGS, ResourcePool, most_used_voices
+from speculation import AvailabilitySpeculator, speculation_totals
+from tools import load_tools, register_booking_backends, tool_module
+from turn_detection import disable_plugin_inference, start_service
 
 logger = logging.getLogger("truvo-agent")
 logger.setLevel(logging.INFO)
 
 
+config_cache = AgentConfigCache(
+    ttl=Config.CONFIG_CACHE_TTL,
+    stale_ttl=Config.CONFIG_CACHE_STALE_TTL,
+    negative_ttl=Config.CONFIG_CACHE_NEGATIVE_TTL,
+    snapshot_path=Config.CONFIG_CACHE_SNAPSHOT,
+)
+
+greeting_cache = GreetingAudioCache(
+    cache_dir=Config.GREETING_CACHE_DIR,
+    max_bytes=Config.GREETING_CACHE_MAX_MB * 1024 * 1024,
+)
+
+call_log = CallEventWriter(
+    url=f"{Config.NEXT_API_URL}/api/calls/events",
+    spool_dir=Config.CALL_LOG_SPOOL_DIR,
+    max_queue=Config.CALL_LOG_QUEUE_SIZE,
+    batch_size=Config.CALL_LOG_BATCH_SIZE,
+    flush_interval=Config.CALL_LOG_FLUSH_INTERVAL,
+)
+
+# Submitters for bookings queued by this or earlier processes; each backend's tool module loads on first use
+register_booking_backends(booking_queue)
+
+# Call recordings: encoder threads and storage shared by every call in the process
+recording_storage = LocalRecordingStorage(Config.RECORDING_DIR, Config.RECORDING_BASE_URL)
+recording_executor = ThreadPoolExecutor(max_workers=Config.RECORDING_WORKERS, thread_name_prefix="truvo-recording")
+
+# Job processes publish loop lag and sessions; the worker process turns them into its load
+process_load = ProcessLoadReporter(Config.WORKER_LOAD_STATE_DIR)
+metrics_publisher = MetricsPublisher(registry, Config.METRICS_STATE_DIR)
+load_monitor = WorkerLoadMonitor(
+    state_dir=Config.WORKER_LOAD_STATE_DIR,
+    threshold=Config.WORKER_LOAD_THRESHOLD,
+    max_sessions=Config.WORKER_MAX_SESSIONS,
+    max_loop_lag_ms=Config.WORKER_MAX_LOOP_LAG_MS,
+    max_turn_detection_cpu=Config.WORKER_MAX_TURN_DETECTION_CPU,
+    max_memory=Config.WORKER_MAX_MEMORY,
+)
+
+
+def parse_agent_id(room_name: str) -> str | None:
+    """Extract the agent UUID from a room name, or None if it has none."""
+    # Room name format: agent-{uuid}-{timestamp}
+    # UUID contains hyphens, so we need to extract it properly
+    # Example: agent-a719edb0-fae8-44f7-93bb-8b389e09db74-1766296202271
+    if room_name.startswith("agent-"):
+        # Remove "agent-" prefix, then split off the timestamp (last segment)
+        remainder = room_name[6:]  # Remove "agent-"
+        # UUID is 36 chars (8-4-4-4-12 format), timestamp is at the end
+        parts = remainder.rsplit("-", 1)  # Split from right, only once
+        if len(parts) == 2 and len(parts[0]) == 36:  # UUID is 36 chars
+            return parts[0]
+    return None
+
+
+async def _load_agent_config(agent_id: str) -> dict | None:
+    """Load one agent's config from the Next.js dashboard API."""
+    response = await http_pool.request(
+        "fetch_agent_config",
+        "GET",
+        f"{Config.NEXT_API_URL}/api/agents/{agent_id}/config",
+    )
+    if response.status_code == 404:
+        return None  # Unknown agent - cached as a negative entry
+    response.raise_for_status()
+    return response.json()
+
+
 async def fetch_agent_config(room_name: str) -> dict:
-    """Fetch agent configuration from the Next.js dashboard API."""
+    """Fetch agent configuration, served from the per-process cache when possible."""
     try:
-        # Room name format: agent-{uuid}-{timestamp}
-        # UUID contains hyphens, so we need to extract it properly
-        # Example: agent-a719edb0-fae8-44f7-93bb-8b389e09db74-1766296202271
-        if room_name.startswith("agent-"):
-            # Remove "agent-" prefix, then split off the timestamp (last segment)
-            remainder = room_name[6:]  # Remove "agent-"
-            # UUID is 36 chars (8-4-4-4-12 format), timestamp is at the end
-            parts = remainder.rsplit("-", 1)  # Split from right, only once
-            if len(parts) == 2 and len(parts[0]) == 36:  # UUID is 36 chars
-                agent_id = parts[0]
-            else:
-                agent_id = None
-        else:
-            agent_id = None
-
+        agent_id = parse_agent_id(room_name)
         if agent_id:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{Config.NEXT_API_URL}/api/agents/{agent_id}/config",
-                    timeout=5.0
-                )
-                if response.status_code == 200:
-                    return response.json()
+            config = await config_cache.get(agent_id, _load_agent_config)
+            if config is not None:
+                return config
     except Exception as e:
         logger.warning(f"Failed to fetch agent config: {e}. Using defaults.")
 
@@ -57,222 +126,46 @@ async def fetch_agent_config(room_name: str) -> dict:
     }
 
 
-# Define tools as module-level functions with @function_tool decorator
-@function_tool
-async def check_availability(date: str) -> str:
-    """Check available tour times for a specific date. Use this before booking to see what times are open.
-
-    Args:
-        date: The date to check availability for, in YYYY-MM-DD format
-    """
-    if not Config.CAL_API_KEY:
-        return f"Available times for {date}: 10:00 AM, 11:30 AM, 2:00 PM, 3:30 PM. Which time works best for you?"
-
-    try:
-        from datetime import datetime, timedelta
-        async with httpx.AsyncClient() as client:
-            check_date = datetime.strptime(date, "%Y-%m-%d")
-            start_time = check_date.replace(hour=0, minute=0, second=0).isoformat() + "Z"
-            end_time = (check_date + timedelta(days=1)).replace(hour=0, minute=0, second=0).isoformat() + "Z"
-
-            response = await client.get(
-                "https://api.cal.com/v1/availability",
-                params={
-                    "apiKey": Config.CAL_API_KEY,
-                    "eventTypeId": Config.CAL_EVENT_TYPE_ID,
-                    "startTime": start_time,
-                    "endTime": end_time,
-                },
-                timeout=10.0
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                slots = data.get("slots", {}).get(date, [])
-                if not slots:
-                    return f"Sorry, there are no available times on {date}. Would you like to check another date?"
-                times = [datetime.fromisoformat(s["time"].replace("Z", "+00:00")).strftime("%I:%M %p") for s in slots[:6]]
-                times_str = ", ".join(times[:-1]) + f", or {times[-1]}" if len(times) > 1 else times[0]
-                return f"Available times on {date}: {times_str}. Which time works for you?"
-    except Exception:
-        pass
-    return "I'm having trouble checking availability right now. Could you try again in a moment?"
-
-
-@function_tool
-async def book_tour(date: str, time: str, name: str, email: str, phone: str = "") -> str:
-    """Book a property tour appointment. Use this after confirming the date, time, and getting the visitor's information.
-
-    Args:
-        date: Tour date in YYYY-MM-DD format
-        time: Tour time in HH:MM format (24-hour)
-        name: Full name of the person booking the tour
-        email: Email address for confirmation
-        phone: Phone number for the booking (optional)
-    """
-    if not Config.CAL_API_KEY:
-        return f"I've booked your tour for {date} at {time}. You'll receive a confirmation email at {email}. We look forward to showing you around!"
-
+async def report_call_summary(
+    room_name: str, summary: dict, endpointing: dict, recording_url: Optional[str] = None
+) -> None:
+    """Attach the per-call latency and endpointing summaries and the recording to the call record."""
+    body = {"room_name": room_name, "metadata": {"latency": summary, "endpointing": endpointing}}
+    if recording_url:
+        body["recording_url"] = recording_url
     try:
-        async with httpx.AsyncClient() as client:
-            booking_data = {
-                "eventTypeId": int(Config.CAL_EVENT_TYPE_ID),
-                "start": f"{date}T{time}:00",
-                "responses": {
-                    "name": name,
-                    "email": email,
-                    "phone": phone or "",
-                    "notes": "Booked via Truvo AI Assistant"
-                },
-                "timeZone": "America/New_York",
-                "language": "en",
-                "metadata": {"source": "truvo-voice-agent"}
-            }
-
-            response = await client.post(
-                "https://api.cal.com/v1/bookings",
-                params={"apiKey": Config.CAL_API_KEY},
-                json=booking_data,
-                timeout=15.0
-            )
-
-            if response.status_code in [200, 201]:
-                return f"Excellent! I've booked your property tour for {date} at {time}. A confirmation email has been sent to {email}. Is there anything else I can help you with?"
-    except Exception:
-        pass
-    return "I'm having trouble completing the booking right now. Would you like me to try again?"
-
-
-@function_tool
-async def book_demo(name: str, email: str, phone: str = "", preferred_time: str = "") -> str:
-    """Book a Truvo product demo. IMPORTANT: Only call this AFTER you have explicitly asked the caller for their name and email and they have provided real values. Never use placeholder or example values like 'john@example.com'. If you don't have their real email, ask for it first.
-
-    Args:
-        name: The caller's real full name (must be explicitly provided by caller)
-        email: The caller's real email address (must be explicitly provided by caller, never guess)
-        phone: Phone number if provided (optional)
-        preferred_time: Their stated preferred time (optional)
-    """
-    from datetime import datetime, timedelta
-    import os
-
-    # Try Google Calendar first
-    if Config.GOOGLE_SERVICE_ACCOUNT_FILE and Config.GOOGLE_CALENDAR_ID:
-        try:
-            from google.oauth2 import service_account
-            from googleapiclient.discovery import build
-
-            # Get the directory where agent.py is located
-            agent_dir = os.path.dirname(os.path.abspath(__file__))
-            service_account_path = os.path.join(agent_dir, Config.GOOGLE_SERVICE_ACCOUNT_FILE)
-
-            credentials = service_account.Credentials.from_service_account_file(
-                service_account_path,
-                scopes=['https://www.googleapis.com/auth/calendar']
-            )
-            service = build('calendar', 'v3', credentials=credentials)
-
-            # Parse preferred time or default to tomorrow 2pm
-            now = datetime.now()
-            if preferred_time:
-                # Simple parsing - default to tomorrow if we can't parse
-                start_time = (now + timedelta(days=1)).replace(hour=14, minute=0, second=0, microsecond=0)
-                # Try to extract hour if mentioned
-                if "morning" in preferred_time.lower():
-                    start_time = start_time.replace(hour=10)
-                elif "afternoon" in preferred_time.lower():
-                    start_time = start_time.replace(hour=14)
-                elif "3" in preferred_time:
-                    start_time = start_time.replace(hour=15)
-                elif "4" in preferred_time:
-                    start_time = start_time.replace(hour=16)
-                elif "11" in preferred_time:
-                    start_time = start_time.replace(hour=11)
-                elif "10" in preferred_time:
-                    start_time = start_time.replace(hour=10)
-            else:
-                start_time = (now + timedelta(days=1)).replace(hour=14, minute=0, second=0, microsecond=0)
-
-            end_time = start_time + timedelta(minutes=30)
-
-            event = {
-                'summary': f'Truvo Demo - {name}',
-                'description': f'Truvo product demo\n\nName: {name}\nEmail: {email}\nPhone: {phone or "Not provided"}\n\nBooked via Truvo AI receptionist',
-                'start': {
-                    'dateTime': start_time.isoformat(),
-                    'timeZone': 'America/New_York',
-                },
-                'end': {
-                    'dateTime': end_time.isoformat(),
-                    'timeZone': 'America/New_York',
-                },
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'popup', 'minutes': 15},
-                    ],
-                },
-            }
-
-            event = service.events().insert(
-                calendarId=Config.GOOGLE_CALENDAR_ID,
-                body=event,
-            ).execute()
-
-            formatted_time = start_time.strftime("%A at %I:%M %p")
-            return f"You're all set! I've booked your demo for {formatted_time} and sent a calendar invite to {email}. Looking forward to showing you what Truvo can do!"
-
-        except Exception as e:
-            logger.error(f"Google Calendar booking failed: {e}")
-
-    # Fallback - simulate booking
-    time_msg = f" for {preferred_time}" if preferred_time else ""
-    return f"Perfect! I've got you down for a demo{time_msg}. You'll receive a confirmation at {email} shortly. Looking forward to showing you what Truvo can do for your business!"
+        await http_pool.request("call_summary", "PATCH", f"{Config.NEXT_API_URL}/api/calls", json=body)
+    except Exception as e:
+        logger.warning(f"Failed to report call summary: {e}")
 
 
 class TruvoAgent(Agent):
     """Truvo real estate voice agent."""
 
-    def __init__(self, config: dict) -> None:
+    def __init__(self, config: dict, resources: ResourcePool) -> None:
         self._config = config
 
-        # Initialize LLM - OpenAI for better conversation quality
-        logger.info("Using OpenAI LLM (gpt-4o-mini)")
-        self._llm = openai.LLM(
-            model="gpt-4o-mini",
-            temperature=0.7,  # Balanced for coherent yet natural responses
-        )
-
-        # Initialize TTS - low latency model
-        self._tts = elevenlabs.TTS(
-            voice_id=config.get("voice_id", Config.DEFAULT_VOICE_ID),
-            model="eleven_turbo_v2_5",
-            voice_settings=elevenlabs.VoiceSettings(
-                stability=0.5,
-                similarity_boost=0.75,
-                style=0.3,
-                use_speaker_boost=True,
-            ),
+        # Provider clients are shared across sessions in this process
+        self.voice_id = config.get("voice_id", Config.DEFAULT_VOICE_ID)
+        self._llm = resources.llm
+        self._llm_router = resources.llm_router
+        logger.info(f"Routing LLM turns across {[b.name for b in self._llm_router.backends]}, TTS voice {self.voice_id}")
+        self._tts = resources.tts(self.voice_id)
+
+        # Per-call turn timings and phrase cache usage
+        self.call_metrics = CallMetrics(registry)
+        self.phrase_stats = {"opener_hits": 0, "opener_misses": 0, "filler_hits": 0, "tts_chars_saved": 0}
+        self._stt = resources.stt
+
+        # Keeps prompt size flat on long calls; summaries use their own client, outside session metrics
+        self.compactor = ContextCompactor(
+            resources.summarizer_llm,
+            keep_turns=Config.CONTEXT_KEEP_TURNS,
+            token_budget=Config.CONTEXT_TOKEN_BUDGET,
         )
 
-        # Initialize STT with low-latency settings
-        self._stt = deepgram.STT(
-            model="nova-3",
-            language="en",
-            detect_language=False,      # Skip language detection for speed
-            interim_results=True,       # Stream partial results
-            smart_format=True,          # Better formatting
-        )
-
-        # Build tools list based on config
-        tools = []
-        enabled_tools = config.get("tools_enabled", [])
-        if "check_availability" in enabled_tools:
-            tools.append(check_availability)
-        if "book_tour" in enabled_tools:
-            tools.append(book_tour)
-        if "book_demo" in enabled_tools:
-            tools.append(book_demo)
+        # Build tools list based on config; only the enabled tools' modules are imported
+        tools = load_tools(config.get("tools_enabled", []))
 
         super().__init__(
             instructions=config.get("system_prompt", Config.DEFAULT_SYSTEM_PROMPT),
@@ -286,65 +179,276 @@ class TruvoAgent(Agent):
     def greeting(self) -> str:
         return self._config.get("greeting", Config.DEFAULT_GREETING)
 
+    def record_phrase(self, kind: str, clip=None) -> None:
+        self.phrase_stats[kind] += 1
+        if clip is not None:
+            self.phrase_stats["tts_chars_saved"] += len(clip.text)
+
+    async def on_enter(self) -> None:
+        self.session.on("agent_state_changed", self._summarize_between_turns)
+        # The session only listens to the agent's own LLM; relay the other backends' turn metrics
+        for backend in self._llm_router.backends:
+            if backend.client is not self._llm:
+                backend.client.on("metrics_collected", self._forward_llm_metrics)
+
+    async def on_exit(self) -> None:
+        for backend in self._llm_router.backends:
+            if backend.client is not self._llm:
+                backend.client.off("metrics_collected", self._forward_llm_metrics)
+
+    def _forward_llm_metrics(self, metrics) -> None:
+        self._llm.emit("metrics_collected", metrics)  # Picked up by the session like the agent's own
+
+    def _summarize_between_turns(self, ev) -> None:
+        if ev.new_state == "listening":
+            self.compactor.summarize_in_background(self.chat_ctx)
+
+    async def llm_node(self, chat_ctx, tools, model_settings):
+        """Send the compacted history to whichever LLM backend is currently fastest."""
+        async for chunk in self._llm_router.chat(
+            self.compactor.compact(chat_ctx),
+            tools,
+            tool_choice=model_settings.tool_choice if model_settings else NOT_GIVEN,
+            conn_options=self.session.conn_options.llm_conn_options,
+        ):
+            yield chunk
+
+    async def tts_node(self, text, model_settings):
+        """Play a cached opener from memory; only the rest of the reply goes to ElevenLabs."""
+        clip, remainder = await phrase_cache.split_opener(self.voice_id, text)
+        if clip is not None:
+            self.record_phrase("opener_hits", clip)
+            async for frame in clip.frames():
+                yield frame
+        else:
+            self.record_phrase("opener_misses")
+
+        async for frame in Agent.default.tts_node(self, remainder, model_settings):
+            yield frame
+
 
 async def entrypoint(ctx: JobContext):
     """Main entrypoint for the voice agent."""
+    job_started = time.perf_counter()
     logger.info(f"Agent joining room: {ctx.room.name}")
+    process_load.start()
+    process_load.session_started()
+    metrics_publisher.start()
+    resources: ResourcePool = ctx.proc.userdata["resources"]
+    resources.warm_connections()
 
     # Fetch agent configuration from dashboard API
     config = await fetch_agent_config(ctx.room.name)
     logger.info(f"Loaded config - Voice: {config.get('voice_id')}, Tools: {config.get('tools_enabled')}")
     logger.info(f"Greeting: {config.get('greeting')}")
     logger.info(f"System prompt preview: {config.get('system_prompt', '')[:100]}...")
+    logger.info(f"Config cache stats: {config_cache.stats()}")
+
+    # Synthesize the greeting in the background the first time we see it
+    voice_id = config.get("voice_id", Config.DEFAULT_VOICE_ID)
+    greeting = config.get("greeting", Config.DEFAULT_GREETING)
+    greeting_key = GreetingAudioCache.key(greeting, voice_id, TTS_MODEL, TTS_VOICE_SETTINGS)
+    greeting_cache.ensure(greeting_key, greeting, resources.tts(voice_id))
+
+    enabled_tools = config.get("tools_enabled", [])
+    cal_com = None
+    if Config.CAL_API_KEY and "check_availability" in enabled_tools:
+        cal_com = tool_module("check_availability")
+
+    # Load Google credentials and the Calendar client off the event loop
+    if "book_demo" in enabled_tools:
+        asyncio.create_task(tool_module("book_demo").warm())
 
     # Connect to the room
     await ctx.connect()
 
+    # Stream the call to storage as it happens: caller left, agent right
+    recorder = None
+    if Config.RECORDING_ENABLED:
+        recorder = CallRecorder(
+            recording_key(ctx.room.name),
+            recording_storage,
+            recording_executor,
+            sample_rate=Config.RECORDING_SAMPLE_RATE,
+            ring_seconds=Config.RECORDING_RING_SECONDS,
+        )
+        recorder.attach(ctx.room)
+
     # Create the agent
-    agent = TruvoAgent(config)
+    agent = TruvoAgent(config, resources)
+
+    # Warm availability for dates the caller mentions, from interim transcripts, and
+    # for the next business days once they first ask about availability at all
+    speculator = None
+    if cal_com is not None:
+        speculator = AvailabilitySpeculator(
+            availability_cache,
+            Config.CAL_EVENT_TYPE_ID,
+            cal_com.load_slots,
+            intent_dates=next_business_days(Config.AVAILABILITY_PREFETCH_DAYS),
+        )
+
+    # Tunes endpointing and interruption delays to this caller's pauses
+    endpointing = EndpointingController(
+        registry,
+        min_delay=Config.MIN_ENDPOINTING_DELAY,
+        max_delay=Config.MAX_ENDPOINTING_DELAY,
+        min_interruption=Config.MIN_INTERRUPTION_DURATION,
+        adaptive=Config.ENDPOINTING_ADAPTIVE,
+    )
+
+    # livekit runs shutdown callbacks concurrently, so teardown is one ordered callback
+    async def on_shutdown():
+        summary = agent.call_metrics.summary()
+        logger.info(f"Call latency summary: {summary}")
+        logger.info(f"Endpointing this call: {endpointing.stats()}")
+        logger.info(f"Phrase cache this call: {agent.phrase_stats}, process: {phrase_cache.stats()}")
+        logger.info(f"Availability cache stats: {availability_cache.stats()}")
+        if speculator is not None:
+            logger.info(f"Availability speculation this call: {speculator.stats()}")
+        logger.info(f"Context compaction this call: {agent.compactor.stats()}")
+        await agent.compactor.aclose()
+        logger.info(f"Booking queue stats: {booking_queue.stats()}")
+        await call_log.close_room(ctx.room.name)
+        logger.info(f"Call log stats: {call_log.stats()}")
+        recording_url = None
+        if recorder is not None:
+            recording_url = await recorder.aclose()
+            logger.info(f"Recording this call: {recorder.stats()}")
+        await report_call_summary(ctx.room.name, summary, endpointing.stats(), recording_url)
+        logger.info(f"Turn detection stats: {resources.turn_detection_client.stats()}")
+        await fill_phrase_cache(voice_id)
+
+        # Release pooled HTTP connections last
+        logger.info(f"HTTP pool stats: {http_pool.stats()}")
+        logger.info(f"Resilience stats: {resilience.stats()}")
+        await http_pool.aclose()
+        process_load.session_ended()
+        metrics_publisher.publish()  # Final histograms for the worker, before the process exits
+
+    ctx.add_shutdown_callback(on_shutdown)
 
     # Start the agent session with ultra-low-latency settings
     session = AgentSession(
         allow_interruptions=True,
-        min_endpointing_delay=0.15,         # Very fast response after speech ends
-        max_endpointing_delay=2.0,          # Don't wait too long for more speech
-        min_interruption_duration=0.1,      # Quick interruption detection
-        turn_detection=MultilingualModel(), # ML-based turn detection
+        min_endpointing_delay=endpointing.min_delay,            # Fast start; tuned per caller below
+        max_endpointing_delay=endpointing.max_delay,            # Don't wait too long for more speech
+        min_interruption_duration=endpointing.min_interruption,  # Quick interruption detection
+        turn_detection=resources.turn_detector(),  # ML-based turn detection, batched across the worker
         preemptive_generation=True,         # Start generating before turn ends
     )
 
+    agent.call_metrics.attach(session)
+    endpointing.attach(session)
+    attach_call_log(session, ctx.room.name, call_log)
+    if speculator is not None:
+        speculator.attach(session)
+
+    # Time-to-first-greeting: job start until the agent first starts speaking
+    greeting_logged = False
+
+    @session.on("agent_state_changed")
+    def _log_time_to_first_greeting(ev):
+        nonlocal greeting_logged
+        if ev.new_state == "speaking" and not greeting_logged:
+            greeting_logged = True
+            elapsed_ms = (time.perf_counter() - job_started) * 1000
+            logger.info(f"Time to first greeting: {elapsed_ms:.0f} ms")
+
     # Start the session and greet immediately
     await session.start(
         agent=agent,
         room=ctx.room,
     )
 
-    # Greet caller immediately
-    await session.say(agent.greeting)
+    # Greet caller immediately, from cached audio when available (no TTS round trip)
+    cached_greeting = greeting_cache.get(greeting_key)
+    if cached_greeting is not None:
+        await session.say(agent.greeting, audio=cached_greeting.frames())
+    else:
+        await session.say(agent.greeting)
+    logger.info(f"Greeting cache stats: {greeting_cache.stats()}")
+
+    # Load stock openers and tool fillers for this voice from disk; missing ones are built after the call
+    phrase_cache.warm(voice_id, TTS_MODEL, TTS_VOICE_SETTINGS)
+
+
+async def fill_phrase_cache(voice_id: str) -> None:
+    """Synthesize phrase clips still missing for voice_id on a TTS of its own, once the call is over."""
+    tts_engine = ResourcePool.new_tts(voice_id)
+    try:
+        await asyncio.wait_for(
+            phrase_cache.fill(voice_id, tts_engine, TTS_MODEL, TTS_VOICE_SETTINGS), Config.PHRASE_FILL_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        logger.info(f"Phrase cache fill for voice {voice_id} ran out of time; the rest is built after the next call")
+    except Exception as e:
+        logger.warning(f"Phrase cache fill for voice {voice_id} failed: {e}")
+    finally:
+        await tts_engine.aclose()
 
 
 def prewarm(proc: JobProcess):
     """Prewarm function - initialize components before accepting jobs for faster cold start."""
-    # Prewarm STT
-    proc.userdata["deepgram_stt"] = deepgram.STT(
-        model="nova-3",
-        language="en",
-        detect_language=False,
-        interim_results=True,
-    )
-    # Prewarm TTS (establishes connection)
-    proc.userdata["elevenlabs_tts"] = elevenlabs.TTS(
-        voice_id="iRJijZumQA1KkKmi0Dg6",
-        model="eleven_turbo_v2_5",
-    )
-    # Prewarm LLM
-    proc.userdata["llm"] = openai.LLM(model="gpt-4o-mini")
-
+    # Seed agent configs from the last snapshot so the first call skips the dashboard
+    config_cache.load_snapshot()
+
+    # Index product facts so lookup_product_info answers from memory
+    knowledge_index.load(os.path.join(os.path.dirname(os.path.abspath(__file__)), Config.KNOWLEDGE_FILE))
+
+    # Open keep-alive pools for the dashboard and Cal.com before the first call
+    http_pool.start([Config.NEXT_API_URL, Config.CAL_API_URL])
+
+    # Build shared STT/LLM clients and TTS for the most-used voices
+    resources = ResourcePool()
+    resources.build(most_used_voices(config_cache.configs(), Config.TTS_WARM_VOICES))
+    proc.userdata["resources"] = resources
+
+    # Latency histograms and cache/pool stats, published to the worker's /metrics once a job starts
+    registry.add_collector("truvo_config_cache", config_cache.stats)
+    registry.add_collector("truvo_availability_cache", availability_cache.stats)
+    registry.add_collector("truvo_greeting_cache", greeting_cache.stats)
+    registry.add_collector("truvo_phrase_cache", phrase_cache.stats)
+    registry.add_collector("truvo_http_pool", http_pool.stats)
+    registry.add_collector("truvo_resilience", resilience.stats)
+    registry.add_collector("truvo_llm_router", resources.llm_router.stats)
+    registry.add_collector("truvo_speculation", lambda: dict(speculation_totals))
+    registry.add_collector("truvo_endpointing", lambda: dict(endpointing_totals))
+    registry.add_collector("truvo_recording", lambda: dict(recording_totals))
+    registry.add_collector("truvo_call_log", call_log.stats)
+    registry.add_collector("truvo_booking_queue", booking_queue.stats)
+    registry.add_collector("truvo_process_load", process_load.stats)
+    registry.add_collector("truvo_turn_detection", resources.turn_detection_client.stats)
 
 if __name__ == "__main__":
+    serving = sys.argv[1:2] in (["start"], ["dev"])
+    if serving:
+        # Bookings are submitted here, not in the single-use job processes that queue them
+        booking_queue.run_in_thread()
+    if serving and Config.METRICS_PORT:
+        # One scrape target per worker: job processes' histograms folded together, plus worker load
+        worker_metrics = MetricsAggregator(Config.METRICS_STATE_DIR)
+        worker_metrics.add_collector("truvo_worker_load", load_monitor.stats)
+        worker_metrics.add_collector("truvo_booking_queue", booking_queue.stats)
+        MetricsServer(worker_metrics, Config.METRICS_HOST, Config.METRICS_PORT).start()
+    if serving and Config.TURN_SERVICE_ENABLED:
+        # One turn-detection model for every job on this worker, exits with it
+        turn_service = start_service(
+            Config.TURN_SERVICE_SOCKET,
+            max_batch=Config.TURN_BATCH_MAX,
+            max_delay=Config.TURN_BATCH_DELAY_MS / 1000,
+            threads=Config.TURN_SERVICE_THREADS,
+            max_queue=Config.TURN_MAX_QUEUE,
+        )
+        load_monitor.watch_turn_detection(turn_service.pid)
+        disable_plugin_inference()  # The service holds the worker's only copy of the model
     cli.run_app(
         WorkerOptions(
             entrypoint_fnc=entrypoint,
             prewarm_fnc=prewarm,
+            request_fnc=load_monitor.request_fnc,   # Refuse jobs while saturated
+            load_fnc=load_monitor.load,             # Loop lag, turn-detection CPU, sessions, memory
+            load_threshold=Config.WORKER_LOAD_THRESHOLD,
+            drain_timeout=Config.WORKER_DRAIN_TIMEOUT,  # On SIGTERM, let live calls finish
         )
     )
@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import json
+import logging
+import mmap
+import os
+from typing import AsyncIterator, Optional
+
+from livekit import rtc
+from livekit.agents import tts
+
+logger = logging.getLogger("truvo-agent")
+
+FRAME_MS = 20  # Playback frame size for cached audio
+
+
+async def synthesize_pcm(tts_engine: tts.TTS, text: str) -> tuple[bytes, int, int]:
+    """Synthesize text to raw 16-bit PCM. Returns (pcm, sample_rate, num_channels)."""
+    pcm = bytearray()
+    sample_rate, num_channels = tts_engine.sample_rate, tts_engine.num_channels
+    async with tts_engine.synthesize(text) as stream:
+        async for audio in stream:
+            pcm += audio.frame.data.cast("B")
+            sample_rate, num_channels = audio.frame.sample_rate, audio.frame.num_channels
+    return bytes(pcm), sample_rate, num_channels
+
+
+async def pcm_frames(pcm, sample_rate: int, num_channels: int) -> AsyncIterator[rtc.AudioFrame]:
+    """Slice a PCM buffer (bytes, memoryview or mmap) into playback frames."""
+    view = memoryview(pcm)
+    samples_per_frame = sample_rate * FRAME_MS // 1000
+    frame_bytes = samples_per_frame * num_channels * 2
+    for offset in range(0, len(view), frame_bytes):
+        chunk = view[offset:offset + frame_bytes]
+        yield rtc.AudioFrame(
+            data=chunk,
+            sample_rate=sample_rate,
+            num_channels=num_channels,
+            samples_per_channel=len(chunk) // (2 * num_channels),
+        )
+
+
+class CachedAudio:
+    """A cached clip memory-mapped from disk."""
+
+    def __init__(self, pcm_path: str, sample_rate: int, num_channels: int) -> None:
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        with open(pcm_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def frames(self) -> AsyncIterator[rtc.AudioFrame]:
+        # Frames are views into the mmap, so it is released with the last frame
+        return pcm_frames(self._mmap, self.sample_rate, self.num_channels)
+
+
+class GreetingAudioCache:
+    """On-disk cache of synthesized greetings, keyed by text, voice and TTS settings.
+
+    Each entry is a raw PCM file plus a small JSON sidecar. Entries are built
+    in the background the first time a greeting is seen, played back from an
+    mmap on later calls, and evicted least-recently-used under a size cap.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int) -> None:
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._building: dict[str, asyncio.Task] = {}
+        self._counters = {"hits": 0, "misses": 0, "builds": 0, "build_failures": 0, "evictions": 0}
+
+    @staticmethod
+    def key(text: str, voice_id: str, model: str, settings: dict) -> str:
+        payload = json.dumps([text, voice_id, model, settings], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[CachedAudio]:
+        """Open a cached clip for playback, or None on a miss."""
+        pcm_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            audio = CachedAudio(pcm_path, meta["sample_rate"], meta["num_channels"])
+            os.utime(pcm_path)  # Bump recency for LRU eviction
+        except (OSError, ValueError, KeyError):
+            self._counters["misses"] += 1
+            return None
+        self._counters["hits"] += 1
+        return audio
+
+    def has(self, key: str) -> bool:
+        """Whether a complete entry for key is on disk."""
+        return os.path.exists(self._paths(key)[1])
+
+    def ensure(self, key: str, text: str, tts_engine: tts.TTS) -> Optional[asyncio.Task]:
+        """Build the entry in the background if it isn't cached or building.
+
+        Returns the build task to await, or None if the entry is already on disk.
+        """
+        if key in self._building:
+            return self._building[key]
+        if self.has(key):
+            return None
+        task = asyncio.create_task(self._build(key, text, tts_engine))
+        self._building[key] = task
+        task.add_done_callback(lambda _: self._building.pop(key, None))
+        return task
+
+    def stats(self) -> dict:
+        return {**self._counters, "building": len(self._building)}
+
+    async def _build(self, key: str, text: str, tts_engine: tts.TTS) -> None:
+        self._counters["builds"] += 1
+        try:
+            pcm, sample_rate, num_channels = await synthesize_pcm(tts_engine, text)
+            meta = {"sample_rate": sample_rate, "num_channels": num_channels, "text": text}
+            await asyncio.to_thread(self._write, key, pcm, meta)
+            logger.info(f"Cached greeting audio {key[:12]} ({len(pcm)} bytes)")
+        except Exception as e:
+            self._counters["build_failures"] += 1
+            logger.warning(f"Failed to cache greeting audio: {e}")
+
+    def _write(self, key: str, pcm: bytes, meta: dict) -> None:
+        os.makedirs(self._cache_dir, exist_ok=True)
+        pcm_path, meta_path = self._paths(key)
+        # Per-process temp names: several workers may build the same greeting
+        tmp_suffix = f".{os.getpid()}.tmp"
+        with open(pcm_path + tmp_suffix, "wb") as f:
+            f.write(pcm)
+        os.replace(pcm_path + tmp_suffix, pcm_path)
+        # The sidecar is written last, so its presence marks a complete entry
+        with open(meta_path + tmp_suffix, "w") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + tmp_suffix, meta_path)
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for name in os.listdir(self._cache_dir):
+            if name.endswith(".pcm"):
+                try:
+                    stat = os.stat(os.path.join(self._cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name[:-4]))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self._max_bytes:
+                break
+            for path in reversed(self._paths(key)):  # Sidecar first
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            self._counters["evictions"] += 1
+
+    def _paths(self, key: str) -> tuple[str, str]:
+        base = os.path.join(self._cache_dir, key)
+        return f"{base}.pcm", f"{base}.json"
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import time
+from datetime import date as date_cls, datetime, timedelta
+from typing import Awaitable, Callable
+from zoneinfo import ZoneInfo
+
+from config import Config
+
+logger = logging.getLogger("truvo-agent")
+
+SlotLoader = Callable[[str], Awaitable[list[dict]]]
+
+
+class AvailabilityCache:
+    """Short-lived cache of Cal.com slots keyed by (event type, date).
+
+    Concurrent lookups for the same key share one in-flight request, so a
+    speculative prefetch and the LLM's own tool call only hit Cal.com once.
+    Each job runs in its own process, so entries last for one call at most.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self._ttl = ttl
+        self._entries: dict[tuple[str, str], tuple[list[dict], float]] = {}
+        self._inflight: dict[tuple[str, str], asyncio.Task] = {}
+        # In-flight fetches a caller is waiting on; these are never cancelled
+        self._awaited: set[tuple[str, str]] = set()
+        # Bumped on invalidate so a fetch that started before a booking isn't stored
+        self._generations: dict[tuple[str, str], int] = {}
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "fetches": 0,
+            "fetch_failures": 0,
+            "prefetches": 0,
+            "invalidations": 0,
+            "cancelled": 0,
+        }
+
+    async def get_slots(self, event_type_id: str, date: str, loader: SlotLoader) -> list[dict]:
+        """Return the slots for date, from memory when fresh."""
+        key = (event_type_id, date)
+        if self.is_fresh(event_type_id, date):
+            self._counters["hits"] += 1
+            return self._entries[key][0]
+
+        if key in self._inflight:
+            self._counters["coalesced"] += 1
+        else:
+            self._counters["misses"] += 1
+        task = self._fetch(key, loader)
+        self._awaited.add(key)
+        return await asyncio.shield(task)
+
+    def prefetch(self, event_type_id: str, dates: list[str], loader: SlotLoader) -> list[str]:
+        """Warm the cache for dates in the background. Returns the dates a fetch was started for."""
+        started = []
+        for date in dates:
+            key = (event_type_id, date)
+            if self.is_fresh(event_type_id, date):
+                continue
+            if key not in self._inflight:
+                self._counters["prefetches"] += 1
+                self._fetch(key, loader)
+                started.append(date)
+        return started
+
+    def is_fresh(self, event_type_id: str, date: str) -> bool:
+        entry = self._entries.get((event_type_id, date))
+        return entry is not None and time.monotonic() - entry[1] < self._ttl
+
+    def cancel(self, event_type_id: str, date: str) -> bool:
+        """Cancel a background fetch nobody is waiting on (e.g. a wrong speculative guess)."""
+        key = (event_type_id, date)
+        task = self._inflight.get(key)
+        if task is None or task.done() or key in self._awaited:
+            return False
+        task.cancel()
+        del self._inflight[key]  # A lookup arriving now starts a fresh fetch
+        self._counters["cancelled"] += 1
+        return True
+
+    def invalidate(self, event_type_id: str, date: str) -> None:
+        """Drop a date after a booking so the next lookup sees the taken slot."""
+        key = (event_type_id, date)
+        self._entries.pop(key, None)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        self._inflight.pop(key, None)
+        self._awaited.discard(key)
+        self._counters["invalidations"] += 1
+
+    def stats(self) -> dict:
+        return {**self._counters, "entries": len(self._entries), "inflight": len(self._inflight)}
+
+    def _fetch(self, key: tuple[str, str], loader: SlotLoader) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._on_fetch_done(key, t))
+        return task
+
+    def _on_fetch_done(self, key: tuple[str, str], task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._awaited.discard(key)
+        # Prefetches have no awaiter; mark their errors as retrieved
+        if not task.cancelled():
+            task.exception()
+
+    async def _load(self, key: tuple[str, str], loader: SlotLoader) -> list[dict]:
+        self._counters["fetches"] += 1
+        generation = self._generations.get(key, 0)
+        try:
+            slots = await loader(key[1])
+        except Exception as e:
+            self._counters["fetch_failures"] += 1
+            logger.warning(f"Availability fetch failed for {key[1]}: {e}")
+            raise
+
+        if self._generations.get(key, 0) == generation:
+            self._entries[key] = (slots, time.monotonic())
+        return slots
+
+
+def business_today() -> date_cls:
+    """Today where the business is, which near midnight may differ from the worker's date."""
+    return datetime.now(ZoneInfo(Config.BUSINESS_TIMEZONE)).date()
+
+
+def next_business_days(count: int, start: date_cls | None = None) -> list[str]:
+    """The next `count` weekdays from start (inclusive, default today) as YYYY-MM-DD strings."""
+    day = start or business_today()
+    days = []
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+availability_cache = AvailabilityCache(ttl=Config.AVAILABILITY_CACHE_TTL)
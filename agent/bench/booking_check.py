@@ -0,0 +1,94 @@
+"""End-to-end check of the write-behind booking queue against the stub Cal.com.
+
+Each simulated caller asks to book a tour twice, so the LLM calls book_tour
+twice with the same caller and slot. The stub rejects a share of booking POSTs
+with 503, and books another share but answers 504, as if the response was lost
+to a timeout. The queue submits from this process as it would from the worker.
+Once it has drained, the check passes if every caller has exactly one booking
+in the stub: no duplicates and nothing lost.
+
+    python bench/booking_check.py --callers 20 --error-rate 0.3 --lost-rate 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import load_test  # noqa: E402
+import stub_servers  # noqa: E402
+
+
+async def book_twice(index: int, resources) -> None:
+    from livekit.agents import AgentSession
+
+    import agent as agent_module
+
+    room_name = f"agent-{load_test.STUB_AGENT_ID}-{int(time.time() * 1000)}{index}"
+    config = await agent_module.fetch_agent_config(room_name)
+    session = AgentSession()
+    await session.start(agent=agent_module.TruvoAgent(config, resources))
+    try:
+        for _ in range(2):
+            await session.run(user_input=f"Please book the 3 PM tour. I'm caller {index}, caller{index}@example.com.")
+    finally:
+        await session.aclose()
+
+
+async def main(args) -> bool:
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    load_test.configure_env(stub_url)  # Also points BOOKING_QUEUE_DB at a fresh temp file
+    stubs = stub_servers.start_in_subprocess(
+        args.stub_port,
+        {"llm_ttft": 0.05, "llm_token": 0.0, "cal_booking": 0.05},
+        {"cal_booking_error_rate": args.error_rate, "cal_booking_lost_rate": args.lost_rate},
+    )
+    try:
+        await load_test._wait_for_port(args.stub_port)
+
+        import agent as agent_module
+
+        queue = agent_module.booking_queue
+        queue._base_delay = 0.2  # Fast retries for the check
+        queue._poll_interval = 0.2
+        queue.start()  # The worker's job in production
+
+        resources = load_test.BenchResources(stub_url)
+        await asyncio.gather(*(book_twice(i, resources) for i in range(args.callers)))
+
+        deadline = time.monotonic() + args.timeout
+        while time.monotonic() < deadline:
+            counts = await queue.status_counts()
+            if not counts["pending"] + counts["inflight"]:
+                break
+            await asyncio.sleep(0.2)
+        queue_stats = {**queue.stats(), "rows": await queue.status_counts()}
+    finally:
+        with urllib.request.urlopen(f"{stub_url}/_stats") as response:
+            stub_stats = json.load(response)
+        stubs.terminate()
+
+    print(json.dumps({"queue": queue_stats, "stub": stub_stats}, indent=2))
+    ok = (
+        stub_stats["bookings"] == args.callers
+        and stub_stats["duplicate_bookings"] == 0
+        and queue_stats["rows"]["pending"] + queue_stats["rows"]["inflight"] == 0
+        and queue_stats["rows"]["failed"] == 0
+    )
+    print("PASS" if ok else "FAIL")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--callers", type=int, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.3)
+    parser.add_argument("--lost-rate", type=float, default=0.2, help="Booking POSTs that book but answer 504")
+    parser.add_argument("--stub-port", type=int, default=8789)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for the queue to drain")
+    sys.exit(0 if asyncio.run(main(parser.parse_args())) else 1)
@@ -0,0 +1,119 @@
+"""Check of the call log writer against the local stubs when one room is refused.
+
+The stub's /api/calls/events answers 404 for rooms named no-call-row*, as the
+dashboard does for a room whose calls row doesn't exist yet. One such room is
+followed by healthy ones:
+
+  - live: batches recorded for the refused room are dropped and counted, and
+    every healthy room's batches are still delivered, none spooled
+  - replay: with the refused room's spool file oldest, replay drops it and
+    still delivers every healthy room's file behind it
+
+Exits 1 if any check fails.
+
+    python bench/call_log_check.py --rooms 3 --entries 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import load_test  # noqa: E402
+import stub_servers  # noqa: E402
+
+
+def stub_stats(stub_url: str) -> dict:
+    with urllib.request.urlopen(f"{stub_url}/_stats") as response:
+        return json.load(response)
+
+
+async def wait_for(condition, timeout: float = 10.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition() and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.05)
+
+
+async def main(args) -> bool:
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    load_test.configure_env(stub_url)
+    stubs = stub_servers.start_in_subprocess(args.stub_port, {"dashboard": 0.01})
+    results: dict[str, bool] = {}
+
+    def check(name: str, ok: bool, detail) -> None:
+        results[name] = ok
+        print(f"{'PASS' if ok else 'FAIL'}  {name}: {detail}")
+
+    try:
+        await load_test._wait_for_port(args.stub_port)
+
+        from call_log import CallEventWriter
+        from http_client import http_pool
+
+        url = f"{stub_url}/api/calls/events"
+        rooms = ["no-call-row-live"] + [f"live-{i}" for i in range(args.rooms)]
+        healthy = args.rooms * args.entries
+
+        # Live: one refused room ahead of healthy ones in the queue
+        writer = CallEventWriter(url, tempfile.mkdtemp(prefix="truvo-call-log-"), flush_interval=0.1)
+        for room_name in rooms:
+            for i in range(args.entries):
+                writer.record(room_name, "transcript", {"role": "user", "text": f"line {i}"})
+        await wait_for(lambda: writer.stats()["queued"] == 0 and writer.stats()["sent"] >= healthy)
+        stats = writer.stats()
+        received = stub_stats(stub_url)["call_events"]
+        check(
+            "live refused room dropped",
+            stats["dropped"] == args.entries and stats["rejected_batches"] == 1,
+            {k: stats[k] for k in ("dropped", "rejected_batches", "send_failures")},
+        )
+        check(
+            "live healthy rooms delivered",
+            stats["sent"] == healthy and stats["spool_files"] == 0
+            and all(received.get(room) == args.entries for room in rooms[1:]),
+            f"sent {stats['sent']}, spool files {stats['spool_files']}, stub saw {received}",
+        )
+        await writer.aclose()
+
+        # Replay: the refused room's spool file is the oldest
+        spool_dir = tempfile.mkdtemp(prefix="truvo-call-log-")
+        rooms = ["no-call-row-spooled"] + [f"spooled-{i}" for i in range(args.rooms)]
+        spooler = CallEventWriter(url, spool_dir)
+        for room_name in rooms:
+            spooler._spool(room_name, [{"seq": i + 1, "kind": "transcript", "role": "user", "text": f"line {i}"}
+                                       for i in range(args.entries)])
+        writer = CallEventWriter(url, spool_dir, flush_interval=0.1)
+        writer.record("replay-trigger", "transcript", {"role": "user", "text": "hello"})  # Starts the flusher
+        await wait_for(lambda: writer.stats()["spool_files"] == 0 and writer.stats()["replayed"] >= healthy)
+        stats = writer.stats()
+        received = stub_stats(stub_url)["call_events"]
+        check(
+            "replay past refused file",
+            stats["replayed"] == healthy and stats["spool_files"] == 0 and stats["dropped"] == args.entries
+            and all(received.get(room) == args.entries for room in rooms[1:]),
+            f"replayed {stats['replayed']}, dropped {stats['dropped']}, spool files {stats['spool_files']}, "
+            f"stub saw {received}",
+        )
+        await writer.aclose()
+        await http_pool.aclose()
+    finally:
+        stubs.terminate()
+
+    ok = all(results.values())
+    print("PASS" if ok else "FAIL")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=3, help="Healthy rooms behind the refused one")
+    parser.add_argument("--entries", type=int, default=5, help="Entries recorded per room")
+    parser.add_argument("--stub-port", type=int, default=8792)
+    sys.exit(0 if asyncio.run(main(parser.parse_args())) else 1)
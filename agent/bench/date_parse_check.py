@@ -0,0 +1,66 @@
+"""Check of the transcript date parser that drives availability speculation.
+
+Each case is a transcript fragment and the dates parse_dates should resolve it
+to, from a fixed today (Saturday 2026-10-17). Covers ordinals that are dates on
+their own ("the 14th") and ordinal words that aren't ("on the first available
+slot"), next to the formats the speculator already relied on.
+
+Exits 1 if any case fails.
+
+    python bench/date_parse_check.py
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from speculation import parse_dates  # noqa: E402
+
+TODAY = date(2026, 10, 17)
+
+CASES = [
+    # Bare "the Nth" is a day of this month, or next month once it has passed
+    ("the 14th", ["2026-11-14"]),
+    ("is the 14th open", ["2026-11-14"]),
+    ("on the 20th", ["2026-10-20"]),
+    ("the 3rd, 4th and 5th", ["2026-11-03", "2026-11-04", "2026-11-05"]),
+    # Ordinal words only with a month or "of the month" after them
+    ("on the first available slot", []),
+    ("i'm the first caller today", ["2026-10-17"]),
+    ("the first available slot on friday", ["2026-10-23"]),
+    ("the first of the month", ["2026-11-01"]),
+    ("the second or third of the month", ["2026-11-02", "2026-11-03"]),
+    ("the first in november", ["2026-11-01"]),
+    # Formats the speculator already handled
+    ("the 14th of may", ["2027-05-14"]),
+    ("november 3rd", ["2026-11-03"]),
+    ("next tuesday", ["2026-10-20", "2026-10-27"]),
+    ("on 3/4", ["2027-03-04"]),
+    ("3/4 of the way", []),
+    ("14th", []),
+]
+
+
+def main(args) -> bool:
+    results = []
+    for text, expected in CASES:
+        got = parse_dates(text, TODAY)
+        ok = got == expected
+        results.append(ok)
+        if args.verbose or not ok:
+            print(f"{'PASS' if ok else 'FAIL'}  {text!r}: {got}" + ("" if ok else f", expected {expected}"))
+
+    ok = all(results)
+    print(f"{sum(results)}/{len(results)} cases")
+    print("PASS" if ok else "FAIL")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="Print passing cases too")
+    sys.exit(0 if main(parser.parse_args()) else 1)
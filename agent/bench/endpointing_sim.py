@@ -0,0 +1,158 @@
+"""Simulated callers against fixed and adaptive endpointing.
+
+Drives EndpointingController with the session events a real call produces,
+on a simulated clock. Each caller turn is a few stretches of speech separated
+by pauses drawn from the caller's profile (fast, average or slow talker).
+The agent replies once the silence reaches the endpointing delay in force:
+min_delay when the turn detector thinks the caller is done, max_delay when
+it doesn't. If that happens in the middle of a turn and the caller keeps
+talking, the reply was a cut-off and gets regenerated.
+
+Reports, per profile and mode, the response gap at real turn ends
+(p50/p95, including --pipeline seconds for STT/LLM/TTS) and cut-offs per
+100 turns.
+
+    python bench/endpointing_sim.py --calls 200 --turns 12
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import load_test  # noqa: E402
+from config import Config  # noqa: E402
+from endpointing import EndpointingController  # noqa: E402
+from turn_metrics import MetricsRegistry, percentile  # noqa: E402
+
+# Median pause within a turn (s) and its spread (lognormal sigma)
+PROFILES = {"fast": (0.22, 0.35), "average": (0.45, 0.45), "slow": (0.85, 0.4)}
+
+
+class SimSession:
+    """Just enough of AgentSession for the controller: events, options, update_options."""
+
+    def __init__(self, min_delay: float, max_delay: float, min_interruption: float) -> None:
+        self._handlers: dict[str, list] = {}
+        self.endpointing = {"min_delay": min_delay, "max_delay": max_delay}
+        self.options = SimpleNamespace(interruption={"min_duration": min_interruption})
+
+    def on(self, event: str, handler) -> None:
+        self._handlers.setdefault(event, []).append(handler)
+
+    def update_options(self, *, endpointing_opts: dict) -> None:
+        self.endpointing.update(endpointing_opts)
+
+    def emit(self, event: str, at: float, **fields) -> None:
+        for handler in self._handlers.get(event, []):
+            handler(SimpleNamespace(created_at=at, **fields))
+
+
+def simulate_call(profile: str, adaptive: bool, args, rng: random.Random) -> dict:
+    median, sigma = PROFILES[profile]
+    controller = EndpointingController(
+        MetricsRegistry(),
+        min_delay=Config.MIN_ENDPOINTING_DELAY,
+        max_delay=Config.MAX_ENDPOINTING_DELAY,
+        min_interruption=Config.MIN_INTERRUPTION_DURATION,
+        adaptive=adaptive,
+    )
+    session = SimSession(controller.min_delay, controller.max_delay, controller.min_interruption)
+    controller.attach(session)
+
+    def user(old: str, new: str, at: float) -> None:
+        session.emit("user_state_changed", at, old_state=old, new_state=new)
+
+    def agent(new: str, at: float) -> None:
+        session.emit("agent_state_changed", at, old_state="", new_state=new)
+
+    def delay(detector_done: bool) -> float:
+        return session.endpointing["min_delay" if detector_done else "max_delay"]
+
+    now, gaps, cutoffs = 0.0, [], 0
+    for _ in range(args.turns):
+        user("listening", "speaking", now)
+        for _ in range(rng.randint(0, 3)):  # Pauses inside the turn
+            now += rng.uniform(0.6, 2.5)
+            user("speaking", "listening", now)
+            pause = median * math.exp(rng.gauss(0, sigma))
+            wait = delay(rng.random() < args.detector_miss)
+            if pause > wait:
+                agent("speaking", now + wait)  # Replied mid-turn
+                cutoffs += 1
+            now += pause
+            user("listening", "speaking", now)
+            agent("listening", now)
+        now += rng.uniform(0.6, 2.5)
+        user("speaking", "listening", now)
+        gap = delay(rng.random() < args.detector_hit) + args.pipeline
+        gaps.append(gap)
+        now += gap
+        agent("speaking", now)
+        if rng.random() < args.false_interruptions:
+            session.emit("agent_false_interruption", now + 0.5, resumed=True)
+        now += rng.uniform(1.5, 4.0)
+        agent("listening", now)
+        now += rng.uniform(0.2, 0.8)
+    return {"gaps": gaps, "cutoffs": cutoffs, "stats": controller.stats()}
+
+
+def main(args) -> None:
+    rng = random.Random(args.seed)
+    results = []
+    for profile in PROFILES:
+        for adaptive in (False, True):
+            gaps, cutoffs = [], 0
+            for _ in range(args.calls):
+                call = simulate_call(profile, adaptive, args, rng)
+                gaps.extend(call["gaps"])
+                cutoffs += call["cutoffs"]
+            row = {
+                "profile": profile,
+                "mode": "adaptive" if adaptive else "fixed",
+                "gap_p50_ms": round(percentile(gaps, 50) * 1000),
+                "gap_p95_ms": round(percentile(gaps, 95) * 1000),
+                "gap_mean_ms": round(sum(gaps) / len(gaps) * 1000),
+                "cutoffs_per_100_turns": round(cutoffs / (args.calls * args.turns) * 100, 1),
+                "last_call": call["stats"],
+            }
+            results.append(row)
+            print(
+                f"{profile:>8} {row['mode']:>8}: response gap p50/p95 {row['gap_p50_ms']}/{row['gap_p95_ms']} ms "
+                f"(mean {row['gap_mean_ms']}), {row['cutoffs_per_100_turns']} cut-offs per 100 turns"
+            )
+
+    report = {
+        "commit": load_test.git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "args": {k: v for k, v in vars(args).items() if k != "out"},
+        "results": results,
+    }
+    out = args.out or os.path.join(BENCH_DIR, "results", f"endpointing_{report['commit']}_{int(time.time())}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200, help="Calls per profile and mode")
+    parser.add_argument("--turns", type=int, default=12, help="Caller turns per call")
+    parser.add_argument("--pipeline", type=float, default=0.6, help="STT+LLM+TTS seconds after the endpoint")
+    parser.add_argument("--detector-hit", type=float, default=0.85,
+                        help="Chance the turn detector calls a real turn end done")
+    parser.add_argument("--detector-miss", type=float, default=0.3,
+                        help="Chance the turn detector calls a mid-turn pause done")
+    parser.add_argument("--false-interruptions", type=float, default=0.05, help="Chance per agent reply")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", help="Result JSON path (default: bench/results/endpointing_<commit>_<time>.json)")
+    main(parser.parse_args())
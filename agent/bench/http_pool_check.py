@@ -0,0 +1,142 @@
+"""Check of the shared HTTP client pool against the local stubs.
+
+  - startup: http_pool.start() opens one pool per configured host before any
+    request is made
+  - reuse: sequential requests to one host share one connection, and a
+    concurrent burst opens no more than the per-host limit; counted both in
+    the pool's stats and by the stub, which sees each new TCP connection
+  - per-tool timeouts: with the stub slowed past a tool's read timeout, that
+    tool's request fails within the timeout while a tool with a longer one
+    still succeeds against the same host
+  - shutdown: aclose() closes every client and empties the stats; the next
+    request opens a fresh pool
+
+Exits 1 if any check fails.
+
+    python bench/http_pool_check.py --requests 20 --burst 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import load_test  # noqa: E402
+import stub_servers  # noqa: E402
+
+
+def stub_stats(stub_url: str) -> dict:
+    with urllib.request.urlopen(f"{stub_url}/_stats") as response:
+        return json.load(response)
+
+
+def set_latency(stub_url: str, **latency: float) -> None:
+    request = urllib.request.Request(
+        f"{stub_url}/_latency", data=json.dumps(latency).encode(), headers={"Content-Type": "application/json"}
+    )
+    urllib.request.urlopen(request).close()
+
+
+async def main(args) -> bool:
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    load_test.configure_env(stub_url)
+    os.environ["HEDGING_ENABLED"] = "false"  # A hedge would open a second connection on purpose
+    stubs = stub_servers.start_in_subprocess(args.stub_port, {"dashboard": 0.01, "cal_booking": 0.01})
+    results: dict[str, bool] = {}
+
+    def check(name: str, ok: bool, detail) -> None:
+        results[name] = ok
+        print(f"{'PASS' if ok else 'FAIL'}  {name}: {detail}")
+
+    try:
+        await load_test._wait_for_port(args.stub_port)
+
+        from http_client import TOOL_TIMEOUTS, HttpClientPool, http_pool
+
+        config_url = f"{stub_url}/api/agents/{load_test.STUB_AGENT_ID}/config"
+
+        # Startup
+        http_pool.start([stub_url, ""])
+        stats = http_pool.stats()
+        check("startup", list(stats) == [stub_url] and stats[stub_url]["connections"] == 0, stats)
+
+        # Reuse: one connection for sequential requests, at most the limit for a burst
+        before = stub_stats(stub_url)["connections"]
+        for _ in range(args.requests):
+            response = await http_pool.request("fetch_agent_config", "GET", config_url)
+            response.raise_for_status()
+        opened = stub_stats(stub_url)["connections"] - before
+        check("sequential reuse", opened == 1, f"{args.requests} requests over {opened} connection(s)")
+
+        set_latency(stub_url, dashboard=0.2)
+        before = stub_stats(stub_url)["connections"]
+        responses = await asyncio.gather(
+            *(http_pool.request("fetch_agent_config", "GET", config_url) for _ in range(args.burst))
+        )
+        opened = stub_stats(stub_url)["connections"] - before
+        limit = http_pool.stats()[stub_url]["max_connections"]
+        check(
+            "burst bounded by pool limit",
+            all(r.status_code == 200 for r in responses) and opened <= limit,
+            f"{args.burst} concurrent requests over {opened} new connection(s), limit {limit}",
+        )
+
+        # Per-tool timeouts, without the latency budgets so only the timeout applies
+        bare = HttpClientPool(resilience=None)
+        read_timeout = TOOL_TIMEOUTS["call_events"].read
+        set_latency(stub_url, dashboard=read_timeout + 1, cal_booking=read_timeout + 1)
+        started = time.perf_counter()
+        try:
+            await bare.request("call_events", "POST", f"{stub_url}/api/calls/events", json={"events": []})
+            check("short tool times out", False, "request completed")
+        except Exception as e:
+            elapsed = time.perf_counter() - started
+            check(
+                "short tool times out",
+                type(e).__name__ == "ReadTimeout" and read_timeout <= elapsed < read_timeout + 0.5,
+                f"{type(e).__name__} after {elapsed:.2f} s (timeout {read_timeout} s)",
+            )
+        started = time.perf_counter()
+        response = await bare.request(
+            "book_tour", "POST", f"{stub_url}/v1/bookings", json={"start": "2030-01-07T15:00:00"}
+        )
+        elapsed = time.perf_counter() - started
+        check(
+            "longer tool waits",
+            response.status_code == 201,
+            f"book_tour answered {response.status_code} after {elapsed:.2f} s "
+            f"(timeout {TOOL_TIMEOUTS['book_tour'].read} s)",
+        )
+        await bare.aclose()
+        set_latency(stub_url, dashboard=0.01, cal_booking=0.01)
+
+        # Shutdown, then a request after it
+        clients = [http_pool.client(stub_url)]
+        await http_pool.aclose()
+        check("shutdown", http_pool.stats() == {} and all(c.is_closed for c in clients), http_pool.stats())
+        response = await http_pool.request("fetch_agent_config", "GET", config_url)
+        reopened = http_pool.client(stub_url)
+        check("request after shutdown", response.status_code == 200 and reopened is not clients[0],
+              f"{response.status_code} on a new client")
+        await http_pool.aclose()
+    finally:
+        stubs.terminate()
+
+    ok = all(results.values())
+    print("PASS" if ok else "FAIL")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20, help="Sequential requests that should share a connection")
+    parser.add_argument("--burst", type=int, default=50, help="Concurrent requests in the burst")
+    parser.add_argument("--stub-port", type=int, default=8791)
+    sys.exit(0 if asyncio.run(main(parser.parse_args())) else 1)
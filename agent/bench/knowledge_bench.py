@@ -0,0 +1,109 @@
+"""Benchmark for the product knowledge index behind lookup_product_info.
+
+Reports index build time, per-lookup latency percentiles over a set of
+caller-style questions, and the prompt tokens saved per LLM request by giving
+the agent the lookup tool instead of pasting every product fact into the
+system prompt. Tokens are counted with tiktoken (o200k_base, gpt-4o-mini's
+encoding) when it is installed, otherwise estimated at 4 characters per token.
+
+    python bench/knowledge_bench.py [--iterations 2000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AGENT_DIR)
+os.environ.setdefault("METRICS_PORT", "0")
+
+from config import Config  # noqa: E402
+from knowledge import KnowledgeIndex, load_snippets  # noqa: E402
+
+QUERIES = [
+    "Do you integrate with Yardi?",
+    "does it work with salesforce or hubspot",
+    "what's your phone number",
+    "how do I contact you by email",
+    "property management leasing",
+    "can it handle maintenance requests",
+    "do you answer calls 24/7",
+    "SMS and email support",
+    "vendor dispatch",
+    "how much does it cost",
+    "investment firms deal pipeline",
+    "google calendar outlook scheduling",
+]
+
+
+def token_counter():
+    try:
+        import tiktoken
+    except ImportError:
+        return (lambda text: max(1, len(text) // 4)), "estimated (chars/4)"
+    encoding = tiktoken.get_encoding("o200k_base")
+    return (lambda text: len(encoding.encode(text))), "tiktoken o200k_base"
+
+
+def percentile_us(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))] * 1e6, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000, help="Lookups per query")
+    parser.add_argument("--out", help="Optional JSON results path")
+    args = parser.parse_args()
+
+    path = os.path.join(AGENT_DIR, Config.KNOWLEDGE_FILE)
+    started = time.perf_counter()
+    index = KnowledgeIndex()
+    index.load(path)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    timings = []
+    for _ in range(args.iterations):
+        for query in QUERIES:
+            t = time.perf_counter()
+            index.search(query, k=Config.KNOWLEDGE_TOP_K)
+            timings.append(time.perf_counter() - t)
+
+    # Prompt cost: facts pasted into every request vs. the tool schema plus results on demand
+    from livekit.agents.llm import utils
+
+    from tools.product import lookup_product_info
+
+    count, method = token_counter()
+    facts = "\n".join(f"- {snippet.text}" for snippet in load_snippets(path))
+    pasted_prompt = f"{Config.DEFAULT_SYSTEM_PROMPT}\n\nPRODUCT FACTS:\n{facts}"
+    tool_schema = json.dumps(utils.build_legacy_openai_schema(lookup_product_info))
+    result_tokens = [
+        count("\n".join(f"- {s.text}" for _, s in index.search(q, k=Config.KNOWLEDGE_TOP_K))) for q in QUERIES
+    ]
+
+    report = {
+        "index": index.stats(),
+        "build_ms": round(build_ms, 2),
+        "lookup_us": {f"p{p}": percentile_us(timings, p) for p in (50, 95, 99)},
+        "tokens": {
+            "method": method,
+            "system_prompt_with_facts": count(pasted_prompt),
+            "system_prompt_plus_tool_schema": count(Config.DEFAULT_SYSTEM_PROMPT) + count(tool_schema),
+            "lookup_result_avg": round(sum(result_tokens) / len(result_tokens), 1),
+        },
+    }
+    report["tokens"]["saved_per_request"] = (
+        report["tokens"]["system_prompt_with_facts"] - report["tokens"]["system_prompt_plus_tool_schema"]
+    )
+
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
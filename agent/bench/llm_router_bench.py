@@ -0,0 +1,151 @@
+"""Checks the LLM router against two stub LLM servers with injected latency.
+
+Two stub servers stand in for two providers. The benchmark runs a series of
+phases, changing each stub's time-to-first-token and error rate between them,
+and reports per phase which backend the router picked, the TTFT callers saw
+(p50/p95) and the router's own EWMA estimates:
+
+  steady      A fast, B slow            -> turns should go to A
+  a_degrades  A slows past B            -> routing should move to B
+  a_fails     A answers 503             -> failover to B, A marked unhealthy
+  recovered   both healthy, A fast      -> A wins back once its cooldown ends
+  race        racing on, A fast         -> both dispatched, A wins the race
+
+    python bench/llm_router_bench.py [--turns 40]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sys
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+os.environ.setdefault("METRICS_PORT", "0")
+
+import load_test  # noqa: E402
+import stub_servers  # noqa: E402
+
+PHASES = [
+    ("steady", {"a": 0.15, "b": 0.40}, {}, False),
+    ("a_degrades", {"a": 0.80, "b": 0.40}, {}, False),
+    ("a_fails", {"a": 0.15, "b": 0.40}, {"a": 1.0}, False),
+    ("recovered", {"a": 0.15, "b": 0.40}, {"a": 0.0}, False),
+    ("race", {"a": 0.15, "b": 0.40}, {}, True),
+]
+
+
+def _post(url: str, body: dict) -> None:
+    request = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"})
+    urllib.request.urlopen(request).read()
+
+
+async def run_turn(router) -> tuple[float, str]:
+    """One turn; returns the caller-seen TTFT and the backend that served it."""
+    from livekit.agents import APIConnectOptions, llm
+
+    ctx = llm.ChatContext()
+    ctx.add_message(role="user", content="Hi, what apartment sizes do you have?")
+    before = dict(router.stats()["routed"])
+    started = time.perf_counter()
+    ttft = None
+    # No in-client retries, so failures reach the router straight away
+    turn = router.chat(ctx, [], conn_options=APIConnectOptions(max_retry=0, timeout=5.0))
+    async with contextlib.aclosing(turn):
+        async for _ in turn:
+            if ttft is None:
+                ttft = time.perf_counter() - started
+    after = router.stats()["routed"]
+    return ttft, next(name for name, n in after.items() if n != before.get(name, 0))
+
+
+def stub_stats(port: int) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stats") as response:
+        return json.load(response)
+
+
+async def wait_for_idle(ports, timeout: float = 5.0) -> None:
+    """Let the stubs finish streams the router dropped (race losers), so terminating them is quiet."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if all(stub_stats(port)["llm_inflight"] == 0 for port in ports):
+            return
+        await asyncio.sleep(0.05)
+
+
+def pct(values: list[float], p: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))] * 1000, 1)
+
+
+async def main(args) -> None:
+    from livekit.plugins import openai
+
+    from llm_router import LLMRouter
+
+    logging.getLogger("livekit.agents").setLevel(logging.CRITICAL)  # Expected 503s in the failure phase
+    logging.getLogger("truvo-agent").setLevel(logging.ERROR)
+
+    ports = {"a": args.port, "b": args.port + 1}
+    stubs = [stub_servers.start_in_subprocess(port, {"llm_token": 0.0}) for port in ports.values()]
+    clients = {
+        name: openai.LLM(model="gpt-4o-mini", base_url=f"http://127.0.0.1:{port}/v1", api_key="stub")
+        for name, port in ports.items()
+    }
+    try:
+        for port in ports.values():
+            await load_test._wait_for_port(port)
+
+        for client in clients.values():
+            client.prewarm()  # As ResourcePool.warm_connections does in the worker
+        router = LLMRouter(
+            list(clients.items()), first_token_timeout=2.0, cooldown=args.cooldown, stale_after=args.cooldown
+        )
+
+        results = []
+        for name, ttft, faults, race in PHASES:
+            for backend, port in ports.items():
+                _post(f"http://127.0.0.1:{port}/_latency", {"llm_ttft": ttft[backend]})
+                _post(f"http://127.0.0.1:{port}/_faults", {"llm_error_rate": faults.get(backend, 0.0)})
+            if name == "recovered":
+                await asyncio.sleep(args.cooldown)
+            router._race = race
+
+            ttfts, routed = [], {"a": 0, "b": 0}
+            for _ in range(args.turns):
+                seconds, backend = await run_turn(router)
+                ttfts.append(seconds)
+                routed[backend] += 1
+            stats = router.stats()
+            results.append({
+                "phase": name,
+                "routed": routed,
+                "ttft_ms_p50": pct(ttfts, 50),
+                "ttft_ms_p95": pct(ttfts, 95),
+                "ewma_ttft_ms": stats["ttft_ms"],
+                "error_rate": stats["error_rate"],
+                "healthy": stats["healthy"],
+            })
+            print(json.dumps(results[-1]))
+
+        print(json.dumps({"router": router.stats()}, indent=2))
+    finally:
+        for client in clients.values():
+            await client.aclose()
+        await wait_for_idle(ports.values())
+        for proc in stubs:
+            proc.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40, help="Turns per phase")
+    parser.add_argument("--port", type=int, default=8791, help="First stub port; the second uses port + 1")
+    parser.add_argument("--cooldown", type=float, default=3.0, help="Unhealthy cooldown and estimate expiry, shortened for the bench")
+    asyncio.run(main(parser.parse_args()))
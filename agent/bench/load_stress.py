@@ -0,0 +1,192 @@
+"""Multi-session stress test for the worker load monitor and its thresholds.
+
+Ramps concurrent text-mode sessions (see load_test.py) spread over several
+job processes, the way the LiveKit worker runs them. Each job process
+publishes its loop lag and session count through ProcessLoadReporter while the
+parent runs WorkerLoadMonitor over them, exactly as the worker does. Each
+level reports the monitor's load and components next to the turn latency
+callers saw.
+
+The check passes if the monitor crosses WORKER_LOAD_THRESHOLD at or before
+the first level where turn p95 degrades by more than --degrade over the
+lightest level, i.e. the worker would have stopped taking calls before they
+got slow.
+
+    python bench/load_stress.py --levels 4,8,16,32 --procs 4 --turn-detector-ms 30
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import load_test  # noqa: E402
+import stub_servers  # noqa: E402
+
+
+def job_process(sessions: int, args, stub_url: str, state_dir: str, ready, go, results) -> None:
+    """One job process: warm up, wait for the start signal, then run its share of sessions."""
+    load_test.configure_env(stub_url)
+    os.environ["WORKER_LOAD_STATE_DIR"] = state_dir
+    asyncio.run(_job_main(sessions, args, stub_url, ready, go, results))
+
+
+async def _job_main(sessions: int, args, stub_url: str, ready, go, results) -> None:
+    import agent as agent_module
+
+    logging.getLogger("livekit.agents").setLevel(logging.ERROR)
+    logging.getLogger("truvo-agent").setLevel(logging.ERROR)  # Overload fallbacks are expected at high levels
+    resources = load_test.BenchResources(stub_url)
+    await load_test.simulate_call(-1, args, resources, [], {})  # Warm-up, not measured
+    agent_module.process_load.start()
+    ready.release()
+    await asyncio.to_thread(go.wait)
+
+    turn_times: list[float] = []
+
+    async def call(index: int) -> None:
+        agent_module.process_load.session_started()
+        try:
+            await load_test.simulate_call(index, args, resources, turn_times, {})
+        finally:
+            agent_module.process_load.session_ended()
+
+    outcomes = await asyncio.gather(*(call(i) for i in range(sessions)), return_exceptions=True)
+    results.put({"turn_times": turn_times, "failed": sum(isinstance(o, BaseException) for o in outcomes)})
+
+
+def run_level(total: int, args, stub_url: str, monitor, state_dir: str) -> dict:
+    from turn_metrics import percentile
+
+    ctx = multiprocessing.get_context("spawn")
+    procs = min(args.procs, total)
+    shares = [total // procs + (1 if i < total % procs else 0) for i in range(procs)]
+    ready, go, results = ctx.Semaphore(0), ctx.Event(), ctx.Queue()
+    workers = [
+        ctx.Process(target=job_process, args=(share, args, stub_url, state_dir, ready, go, results), daemon=True)
+        for share in shares
+    ]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.acquire()
+
+    samples: list[tuple[float, dict]] = []
+    done = threading.Event()
+
+    def sample_load() -> None:
+        while not done.wait(0.5):
+            samples.append((monitor.load(), monitor.components()))
+
+    sampler = threading.Thread(target=sample_load, daemon=True)
+    go.set()
+    sampler.start()
+    outputs = [results.get() for _ in workers]
+    done.set()
+    sampler.join()
+    for worker in workers:
+        worker.join()
+
+    turn_times = [t for out in outputs for t in out["turn_times"]]
+    loads = [load for load, _ in samples] or [0.0]
+    peak_components: dict[str, float] = {}
+    for _, components in samples:
+        for name, value in components.items():
+            peak_components[name] = max(peak_components.get(name, 0.0), value)
+    return {
+        "sessions": total,
+        "procs": procs,
+        "failed_sessions": sum(out["failed"] for out in outputs),
+        "turn_p50_ms": round(percentile(turn_times, 50) * 1000, 1) if turn_times else None,
+        "turn_p95_ms": round(percentile(turn_times, 95) * 1000, 1) if turn_times else None,
+        "load_p95": round(percentile(loads, 95), 3),
+        "load_max": round(max(loads), 3),
+        "peak_components": peak_components,
+    }
+
+
+def main(args) -> bool:
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    state_dir = tempfile.mkdtemp(prefix="truvo-load-")
+    load_test.configure_env(stub_url)
+    os.environ["WORKER_LOAD_STATE_DIR"] = state_dir
+
+    from config import Config
+    from load_monitor import WorkerLoadMonitor
+
+    monitor = WorkerLoadMonitor(
+        state_dir=state_dir,
+        threshold=Config.WORKER_LOAD_THRESHOLD,
+        max_sessions=Config.WORKER_MAX_SESSIONS,
+        max_loop_lag_ms=Config.WORKER_MAX_LOOP_LAG_MS,
+        max_turn_detection_cpu=Config.WORKER_MAX_TURN_DETECTION_CPU,
+        max_memory=Config.WORKER_MAX_MEMORY,
+    )
+    monitor.load()  # Starts the sampling thread
+
+    stubs = stub_servers.start_in_subprocess(args.stub_port, {"llm_ttft": args.llm_ttft, "llm_token": 0.01})
+    try:
+        asyncio.run(load_test._wait_for_port(args.stub_port))
+        levels = []
+        for total in args.levels:
+            level = run_level(total, args, stub_url, monitor, state_dir)
+            levels.append(level)
+            print(
+                f"{total:>4} sessions: turn p50/p95 {level['turn_p50_ms']}/{level['turn_p95_ms']} ms, "
+                f"load p95 {level['load_p95']} (max {level['load_max']}), {level['failed_sessions']} failed, "
+                f"peak {level['peak_components']}"
+            )
+    finally:
+        stubs.terminate()
+
+    baseline = levels[0]["turn_p95_ms"]
+    knee = next(
+        (lvl["sessions"] for lvl in levels
+         if lvl["failed_sessions"] or lvl["turn_p95_ms"] > baseline * (1 + args.degrade)),
+        None,
+    )
+    tripped = next((lvl["sessions"] for lvl in levels if lvl["load_p95"] >= Config.WORKER_LOAD_THRESHOLD), None)
+    ok = knee is None or (tripped is not None and tripped <= knee)
+
+    report = {
+        "commit": load_test.git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "threshold": Config.WORKER_LOAD_THRESHOLD,
+        "args": {k: v for k, v in vars(args).items() if k != "out"},
+        "levels": levels,
+        "degraded_at_sessions": knee,
+        "refused_from_sessions": tripped,
+        "pass": ok,
+    }
+    out = args.out or os.path.join(BENCH_DIR, "results", f"stress_{report['commit']}_{int(time.time())}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Latency degraded at {knee} sessions; monitor refuses from {tripped} sessions")
+    print(("PASS" if ok else "FAIL") + f" - saved results to {out}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=lambda s: [int(x) for x in s.split(",")], default=[4, 8, 16, 32])
+    parser.add_argument("--procs", type=int, default=4, help="Job processes the sessions are spread over")
+    parser.add_argument("--stub-port", type=int, default=8793)
+    parser.add_argument("--llm-ttft", type=float, default=0.35)
+    parser.add_argument("--stt-latency", type=float, default=0.25)
+    parser.add_argument("--tts-ttfb", type=float, default=0.3)
+    parser.add_argument("--think-time", type=float, default=0.5)
+    parser.add_argument("--turn-detector-ms", type=float, default=30.0, help="Loop CPU per end-of-turn decision")
+    parser.add_argument("--degrade", type=float, default=0.5, help="Turn p95 growth that counts as degraded")
+    parser.add_argument("--out", help="Result JSON path (default: bench/results/stress_<commit>_<time>.json)")
+    sys.exit(0 if main(parser.parse_args()) else 1)
@@ -0,0 +1,312 @@
+"""Offline multi-session load test for the agent worker.
+
+Runs TruvoAgent in real AgentSessions inside this one process, the way a job
+process hosts calls, with every external dependency replaced by the local stubs
+in stub_servers.py. Simulated callers follow a short leasing script (chat, an
+availability check, a booking). STT and TTS are modelled as fixed latencies
+around each text turn. The session runs without a room, so no audio is
+synthesized.
+
+For each concurrency level it reports event-loop lag, per-turn latency
+percentiles, per-stage timings from CallMetrics, RSS per session and CPU, and
+writes everything to JSON for comparison across commits:
+
+    python bench/load_test.py --levels 1,5,10,25 --out before.json
+    python bench/load_test.py --levels 1,5,10,25 --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import psutil
+
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, AGENT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stub_servers  # noqa: E402
+
+STUB_AGENT_ID = "a719edb0-fae8-44f7-93bb-8b389e09db74"
+
+CALLER_SCRIPT = [
+    "Hi, I'm looking for a two bedroom apartment.",
+    "Do you have any tour times available tomorrow?",
+    "Great, please book the 3 PM slot. I'm Sam Lee, sam.lee@example.com.",
+    "That's all, thanks!",
+]
+
+
+def configure_env(stub_url: str) -> None:
+    """Point the agent at the stubs. Must run before config.py is imported."""
+    os.environ.update({
+        "NEXT_API_URL": stub_url,
+        "CAL_API_URL": stub_url,
+        "CAL_API_KEY": "stub",
+        "CAL_EVENT_TYPE_ID": "1",
+        "OPENAI_API_KEY": "stub",
+        "METRICS_PORT": "0",
+        "CONFIG_CACHE_SNAPSHOT": "",
+        "GREETING_CACHE_DIR": os.path.join(tempfile.gettempdir(), "truvo-bench-greetings"),
+        "CALL_LOG_SPOOL_DIR": os.path.join(tempfile.gettempdir(), "truvo-bench-call-log"),
+        "BOOKING_QUEUE_DB": os.path.join(tempfile.mkdtemp(prefix="truvo-bench-"), "bookings.db"),
+    })
+
+
+class BenchResources:
+    """ResourcePool stand-in: stub-backed LLM, no audio clients (text-mode sessions)."""
+
+    def __init__(self, base_url: str) -> None:
+        from livekit.plugins import openai
+
+        from llm_router import LLMRouter
+
+        self.llm = openai.LLM(model="gpt-4o-mini", base_url=f"{base_url}/v1", api_key="stub")
+        self.summarizer_llm = openai.LLM(model="gpt-4o-mini", base_url=f"{base_url}/v1", api_key="stub")
+        self.llm_router = LLMRouter([("stub/gpt-4o-mini", self.llm)])
+        self.stt = None
+
+    def tts(self, voice_id: str):
+        return None
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes a sleeping task."""
+
+    def __init__(self, interval: float = 0.05) -> None:
+        self._interval = interval
+        self.samples: list[float] = []
+        self._task = None
+
+    def start(self) -> None:
+        self.samples = []
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self._interval)
+            self.samples.append(max(0.0, loop.time() - started - self._interval))
+
+
+def burn_cpu(ms: float) -> None:
+    """Hold the event loop for ms of CPU, standing in for inline model inference."""
+    deadline = time.perf_counter() + ms / 1000
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def simulate_call(index: int, args, resources, turn_times: list[float], stage_samples: dict) -> None:
+    from livekit.agents import AgentSession
+
+    import agent as agent_module
+
+    # Same per-call setup as entrypoint(), minus the room and audio caches
+    room_name = f"agent-{STUB_AGENT_ID}-{int(time.time() * 1000)}{index}"
+    config = await agent_module.fetch_agent_config(room_name)
+    truvo_agent = agent_module.TruvoAgent(config, resources)
+    session = AgentSession(
+        allow_interruptions=True,
+        min_endpointing_delay=0.15,
+        max_endpointing_delay=2.0,
+        min_interruption_duration=0.1,
+        preemptive_generation=True,
+    )
+    truvo_agent.call_metrics.attach(session)
+    agent_module.attach_call_log(session, room_name, agent_module.call_log)
+    await session.start(agent=truvo_agent)
+
+    try:
+        for utterance in CALLER_SCRIPT:
+            await asyncio.sleep(args.think_time)
+            started = time.perf_counter()
+            await asyncio.sleep(args.stt_latency)  # Final transcript arrives
+            burn_cpu(getattr(args, "turn_detector_ms", 0.0))  # End-of-turn inference on the loop
+            await session.run(user_input=utterance)
+            await asyncio.sleep(args.tts_ttfb)  # First audio out
+            turn_times.append(time.perf_counter() - started)
+    finally:
+        await session.aclose()
+        await agent_module.call_log.close_room(room_name)
+
+    for stage, values in truvo_agent.call_metrics._stages.items():
+        stage_samples.setdefault(stage, []).extend(values)
+
+
+async def run_level(sessions: int, args, resources) -> dict:
+    from turn_metrics import percentile
+
+    proc = psutil.Process()
+    lag = LoopLagMonitor()
+    turn_times: list[float] = []
+    stage_samples: dict[str, list[float]] = {}
+    peak_rss = baseline_rss = proc.memory_info().rss
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            peak_rss = max(peak_rss, proc.memory_info().rss)
+            await asyncio.sleep(0.1)
+
+    cpu_before = proc.cpu_times()
+    wall_started = time.perf_counter()
+    lag.start()
+    rss_task = asyncio.create_task(sample_rss())
+    results = await asyncio.gather(
+        *(simulate_call(i, args, resources, turn_times, stage_samples) for i in range(sessions)),
+        return_exceptions=True,
+    )
+    rss_task.cancel()
+    await lag.stop()
+    wall = time.perf_counter() - wall_started
+    cpu_after = proc.cpu_times()
+
+    failures = [repr(r) for r in results if isinstance(r, BaseException)]
+    cpu_seconds = (cpu_after.user - cpu_before.user) + (cpu_after.system - cpu_before.system)
+
+    def pct(values: list[float]) -> dict:
+        if not values:
+            return {}
+        return {f"p{p}_ms": round(percentile(values, p) * 1000, 1) for p in (50, 95, 99)}
+
+    return {
+        "sessions": sessions,
+        "failed_sessions": len(failures),
+        "errors": failures[:5],
+        "turns": len(turn_times),
+        "wall_seconds": round(wall, 2),
+        "turn_latency": pct(turn_times),
+        "stages": {stage: pct(values) for stage, values in sorted(stage_samples.items())},
+        "loop_lag": {**pct(lag.samples), "max_ms": round(max(lag.samples, default=0) * 1000, 1)},
+        "cpu_percent": round(cpu_seconds / wall * 100, 1),
+        "rss_mb": round(peak_rss / 2**20, 1),
+        "rss_per_session_mb": round((peak_rss - baseline_rss) / 2**20 / sessions, 2),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=AGENT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_comparison(current: dict, baseline: dict) -> None:
+    old_levels = {level["sessions"]: level for level in baseline.get("levels", [])}
+    print(f"\nvs {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    for level in current["levels"]:
+        old = old_levels.get(level["sessions"])
+        if old is None:
+            continue
+        for metric, key in (("turn p95", "turn_latency"), ("loop lag p99", "loop_lag")):
+            field = "p95_ms" if key == "turn_latency" else "p99_ms"
+            new_v, old_v = level[key].get(field), old[key].get(field)
+            if new_v is not None and old_v is not None:
+                print(f"  {level['sessions']:>4} sessions  {metric:<13} {old_v:>8} -> {new_v:>8} ms")
+
+
+async def main(args) -> dict:
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    configure_env(stub_url)
+    stubs = stub_servers.start_in_subprocess(args.stub_port, {
+        "llm_ttft": args.llm_ttft,
+        "llm_token": args.llm_token,
+        "cal_availability": args.cal_latency,
+        "cal_booking": args.cal_latency * 2,
+        "dashboard": args.dashboard_latency,
+    })
+    try:
+        await _wait_for_port(args.stub_port)
+
+        # Import the agent before measuring so module load isn't charged to the first level
+        import agent
+        from http_client import http_pool
+
+        agent.booking_queue.start()  # Submitted by the worker process in production
+
+        logging.getLogger("livekit.agents").setLevel(logging.ERROR)  # Per-session deprecation notices
+
+        resources = BenchResources(stub_url)
+        # One unmeasured call loads the lazily imported parts of livekit and the LLM client
+        await simulate_call(-1, args, resources, [], {})
+
+        levels = []
+        for sessions in args.levels:
+            result = await run_level(sessions, args, resources)
+            levels.append(result)
+            print(
+                f"{sessions:>4} sessions: turn p50/p95 {result['turn_latency'].get('p50_ms')}/"
+                f"{result['turn_latency'].get('p95_ms')} ms, loop lag p99 {result['loop_lag'].get('p99_ms')} ms, "
+                f"cpu {result['cpu_percent']}%, {result['rss_per_session_mb']} MB/session, "
+                f"{result['failed_sessions']} failed"
+            )
+        await http_pool.aclose()
+    finally:
+        stubs.terminate()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "levels": levels,
+    }
+
+
+async def _wait_for_port(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=lambda s: [int(x) for x in s.split(",")], default=[1, 5, 10, 25])
+    parser.add_argument("--stub-port", type=int, default=8787)
+    parser.add_argument("--stt-latency", type=float, default=0.25)
+    parser.add_argument("--tts-ttfb", type=float, default=0.3)
+    parser.add_argument("--llm-ttft", type=float, default=0.35)
+    parser.add_argument("--llm-token", type=float, default=0.015)
+    parser.add_argument("--cal-latency", type=float, default=0.25)
+    parser.add_argument("--dashboard-latency", type=float, default=0.05)
+    parser.add_argument("--turn-detector-ms", type=float, default=0.0, help="Loop CPU per end-of-turn decision")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Caller pause before each utterance")
+    parser.add_argument("--out", help="Result JSON path (default: bench/results/load_<commit>_<time>.json)")
+    parser.add_argument("--compare", help="Earlier result JSON to diff against")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+
+    out = args.out or os.path.join(
+        AGENT_DIR, "bench", "results", f"load_{report['commit']}_{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(report, json.load(f))
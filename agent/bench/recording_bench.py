@@ -0,0 +1,194 @@
+"""Call recorder benchmark: memory against call length, and event-loop cost.
+
+long:   one call, fed --minutes of synthetic audio as fast as the encoder
+        keeps up (simulated clock). RSS is sampled every simulated minute;
+        it should stay flat however long the call runs.
+concurrent: --calls calls in real time for --duration seconds, each pushing
+        10 ms caller frames and bursts of agent speech, the way the room's
+        audio streams do. Reports loop lag p95/max, time spent in push(),
+        RSS per call, encoder CPU and dropped audio.
+
+Recordings are written under a temporary directory and checked to decode to
+the expected length.
+
+    python bench/recording_bench.py --minutes 60 --calls 20 --duration 30
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import av  # noqa: E402
+import numpy as np  # noqa: E402
+import psutil  # noqa: E402
+from livekit import rtc  # noqa: E402
+
+import load_test  # noqa: E402
+from recorder import AGENT, CALLER, CallRecorder, LocalRecordingStorage  # noqa: E402
+from turn_metrics import percentile  # noqa: E402
+
+RATE = 16000
+FRAME = RATE // 100  # 10 ms
+
+
+def tone(index: int, hz: float) -> rtc.AudioFrame:
+    t = (np.arange(FRAME) + index * FRAME) / RATE
+    samples = (np.sin(2 * math.pi * hz * t) * 3000).astype(np.int16)
+    return rtc.AudioFrame(samples.tobytes(), RATE, 1, FRAME)
+
+
+def agent_speaking(index: int) -> bool:
+    return (index // 300) % 2 == 1  # 3 s on, 3 s off
+
+
+def rss_mb() -> float:
+    return psutil.Process().memory_info().rss / 1e6
+
+
+def decoded_seconds(path: str) -> float:
+    with av.open(path) as container:
+        return sum(frame.samples / frame.sample_rate for frame in container.decode(audio=0))  # Opus decodes at 48 kHz
+
+
+async def long_call(args, storage, executor) -> dict:
+    now = [1_000_000.0]
+    recorder = CallRecorder("long/call.ogg", storage, executor, sample_rate=RATE,
+                            chunk_seconds=0.002, clock=lambda: now[0])
+    recorder.start()
+    rss = []
+    frames = int(args.minutes * 60 * 100)
+    caller, agent = tone(0, 220), tone(0, 440)
+    for i in range(frames):
+        now[0] += 0.01
+        recorder.push(CALLER, caller)
+        if agent_speaking(i):
+            recorder.push(AGENT, agent)
+        if i % 100 == 99:  # Each simulated second, let the encoder take the settled audio
+            await asyncio.sleep(0.003)
+            while recorder.stats()["seconds"] < (i + 1) / 100 - 5:
+                await asyncio.sleep(0.002)  # Keep within the ring; real time never outruns it like this
+        if i % 6000 == 5999:
+            rss.append(round(rss_mb(), 1))
+    url = await recorder.aclose()
+    stats = recorder.stats()
+    path = url.removeprefix("file://")
+    return {
+        "minutes": args.minutes,
+        "rss_mb_per_minute": rss,
+        "rss_growth_mb": round(rss[-1] - rss[0], 1) if rss else 0.0,
+        "file_mb": round(os.path.getsize(path) / 1e6, 2),
+        "decoded_seconds": round(decoded_seconds(path), 1),
+        "stats": stats,
+    }
+
+
+async def concurrent_calls(args, storage, executor) -> dict:
+    lags: list[float] = []
+    push_us: list[float] = []
+    stop = asyncio.Event()
+
+    async def sample_lag() -> None:
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append((time.perf_counter() - started - 0.01) * 1000)
+
+    async def call(n: int) -> CallRecorder:
+        recorder = CallRecorder(f"concurrent/call-{n}.ogg", storage, executor, sample_rate=RATE)
+        recorder.start()
+        caller, agent = tone(n, 200 + n), tone(n, 400 + n)
+        started = time.perf_counter()
+        i = 0
+        while time.perf_counter() - started < args.duration:
+            t = time.perf_counter()
+            recorder.push(CALLER, caller)
+            if agent_speaking(i + n * 37):
+                recorder.push(AGENT, agent)
+            push_us.append((time.perf_counter() - t) * 1e6)
+            i += 1
+            await asyncio.sleep(max(0.0, started + i * 0.01 - time.perf_counter()))
+        return recorder
+
+    process = psutil.Process()
+    rss_before = rss_mb()
+    cpu_before = sum(process.cpu_times()[:2])
+    lag_task = asyncio.create_task(sample_lag())
+    recorders = await asyncio.gather(*(call(n) for n in range(args.calls)))
+    rss_during = rss_mb()
+    cpu = sum(process.cpu_times()[:2]) - cpu_before
+    stop.set()
+    await lag_task
+    urls = [await r.aclose() for r in recorders]
+
+    stats = [r.stats() for r in recorders]
+    lengths = [decoded_seconds(url.removeprefix("file://")) for url in urls]
+    return {
+        "calls": args.calls,
+        "duration": args.duration,
+        "loop_lag_p95_ms": round(percentile(lags, 95), 2),
+        "loop_lag_max_ms": round(max(lags), 2),
+        "push_p95_us": round(percentile(push_us, 95), 1),
+        "push_max_us": round(max(push_us), 1),
+        "rss_per_call_mb": round((rss_during - rss_before) / args.calls, 2),
+        "cpu_per_call_pct": round(cpu / args.duration / args.calls * 100, 2),
+        "encode_ms_per_call_second": round(sum(s["encode_ms"] for s in stats) / args.calls / args.duration, 2),
+        "late_samples": sum(s["late_samples"] for s in stats),
+        "overrun_samples": sum(s["overrun_samples"] for s in stats),
+        "decoded_seconds_min": round(min(lengths), 1),
+    }
+
+
+async def main(args) -> None:
+    root = tempfile.mkdtemp(prefix="truvo-recording-bench-")
+    storage = LocalRecordingStorage(root, base_url="file://" + root)  # The bench reads the files back
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="truvo-recording")
+    try:
+        long = await long_call(args, storage, executor)
+        rss = long["rss_mb_per_minute"]
+        print(f"long call, {long['minutes']} min: RSS {rss[0]} -> {rss[-1]} MB "
+              f"(growth {long['rss_growth_mb']} MB), file {long['file_mb']} MB, "
+              f"decodes to {long['decoded_seconds']} s")
+        concurrent = await concurrent_calls(args, storage, executor)
+        print(f"{concurrent['calls']} concurrent calls, {concurrent['duration']} s: "
+              f"loop lag p95/max {concurrent['loop_lag_p95_ms']}/{concurrent['loop_lag_max_ms']} ms, "
+              f"push p95/max {concurrent['push_p95_us']}/{concurrent['push_max_us']} us, "
+              f"RSS {concurrent['rss_per_call_mb']} MB/call, CPU {concurrent['cpu_per_call_pct']}% per call, "
+              f"dropped late/overrun {concurrent['late_samples']}/{concurrent['overrun_samples']} samples, "
+              f"shortest file {concurrent['decoded_seconds_min']} s")
+    finally:
+        executor.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "commit": load_test.git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "args": {k: v for k, v in vars(args).items() if k != "out"},
+        "long_call": long,
+        "concurrent": concurrent,
+    }
+    out = args.out or os.path.join(BENCH_DIR, "results", f"recording_{report['commit']}_{int(time.time())}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=60.0, help="Simulated length of the long call")
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of real-time concurrent calls")
+    parser.add_argument("--workers", type=int, default=2, help="Encoder threads")
+    parser.add_argument("--out", help="Result JSON path (default: bench/results/recording_<commit>_<time>.json)")
+    asyncio.run(main(parser.parse_args()))
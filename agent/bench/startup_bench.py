@@ -0,0 +1,287 @@
+"""Worker cold-start benchmark: import time and RSS of the worker's startup steps.
+
+imports:        `import agent` in --runs fresh interpreters under -X importtime.
+                Reports wall time and peak RSS (median), the slowest modules
+                agent.py imports, and any module that should only load when a
+                call needs it (tool modules, the Google client).
+start:          `python agent.py start` against an unreachable LiveKit URL with
+                placeholder provider keys, until the first job process has
+                finished prewarm (the worker logs "process initialized").
+                Reports time to ready and RSS of the worker and every process
+                it spawned (pages shared after fork count in each).
+download-files: the Dockerfile's build step. Reports wall time, peak RSS of
+                the process tree and exit status; it needs network unless the
+                models are already cached (--offline skips the retries).
+
+--compare diffs against an earlier result and exits 1 when a metric grew by
+more than --tolerance percent, so a cold-start regression fails the run:
+
+    python bench/startup_bench.py --runs 5 --out before.json
+    python bench/startup_bench.py --runs 5 --compare before.json
+"""
+
+import argparse
+import json
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import psutil
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+AGENT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import load_test  # noqa: E402
+
+STEPS = ("imports", "start", "download-files")
+
+# Should stay out of a worker until an agent enables the tool that needs them
+LAZY_MODULES = ("tools.booking", "tools.demo", "tools.product", "calendar_backend", "googleapiclient", "google.oauth2")
+
+IMPORT_SNIPPET = """
+import json, resource, sys, time
+sys.argv = ["agent.py"]
+started = time.perf_counter()
+import agent
+print(json.dumps({
+    "wall_ms": (time.perf_counter() - started) * 1000,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": len(sys.modules),
+    "lazy_loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+# Metrics compared by --compare: (step, field)
+GATED = (
+    ("imports", "wall_ms"),
+    ("imports", "rss_mb"),
+    ("start", "ready_s"),
+    ("start", "total_rss_mb"),
+    ("download-files", "wall_s"),
+    ("download-files", "peak_rss_mb"),
+)
+
+
+def worker_env(args, state_dir: str) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "LIVEKIT_URL": "ws://127.0.0.1:9",  # Nothing listens; the worker keeps retrying while it warms up
+        "LIVEKIT_API_KEY": "bench",
+        "LIVEKIT_API_SECRET": "bench",
+        "METRICS_PORT": str(args.metrics_port),
+        "WORKER_LOAD_STATE_DIR": state_dir,
+        "METRICS_STATE_DIR": os.path.join(state_dir, "metrics"),
+    })
+    for key in ("OPENAI_API_KEY", "DEEPGRAM_API_KEY", "ELEVEN_API_KEY"):
+        env.setdefault(key, "bench")  # Clients are built in prewarm but never called
+    if args.offline:
+        env["HF_HUB_OFFLINE"] = "1"
+    return env
+
+
+def parse_importtime(stderr: str) -> dict[str, float]:
+    """Cumulative ms of each module agent.py imports directly, from -X importtime output.
+
+    A module shared by several imports is charged to whichever loaded it first.
+    """
+    modules: dict[str, float] = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if len(name) - len(name.lstrip()) == 3:  # One level below agent
+            modules[name.strip()] = int(cumulative) / 1000
+    return modules
+
+
+def measure_imports(args) -> dict:
+    runs, modules = [], {}
+    for _ in range(args.runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", IMPORT_SNIPPET],
+            cwd=AGENT_DIR, capture_output=True, text=True, env=worker_env(args, tempfile.gettempdir()),
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"import agent failed:\n{result.stderr[-2000:]}")
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+        for name, ms in parse_importtime(result.stderr).items():
+            modules.setdefault(name, []).append(ms)
+
+    slowest = sorted(((statistics.median(v), k) for k, v in modules.items()), reverse=True)[:args.top]
+    return {
+        "wall_ms": round(statistics.median(r["wall_ms"] for r in runs), 1),
+        "wall_ms_runs": [round(r["wall_ms"], 1) for r in runs],
+        "rss_mb": round(statistics.median(r["rss_mb"] for r in runs), 1),
+        "modules": runs[-1]["modules"],
+        "lazy_loaded": runs[-1]["lazy_loaded"],
+        "slowest_imports_ms": {name: round(ms, 1) for ms, name in slowest},
+    }
+
+
+def tree_rss(proc: psutil.Process) -> dict[str, float]:
+    """RSS in MB of a process and each descendant, keyed by pid and command."""
+    rss = {}
+    for p in [proc, *proc.children(recursive=True)]:
+        try:
+            cmd = " ".join(p.cmdline()[1:4]) or p.name()
+            rss[f"{p.pid} {cmd}"[:80]] = round(p.memory_info().rss / 2**20, 1)
+        except psutil.NoSuchProcess:
+            pass
+    return rss
+
+
+def stop(proc: subprocess.Popen) -> None:
+    for sig, wait in ((signal.SIGTERM, 5), (signal.SIGKILL, 5)):
+        try:
+            os.killpg(proc.pid, sig)
+            proc.wait(timeout=wait)
+            return
+        except ProcessLookupError:
+            return
+        except subprocess.TimeoutExpired:
+            continue
+
+
+def measure_start(args) -> dict:
+    state_dir = tempfile.mkdtemp(prefix="truvo-startup-bench-")
+    log = tempfile.NamedTemporaryFile(prefix="truvo-startup-", suffix=".log", delete=False)
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "agent.py", "start"],
+        cwd=AGENT_DIR, env=worker_env(args, state_dir), stdout=log, stderr=subprocess.STDOUT,
+        start_new_session=True,
+    )
+    try:
+        ready_s = None
+        while time.perf_counter() - started < args.timeout and proc.poll() is None:
+            with open(log.name) as f:
+                if "process initialized" in f.read():
+                    ready_s = time.perf_counter() - started
+                    break
+            time.sleep(0.05)
+        if ready_s is None:
+            with open(log.name) as f:
+                tail = f.read()[-2000:]
+            raise RuntimeError(f"worker not ready after {args.timeout}s (exit {proc.poll()}):\n{tail}")
+
+        time.sleep(args.settle)  # Let the rest of the idle job processes finish prewarm
+        rss = tree_rss(psutil.Process(proc.pid))
+    finally:
+        stop(proc)
+        os.unlink(log.name)
+
+    return {
+        "ready_s": round(ready_s, 2),
+        "worker_rss_mb": next(iter(rss.values())),
+        "total_rss_mb": round(sum(rss.values()), 1),
+        "processes": rss,
+    }
+
+
+def measure_download_files(args) -> dict:
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "agent.py", "download-files"],
+        cwd=AGENT_DIR, env=worker_env(args, tempfile.gettempdir()),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    peak = 0.0
+    try:
+        root = psutil.Process(proc.pid)
+        while proc.poll() is None and time.perf_counter() - started < args.timeout:
+            try:
+                peak = max(peak, sum(tree_rss(root).values()))
+            except psutil.NoSuchProcess:
+                pass
+            time.sleep(0.05)
+    finally:
+        if proc.poll() is None:
+            stop(proc)
+    return {
+        "wall_s": round(time.perf_counter() - started, 2),
+        "peak_rss_mb": round(peak, 1),
+        "exit_code": proc.returncode,
+    }
+
+
+def parse_steps(value: str) -> list[str]:
+    steps = [step.strip() for step in value.split(",") if step.strip()]
+    unknown = [step for step in steps if step not in STEPS]
+    if unknown or not steps:
+        raise argparse.ArgumentTypeError(f"unknown step(s) {unknown or [value]}; choose from {','.join(STEPS)}")
+    return steps
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print each gated metric against the baseline; returns the ones over tolerance."""
+    print(f"\nvs {baseline.get('commit')} ({baseline.get('timestamp')}):")
+    regressions = []
+    for step, field in GATED:
+        new_v = report.get(step, {}).get(field)
+        old_v = baseline.get(step, {}).get(field)
+        if new_v is None or old_v is None:
+            continue
+        change = (new_v - old_v) / old_v * 100 if old_v else 0.0
+        flag = ""
+        if change > tolerance:
+            regressions.append(f"{step} {field}")
+            flag = "  REGRESSION"
+        print(f"  {step:<15} {field:<13} {old_v:>9} -> {new_v:>9} ({change:+.1f}%){flag}")
+    return regressions
+
+
+def main(args) -> int:
+    report = {
+        "commit": load_test.git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+    }
+    if "imports" in args.steps:
+        report["imports"] = result = measure_imports(args)
+        print(f"import agent: {result['wall_ms']} ms, {result['rss_mb']} MB peak RSS, "
+              f"{result['modules']} modules, lazily loaded too early: {result['lazy_loaded'] or 'none'}")
+        print("  slowest imports: " + ", ".join(f"{k} {v} ms" for k, v in result["slowest_imports_ms"].items()))
+    if "start" in args.steps:
+        report["start"] = result = measure_start(args)
+        print(f"agent.py start: first job ready in {result['ready_s']} s, worker {result['worker_rss_mb']} MB, "
+              f"{len(result['processes'])} processes {result['total_rss_mb']} MB total")
+    if "download-files" in args.steps:
+        report["download-files"] = result = measure_download_files(args)
+        print(f"agent.py download-files: {result['wall_s']} s, {result['peak_rss_mb']} MB peak RSS, "
+              f"exit {result['exit_code']}")
+
+    out = args.out or os.path.join(BENCH_DIR, "results", f"startup_{report['commit']}_{int(time.time())}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {out}")
+
+    failed = bool(report.get("imports", {}).get("lazy_loaded"))
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Cold start regressed by more than {args.tolerance}%: {', '.join(regressions)}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=parse_steps, default=list(STEPS),
+                        help=f"Comma-separated subset of {','.join(STEPS)}")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters for the import measurement")
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to report")
+    parser.add_argument("--metrics-port", type=int, default=9481, help="Worker /metrics port, kept off a running agent's")
+    parser.add_argument("--timeout", type=float, default=180.0, help="Seconds to wait for each step")
+    parser.add_argument("--settle", type=float, default=3.0, help="Seconds after ready before sampling RSS")
+    parser.add_argument("--offline", action="store_true", help="Set HF_HUB_OFFLINE so model lookups don't retry")
+    parser.add_argument("--compare", help="Earlier result JSON to diff against")
+    parser.add_argument("--tolerance", type=float, default=15.0, help="Percent growth counted as a regression")
+    parser.add_argument("--out", help="Result JSON path (default: bench/results/startup_<commit>_<time>.json)")
+    sys.exit(main(parser.parse_args()))
@@ -0,0 +1,289 @@
+"""Local stand-ins for the agent's external dependencies, with injectable latency.
+
+Serves, on one port:
+  - an OpenAI-compatible /v1/chat/completions (SSE streaming, scripted tool calls)
+  - the dashboard's /api/agents/{id}/config and /api/calls; /api/calls/events
+    answers 404 for rooms named no-call-row*, as it does for a room with no
+    calls row
+  - Cal.com's /v1/availability and /v1/bookings (optionally failing, or booking
+    and then losing the response; duplicate bookings counted by idempotency key)
+  - POST /_latency and /_faults to change latency and faults while running
+
+Run standalone with `python bench/stub_servers.py --port 8787`, or start it in a
+subprocess from a benchmark via start_in_subprocess().
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from aiohttp import web
+
+DEFAULT_LATENCY = {
+    "llm_ttft": 0.35,       # seconds until the first streamed token
+    "llm_token": 0.015,     # seconds between streamed tokens
+    "dashboard": 0.05,
+    "cal_availability": 0.25,
+    "cal_booking": 0.6,
+}
+
+DEFAULT_FAULTS = {
+    "cal_booking_error_rate": 0.0,  # fraction of booking POSTs answered with 503
+    "cal_booking_lost_rate": 0.0,   # fraction of booking POSTs that book, then answer 504 as if timed out
+    "llm_error_rate": 0.0,          # fraction of chat completions answered with 503
+}
+
+STUB_AGENT_CONFIG = {
+    "system_prompt": "You are a leasing assistant for Truvo Properties. Keep replies short.",
+    "greeting": "Hi, thanks for calling Truvo Properties! How can I help?",
+    "voice_id": "stub-voice",
+    "tools_enabled": ["check_availability", "book_tour"],
+}
+
+
+def make_app(latency: dict, faults: dict | None = None) -> web.Application:
+    faults = {**DEFAULT_FAULTS, **(faults or {})}
+    stats = {
+        "llm_requests": 0, "tool_calls": 0, "dashboard_requests": 0, "cal_requests": 0,
+        "bookings": 0, "duplicate_bookings": 0, "booking_errors": 0, "llm_errors": 0, "llm_cancelled": 0,
+        "llm_inflight": 0,  # Streams still being written, including ones the client already dropped
+        "lost_responses": 0, "booking_lookups": 0,
+        "call_events": {}, "call_events_refused": 0,  # Entries accepted per room
+        "connections": 0,
+    }
+    booking_keys: set[str] = set()
+    booked: list[dict] = []  # As GET /v1/bookings returns them
+    peers: set = set()  # Client (host, port) pairs seen, i.e. TCP connections opened by the agent
+
+    @web.middleware
+    async def count_connections(request: web.Request, handler):
+        if not request.path.startswith("/_") and request.transport is not None:
+            peers.add(request.transport.get_extra_info("peername"))
+            stats["connections"] = len(peers)
+        return await handler(request)
+
+    async def chat_completions(request: web.Request) -> web.StreamResponse:
+        stats["llm_requests"] += 1
+        if random.random() < faults["llm_error_rate"]:
+            stats["llm_errors"] += 1
+            return web.json_response({"error": {"message": "stub outage"}}, status=503)
+        body = await request.json()
+        reply, tool_call = _script_reply(body)
+
+        stats["llm_inflight"] += 1
+        try:
+            return await stream_reply(request, body, reply, tool_call)
+        finally:
+            stats["llm_inflight"] -= 1
+
+    async def stream_reply(request: web.Request, body: dict, reply: str, tool_call) -> web.StreamResponse:
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await asyncio.sleep(latency["llm_ttft"])
+
+        try:
+            chunk_id = f"chatcmpl-{time.monotonic_ns()}"
+            if tool_call is not None:
+                stats["tool_calls"] += 1
+                await _sse(response, chunk_id, body, {"role": "assistant", "tool_calls": [tool_call]})
+                await _sse(response, chunk_id, body, {}, finish_reason="tool_calls")
+            else:
+                for i, token in enumerate(re.findall(r"\S+\s*", reply)):
+                    delta = {"content": token}
+                    if i == 0:
+                        delta["role"] = "assistant"
+                    await _sse(response, chunk_id, body, delta)
+                    await asyncio.sleep(latency["llm_token"])
+                await _sse(response, chunk_id, body, {}, finish_reason="stop")
+
+            usage = {"prompt_tokens": _estimate_tokens(body), "completion_tokens": len(reply.split()), "total_tokens": 0}
+            await response.write(
+                f"data: {json.dumps({'id': chunk_id, 'object': 'chat.completion.chunk', 'created': int(time.time()), 'model': body.get('model', 'stub'), 'choices': [], 'usage': usage})}\n\n".encode()
+            )
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+        except ConnectionResetError:
+            stats["llm_cancelled"] += 1  # Client hung up mid-stream, e.g. a cancelled race loser
+        return response
+
+    async def agent_config(request: web.Request) -> web.Response:
+        stats["dashboard_requests"] += 1
+        await asyncio.sleep(latency["dashboard"])
+        return web.json_response(STUB_AGENT_CONFIG)
+
+    async def calls(request: web.Request) -> web.Response:
+        stats["dashboard_requests"] += 1
+        await asyncio.sleep(latency["dashboard"])
+        return web.json_response({"ok": True})
+
+    async def call_events(request: web.Request) -> web.Response:
+        stats["dashboard_requests"] += 1
+        await asyncio.sleep(latency["dashboard"])
+        body = await request.json()
+        room_name = body.get("room_name", "")
+        if room_name.startswith("no-call-row"):
+            stats["call_events_refused"] += 1
+            return web.json_response({"error": "Call not found"}, status=404)
+        received = stats["call_events"]
+        received[room_name] = received.get(room_name, 0) + len(body.get("entries", []))
+        return web.json_response({"received": len(body.get("entries", []))})
+
+    async def availability(request: web.Request) -> web.Response:
+        stats["cal_requests"] += 1
+        await asyncio.sleep(latency["cal_availability"])
+        day = request.query.get("startTime", "")[:10]
+        slots = [{"time": f"{day}T{hour:02d}:00:00Z"} for hour in (14, 15, 17, 19)]
+        return web.json_response({"slots": {day: slots}})
+
+    async def bookings(request: web.Request) -> web.Response:
+        stats["cal_requests"] += 1
+        await asyncio.sleep(latency["cal_booking"])
+        if random.random() < faults["cal_booking_error_rate"]:
+            stats["booking_errors"] += 1
+            return web.json_response({"message": "stub outage"}, status=503)
+
+        body = await request.json()
+        key = (body.get("metadata") or {}).get("idempotency_key")
+        if key in booking_keys:
+            stats["duplicate_bookings"] += 1
+        booking_keys.add(key)
+        stats["bookings"] += 1
+        start = datetime.fromisoformat(body["start"]).replace(tzinfo=ZoneInfo(body.get("timeZone", "UTC")))
+        booking = {
+            "id": stats["bookings"],
+            "eventTypeId": body.get("eventTypeId"),
+            "startTime": start.astimezone(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "status": "ACCEPTED",
+            "attendees": [{"email": (body.get("responses") or {}).get("email", "")}],
+        }
+        booked.append(booking)
+        if random.random() < faults["cal_booking_lost_rate"]:
+            stats["lost_responses"] += 1
+            return web.json_response({"message": "stub gateway timeout"}, status=504)
+        return web.json_response(booking, status=201)
+
+    async def list_bookings(request: web.Request) -> web.Response:
+        stats["cal_requests"] += 1
+        stats["booking_lookups"] += 1
+        await asyncio.sleep(latency["cal_availability"])
+        email = request.query.get("attendeeEmail", "").lower()
+        matching = [b for b in booked if not email or b["attendees"][0]["email"].lower() == email]
+        return web.json_response({"bookings": matching})
+
+    async def stub_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    async def set_latency(request: web.Request) -> web.Response:
+        latency.update(await request.json())
+        return web.json_response(latency)
+
+    async def set_faults(request: web.Request) -> web.Response:
+        faults.update(await request.json())
+        return web.json_response(faults)
+
+    app = web.Application(middlewares=[count_connections])
+    app.router.add_post("/v1/chat/completions", chat_completions)
+    app.router.add_get("/api/agents/{id}/config", agent_config)
+    app.router.add_route("*", "/api/calls", calls)
+    app.router.add_post("/api/calls/events", call_events)  # Before the catch-all below
+    app.router.add_route("*", "/api/calls/{tail:.*}", calls)
+    app.router.add_get("/v1/availability", availability)
+    app.router.add_post("/v1/bookings", bookings)
+    app.router.add_get("/v1/bookings", list_bookings)
+    app.router.add_get("/_stats", stub_stats)
+    app.router.add_post("/_latency", set_latency)
+    app.router.add_post("/_faults", set_faults)
+    return app
+
+
+def _script_reply(body: dict) -> tuple[str, dict | None]:
+    """Deterministic 'LLM': call a tool when the caller asks for one, else chat."""
+    messages = body.get("messages", [])
+    tools = {t["function"]["name"] for t in body.get("tools", []) if t.get("type") == "function"}
+    last = messages[-1] if messages else {}
+
+    if last.get("role") == "tool":
+        return "Perfect! I've got that sorted for you. Anything else I can help with?", None
+
+    text = _content_text(last).lower()
+    if "book" in text and "@" in text and "book_tour" in tools:
+        args = {
+            "date": _next_business_day(),
+            "time": "15:00",
+            "name": "Sam Lee",
+            "email": re.search(r"[\w.+-]+@[\w-]+\.[\w.]+", text).group(0).rstrip("."),
+        }
+        return "", _tool_call("book_tour", args)
+    if "availab" in text and "check_availability" in tools:
+        return "", _tool_call("check_availability", {"date": _next_business_day()})
+    return "Sure thing! We have one, two and three bedroom apartments. What size are you looking for?", None
+
+
+def _tool_call(name: str, args: dict) -> dict:
+    return {
+        "index": 0,
+        "id": f"call_{time.monotonic_ns()}",
+        "type": "function",
+        "function": {"name": name, "arguments": json.dumps(args)},
+    }
+
+
+def _content_text(message: dict) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def _estimate_tokens(body: dict) -> int:
+    return sum(len(_content_text(m)) for m in body.get("messages", [])) // 4
+
+
+def _next_business_day() -> str:
+    day = date.today() + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day.isoformat()
+
+
+async def _sse(response: web.StreamResponse, chunk_id: str, body: dict, delta: dict, finish_reason=None) -> None:
+    chunk = {
+        "id": chunk_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+
+
+def serve(port: int, latency: dict, faults: dict | None = None) -> None:
+    web.run_app(make_app(latency, faults), host="127.0.0.1", port=port, print=None)
+
+
+def start_in_subprocess(port: int, latency: dict | None = None, faults: dict | None = None) -> multiprocessing.Process:
+    """Start the stubs in their own process so they don't load the loop under test."""
+    proc = multiprocessing.Process(
+        target=serve, args=(port, {**DEFAULT_LATENCY, **(latency or {})}, faults), daemon=True
+    )
+    proc.start()
+    return proc
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8787)
+    for name, value in {**DEFAULT_LATENCY, **DEFAULT_FAULTS}.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=value)
+    args = parser.parse_args()
+    serve(
+        args.port,
+        {name: getattr(args, name) for name in DEFAULT_LATENCY},
+        {name: getattr(args, name) for name in DEFAULT_FAULTS},
+    )
@@ -0,0 +1,217 @@
+"""Turn-detection service benchmark: CPU per session and decision latency.
+
+Runs the turn-detection service twice for each session count: once serial
+(one request at a time on one thread, which is how LiveKit's inference
+process handles end-of-utterance requests) and once batched with the
+worker's TURN_BATCH_* settings. Each simulated session keeps its own
+connection, as a job process does, and asks for an end-of-turn decision
+after every caller utterance with a growing transcript.
+
+Reports decision latency p50/p95/p99, average batch size and the CPU used
+per session (service plus clients) as a share of one core.
+
+--model livekit needs the turn-detector files (python agent.py download-files).
+--model synthetic is a numpy stand-in with a similar cost profile: tokens
+grouped by length, a stack of dense layers, one call per group. The default,
+auto, uses the real model when it is available.
+
+    python bench/turn_detection_bench.py --levels 1,10,50 --duration 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import zlib
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import psutil  # noqa: E402
+
+import load_test  # noqa: E402
+from turn_detection import TurnDetectionClient, load_livekit_model, start_service  # noqa: E402
+from turn_metrics import percentile  # noqa: E402
+
+WORDS = (
+    "yeah so we are looking at a two bedroom for march um maybe april is the unit near the park "
+    "do you allow dogs what about parking i work from home so i need good internet and "
+    "could i come by on saturday morning or is tuesday better for a tour thanks"
+).split()
+
+
+class SyntheticEOUModel:
+    """Stand-in for the ONNX end-of-utterance model when its files aren't available."""
+
+    def __init__(self, layers: int = 16, dim: int = 768, max_tokens: int = 128) -> None:
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        self._np = np
+        self._max_tokens = max_tokens
+        self._embed = rng.standard_normal((4096, dim), dtype=np.float32) * 0.1
+        self._layers = [rng.standard_normal((dim, dim), dtype=np.float32) / dim ** 0.5 for _ in range(layers)]
+        self._head = rng.standard_normal(dim, dtype=np.float32)
+
+    def __call__(self, contexts: list[list[dict]]) -> list[float]:
+        np = self._np
+        ids = []
+        for messages in contexts:
+            text = " ".join(f"<{m['role']}> {m['content']}" for m in messages)
+            ids.append([zlib.crc32(word.encode()) % 4096 for word in text.split()][-self._max_tokens:])
+
+        probabilities = [0.0] * len(ids)
+        groups: dict[int, list[int]] = {}
+        for i, row in enumerate(ids):
+            groups.setdefault(len(row), []).append(i)
+        for indices in groups.values():
+            hidden = self._embed[np.array([ids[i] for i in indices])]
+            for weights in self._layers:
+                hidden = np.tanh(hidden @ weights)
+            logits = hidden[:, -1] @ self._head
+            for row, i in enumerate(indices):
+                probabilities[i] = float(1 / (1 + np.exp(-logits[row])))
+        return probabilities
+
+
+def synthetic_model() -> SyntheticEOUModel:
+    return SyntheticEOUModel()
+
+
+# Loaded in the service process by name
+LIVEKIT_MODEL = "turn_detection:load_livekit_model"
+SYNTHETIC_MODEL = "turn_detection_bench:synthetic_model"
+
+
+def pick_model(name: str):
+    if name != "auto":
+        return name, (LIVEKIT_MODEL if name == "livekit" else SYNTHETIC_MODEL)
+    try:
+        load_livekit_model()
+        return "livekit", LIVEKIT_MODEL
+    except Exception:
+        return "synthetic", SYNTHETIC_MODEL
+
+
+async def wait_for_socket(path: str, proc, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("Turn-detection service did not start")
+        await asyncio.sleep(0.05)
+
+
+async def session(index: int, socket_path: str, args, stop_at: float, latencies: list, failures: list) -> None:
+    rng = random.Random(index)
+    client = TurnDetectionClient(socket_path)
+    history: list[dict] = []
+    await asyncio.sleep(rng.uniform(0, args.max_gap))  # Calls don't start in lockstep
+    try:
+        while time.monotonic() < stop_at:
+            history.append({"role": "user", "content": " ".join(rng.choices(WORDS, k=rng.randint(3, 14)))})
+            started = time.perf_counter()
+            try:
+                await client.predict(history[-6:], timeout=3.0)
+                latencies.append((time.perf_counter() - started) * 1000)
+            except Exception as e:
+                failures.append(repr(e))
+            if rng.random() < 0.5:  # Caller finished the turn; the agent answers
+                history.append({"role": "assistant", "content": " ".join(rng.choices(WORDS, k=rng.randint(8, 20)))})
+            await asyncio.sleep(rng.uniform(args.min_gap, args.max_gap))
+    finally:
+        await client.aclose()
+
+
+async def run_level(sessions: int, mode: str, model: str, args) -> dict:
+    socket_path = os.path.join(tempfile.mkdtemp(prefix="truvo-turn-"), "turn.sock")
+    if mode == "serial":
+        settings = {"max_batch": 1, "max_delay": 0.0, "threads": 1}
+    else:
+        settings = {"max_batch": args.batch, "max_delay": args.delay_ms / 1000, "threads": args.threads}
+    proc = start_service(socket_path, model, max_queue=args.max_queue, **settings)
+    try:
+        await wait_for_socket(socket_path, proc)
+        service, client_proc = psutil.Process(proc.pid), psutil.Process()
+        probe = TurnDetectionClient(socket_path)
+        await probe.predict([{"role": "user", "content": "warm up"}])  # Model loaded and first run done
+
+        cpu_before = sum(service.cpu_times()[:2]) + sum(client_proc.cpu_times()[:2])
+        latencies: list[float] = []
+        failures: list[str] = []
+        started = time.monotonic()
+        stop_at = started + args.duration
+        await asyncio.gather(*(session(i, socket_path, args, stop_at, latencies, failures) for i in range(sessions)))
+        elapsed = time.monotonic() - started
+        cpu = sum(service.cpu_times()[:2]) + sum(client_proc.cpu_times()[:2]) - cpu_before
+        service_stats = await probe.service_stats()
+        await probe.aclose()
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    return {
+        "sessions": sessions,
+        "mode": mode,
+        "decisions": len(latencies),
+        "failures": len(failures),
+        "latency_p50_ms": round(percentile(latencies, 50), 1) if latencies else None,
+        "latency_p95_ms": round(percentile(latencies, 95), 1) if latencies else None,
+        "latency_p99_ms": round(percentile(latencies, 99), 1) if latencies else None,
+        "cpu_per_session_pct": round(cpu / elapsed / sessions * 100, 2),
+        "cpu_ms_per_decision": round(cpu * 1000 / max(1, len(latencies)), 2),
+        "avg_batch": service_stats["avg_batch"],
+        "service_queue_ms": service_stats["queue_ms"],
+    }
+
+
+async def main(args) -> None:
+    model_name, model = pick_model(args.model)
+    print(f"Model: {model_name}, {psutil.cpu_count()} CPUs")
+    results = []
+    for sessions in args.levels:
+        for mode in ("serial", "batched"):
+            level = await run_level(sessions, mode, model, args)
+            results.append(level)
+            print(
+                f"{sessions:>4} sessions {mode:>7}: latency p50/p95/p99 {level['latency_p50_ms']}/"
+                f"{level['latency_p95_ms']}/{level['latency_p99_ms']} ms, "
+                f"CPU {level['cpu_per_session_pct']}% of a core per session "
+                f"({level['cpu_ms_per_decision']} ms/decision), avg batch {level['avg_batch']}, "
+                f"{level['failures']} failed"
+            )
+
+    report = {
+        "commit": load_test.git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "model": model_name,
+        "cpus": psutil.cpu_count(),
+        "args": {k: v for k, v in vars(args).items() if k != "out"},
+        "levels": results,
+    }
+    out = args.out or os.path.join(BENCH_DIR, "results", f"turn_detection_{report['commit']}_{int(time.time())}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {out}")
+
+
+if __name__ == "__main__":
+    from config import Config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=lambda s: [int(x) for x in s.split(",")], default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per level and mode")
+    parser.add_argument("--model", choices=("auto", "livekit", "synthetic"), default="auto")
+    parser.add_argument("--min-gap", type=float, default=0.4, help="Shortest pause between decisions per session")
+    parser.add_argument("--max-gap", type=float, default=1.5, help="Longest pause between decisions per session")
+    parser.add_argument("--batch", type=int, default=Config.TURN_BATCH_MAX)
+    parser.add_argument("--delay-ms", type=float, default=Config.TURN_BATCH_DELAY_MS)
+    parser.add_argument("--threads", type=int, default=Config.TURN_SERVICE_THREADS)
+    parser.add_argument("--max-queue", type=int, default=Config.TURN_MAX_QUEUE)
+    parser.add_argument("--out", help="Result JSON path (default: bench/results/turn_detection_<commit>_<time>.json)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Optional
+
+from config import Config
+
+logger = logging.getLogger("truvo-agent")
+
+# Called with the payload and the attempt number (1 for the first try)
+Submitter = Callable[[dict, int], Awaitable[None]]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    key TEXT PRIMARY KEY,
+    backend TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending, inflight, submitted, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    lease_until REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_due ON bookings(status, next_attempt_at);
+"""
+
+
+class BookingRejected(Exception):
+    """The calendar refused the booking; retrying won't help."""
+
+
+def booking_key(*parts: str) -> str:
+    """Idempotency key for a booking: same caller and slot, same key."""
+    normalized = [str(part).strip().lower() for part in parts]
+    return hashlib.sha256(json.dumps(normalized).encode()).hexdigest()[:32]
+
+
+class BookingQueue:
+    """Durable write-behind queue for calendar bookings, backed by SQLite.
+
+    enqueue() records the booking under its idempotency key and returns
+    without waiting on the calendar, so the agent can confirm immediately. Job
+    processes only enqueue: they exit with their call. The worker process runs
+    the submitter (run_in_thread()), which sends due bookings through the
+    submitter registered for their backend, retrying with exponential backoff.
+    A submitter claims a row with a lease, so each booking is sent by one
+    process at a time, and rows left by a crashed worker are picked up again
+    once their lease expires.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_attempts: int = 8,
+        base_delay: float = 2.0,
+        max_delay: float = 300.0,
+        lease_seconds: float = 60.0,
+        poll_interval: float = 5.0,
+    ) -> None:
+        self._db_path = db_path
+        self._max_attempts = max_attempts
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self._lease_seconds = lease_seconds
+        self._poll_interval = poll_interval
+        self._submitters: dict[str, Submitter] = {}
+        # One thread owns the connection, so SQLite calls never block the event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="booking-db")
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: set[asyncio.Task] = set()
+        self._status_counts: dict[str, int] = {}  # Refreshed by the submitter on the DB thread
+        self._counters = {"enqueued": 0, "duplicates": 0, "submitted": 0, "retries": 0, "failed": 0}
+
+    def register(self, backend: str, submitter: Submitter) -> None:
+        self._submitters[backend] = submitter
+
+    def start(self) -> None:
+        """Start submitting in this loop. Resumes rows left by earlier processes."""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def run_in_thread(self) -> threading.Thread:
+        """Submit from a daemon thread with its own event loop, e.g. in the worker process."""
+
+        async def run() -> None:
+            self.start()
+            await self._task
+
+        thread = threading.Thread(target=asyncio.run, args=(run(),), name="booking-queue", daemon=True)
+        thread.start()
+        return thread
+
+    async def enqueue(self, backend: str, key: str, payload: dict) -> bool:
+        """Record a booking. Returns False if the same key was already queued (a duplicate call)."""
+        now = time.time()
+        inserted = await self._db(
+            lambda conn: conn.execute(
+                "INSERT OR IGNORE INTO bookings (key, backend, payload, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, backend, json.dumps(payload), now, now, now),
+            ).rowcount
+        )
+        if not inserted:
+            self._counters["duplicates"] += 1
+            logger.info(f"Duplicate booking {key[:12]} ignored")
+            return False
+
+        self._counters["enqueued"] += 1
+        if self._task is not None:
+            self._wakeup.set()  # Submitting in this process; otherwise the worker's next poll picks it up
+        return True
+
+    async def status(self, key: str) -> Optional[str]:
+        row = await self._db(lambda conn: conn.execute("SELECT status FROM bookings WHERE key = ?", (key,)).fetchone())
+        return row[0] if row else None
+
+    async def drain(self, timeout: float) -> None:
+        """Give in-flight submissions up to timeout to finish; queued rows stay for the next process."""
+        if self._inflight:
+            await asyncio.wait(self._inflight, timeout=timeout)
+
+    async def status_counts(self) -> dict[str, int]:
+        """Rows per status, read on the DB thread."""
+        counts = dict.fromkeys(("pending", "inflight", "submitted", "failed"), 0)
+        rows = await self._db(
+            lambda conn: conn.execute("SELECT status, COUNT(*) FROM bookings GROUP BY status").fetchall()
+        )
+        counts.update(dict(rows))
+        return counts
+
+    def stats(self) -> dict:
+        """Counters, plus queue depth as of the submitter's last poll. Never touches the database."""
+        stats = dict(self._counters)
+        if self._status_counts:
+            stats["depth"] = self._status_counts["pending"] + self._status_counts["inflight"]
+            stats["failed_total"] = self._status_counts["failed"]
+        return stats
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                for row in await self._db(self._claim_due):
+                    task = asyncio.create_task(self._submit(*row))
+                    self._inflight.add(task)
+                    task.add_done_callback(self._inflight.discard)
+                self._status_counts = await self.status_counts()
+            except Exception as e:
+                logger.warning(f"Booking queue poll failed: {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def _claim_due(self, conn: sqlite3.Connection) -> list[tuple]:
+        now = time.time()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT key, backend, payload, attempts FROM bookings "
+                "WHERE (status = 'pending' AND next_attempt_at <= ?) OR (status = 'inflight' AND lease_until < ?) "
+                "ORDER BY next_attempt_at LIMIT 16",
+                (now, now),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE bookings SET status = 'inflight', lease_until = ?, updated_at = ? WHERE key = ?",
+                [(now + self._lease_seconds, now, row[0]) for row in rows],
+            )
+        return rows
+
+    async def _submit(self, key: str, backend: str, payload: str, attempts: int) -> None:
+        submitter = self._submitters.get(backend)
+        attempts += 1
+        try:
+            if submitter is None:
+                raise BookingRejected(f"No submitter registered for backend {backend!r}")
+            await submitter(json.loads(payload), attempts)
+        except BookingRejected as e:
+            await self._finish(key, "failed", attempts, str(e))
+            self._counters["failed"] += 1
+            logger.error(f"Booking {key[:12]} rejected by {backend}: {e}")
+            return
+        except Exception as e:
+            if attempts >= self._max_attempts:
+                await self._finish(key, "failed", attempts, str(e))
+                self._counters["failed"] += 1
+                logger.error(f"Booking {key[:12]} failed after {attempts} attempts: {e}")
+                return
+            delay = min(self._max_delay, self._base_delay * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+            await self._db(
+                lambda conn: conn.execute(
+                    "UPDATE bookings SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?, "
+                    "updated_at = ? WHERE key = ?",
+                    (attempts, time.time() + delay, str(e), time.time(), key),
+                )
+            )
+            self._counters["retries"] += 1
+            logger.warning(f"Booking {key[:12]} attempt {attempts} failed, retrying in {delay:.0f}s: {e}")
+            return
+
+        await self._finish(key, "submitted", attempts, None)
+        self._counters["submitted"] += 1
+        logger.info(f"Booking {key[:12]} submitted to {backend} (attempt {attempts})")
+
+    async def _finish(self, key: str, status: str, attempts: int, error: Optional[str]) -> None:
+        await self._db(
+            lambda conn: conn.execute(
+                "UPDATE bookings SET status = ?, attempts = ?, last_error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE key = ?",
+                (status, attempts, error, time.time(), key),
+            )
+        )
+
+    async def _db(self, fn):
+        def run():
+            with self._db_lock:
+                return fn(self._connection())
+
+        return await asyncio.get_running_loop().run_in_executor(self._executor, run)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self._db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self._db_path, timeout=10.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")  # Readers don't block the other job processes' writers
+            conn.execute("PRAGMA synchronous=FULL")  # A confirmed booking must survive a crash
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+
+booking_queue = BookingQueue(
+    db_path=Config.BOOKING_QUEUE_DB,
+    max_attempts=Config.BOOKING_MAX_ATTEMPTS,
+)
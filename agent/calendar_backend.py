@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+logger = logging.getLogger("truvo-agent")
+
+CALENDAR_SCOPES = ["https://www.googleapis.com/auth/calendar"]
+
+
+class GoogleCalendarBackend:
+    """Google Calendar client that keeps blocking work off the event loop.
+
+    Credentials and the discovery-built service are created once and reused.
+    Every blocking call (credential load, token refresh, .execute()) runs on a
+    small bounded thread pool, so a slow Calendar API only delays the booking
+    that is waiting on it, not the other sessions in the worker.
+    """
+
+    def __init__(
+        self,
+        service_account_file: str,
+        calendar_id: str,
+        max_workers: int = 4,
+        refresh_margin: float = 300.0,
+        api_endpoint: str = "",
+        request_timeout: float = 10.0,
+    ) -> None:
+        self._service_account_file = service_account_file
+        self._calendar_id = calendar_id
+        self._refresh_margin = timedelta(seconds=refresh_margin)
+        self._api_endpoint = api_endpoint
+        self._request_timeout = request_timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gcal")
+        self._lock = threading.Lock()
+        self._local = threading.local()  # httplib2 isn't thread-safe; one Http per thread
+        self._credentials = None
+        self._service = None
+
+    async def warm(self) -> None:
+        """Load credentials, build the service and fetch a token in the background."""
+        try:
+            await self._run(self._ensure_ready)
+        except Exception as e:
+            logger.warning(f"Google Calendar warm-up failed: {e}")
+
+    async def insert_event(self, event: dict) -> dict:
+        """Insert an event into the configured calendar."""
+        def insert() -> dict:
+            service = self._ensure_ready()
+            request = service.events().insert(calendarId=self._calendar_id, body=event)
+            return request.execute(http=self._thread_http(), num_retries=1)
+
+        return await self._run(insert)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn)
+
+    def _ensure_ready(self):
+        """Build credentials and service once; refresh the token ahead of expiry."""
+        with self._lock:
+            if self._service is None:
+                from google.oauth2 import service_account
+                from googleapiclient.discovery import build
+
+                self._credentials = service_account.Credentials.from_service_account_file(
+                    self._service_account_file,
+                    scopes=CALENDAR_SCOPES,
+                )
+                client_options = {"api_endpoint": self._api_endpoint} if self._api_endpoint else None
+                # Bundled discovery document - no network round trip to build the client
+                self._service = build(
+                    "calendar",
+                    "v3",
+                    credentials=self._credentials,
+                    static_discovery=True,
+                    cache_discovery=False,
+                    client_options=client_options,
+                )
+
+            if self._token_expiring():
+                from google.auth.transport.requests import Request
+
+                self._credentials.refresh(Request())
+                logger.info(f"Refreshed Google Calendar token, expires {self._credentials.expiry}")
+
+            return self._service
+
+    def _token_expiring(self) -> bool:
+        expiry: Optional[datetime] = self._credentials.expiry
+        if not self._credentials.token or expiry is None:
+            return True
+        # google-auth stores expiry as a naive UTC datetime
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return expiry - now < self._refresh_margin
+
+    def _thread_http(self):
+        http = getattr(self._local, "http", None)
+        if http is None:
+            import google_auth_httplib2
+            import httplib2
+
+            http = google_auth_httplib2.AuthorizedHttp(
+                self._credentials,
+                http=httplib2.Http(timeout=self._request_timeout),
+            )
+            self._local.http = http
+        return http
@@ -0,0 +1,306 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+import psutil
+from livekit.agents import AgentSession, llm, metrics
+
+from http_client import http_pool
+
+logger = logging.getLogger("truvo-agent")
+
+# Outcomes of one send: delivered, refused for good (dropped), or to retry later
+SENT, REFUSED, RETRY = "sent", "refused", "retry"
+
+
+class CallEventWriter:
+    """Per-process writer for call transcripts and events, off the conversation path.
+
+    record() only appends to a bounded in-memory queue. A background task sends
+    batches, grouped by room, to the dashboard's /api/calls/events. While the
+    dashboard is failing, batches are spooled to local JSONL files and replayed
+    with backoff once it recovers. Entries carry a per-room sequence number, so
+    the dashboard can drop duplicates and order batches that arrive late. A
+    room's batches are sent one at a time. When the queue is full, timing and
+    tool events are dropped before transcript lines. A batch the dashboard
+    refuses with a 4xx (e.g. a room with no calls row) is dropped, not retried,
+    so it can't hold up other rooms; only 5xx and connection errors back off.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        spool_dir: str,
+        max_queue: int = 2000,
+        batch_size: int = 50,
+        flush_interval: float = 1.0,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self._url = url
+        self._spool_dir = spool_dir
+        self._max_queue = max_queue
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_backoff = max_backoff
+        self._queue: deque[tuple[str, dict]] = deque()
+        self._seq: dict[str, int] = {}
+        self._room_locks: dict[str, asyncio.Lock] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._backoff = 0.0
+        self._sink_down_until = 0.0
+        self._counters = {
+            "recorded": 0, "sent": 0, "batches": 0, "dropped": 0,
+            "spooled": 0, "replayed": 0, "send_failures": 0, "rejected_batches": 0,
+        }
+
+    def record(self, room_name: str, kind: str, data: dict) -> None:
+        """Queue one transcript line or event. Never blocks and never raises."""
+        seq = self._seq.get(room_name, 0) + 1
+        self._seq[room_name] = seq
+        entry = {"seq": seq, "kind": kind, "timestamp": _now(), **data}
+
+        if len(self._queue) >= self._max_queue and not self._drop_one(incoming=kind):
+            self._counters["dropped"] += 1
+            return
+        self._queue.append((room_name, entry))
+        self._counters["recorded"] += 1
+
+        self._ensure_started()
+        if len(self._queue) >= self._batch_size:
+            self._wakeup.set()
+
+    async def close_room(self, room_name: str, timeout: float = 5.0) -> None:
+        """Final flush on room close: send (or spool) everything queued for room_name."""
+        entries = [entry for room, entry in self._queue if room == room_name]
+        self._queue = deque(item for item in self._queue if item[0] != room_name)
+        self._seq.pop(room_name, None)
+        if not entries:
+            return
+        try:
+            # Waits behind a batch of this room the flusher may still be sending
+            await asyncio.wait_for(asyncio.shield(self._deliver(room_name, entries)), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Final call log flush for {room_name} timed out; it will be spooled")
+        lock = self._room_locks.get(room_name)
+        if lock is not None and not lock.locked():
+            del self._room_locks[room_name]
+
+    async def aclose(self) -> None:
+        """Stop the flusher and spool whatever is still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        by_room: dict[str, list[dict]] = {}
+        while self._queue:
+            room_name, entry = self._queue.popleft()
+            by_room.setdefault(room_name, []).append(entry)
+        for room_name, entries in by_room.items():
+            await asyncio.to_thread(self._spool, room_name, entries)
+
+    def stats(self) -> dict:
+        return {**self._counters, "queued": len(self._queue), "spool_files": len(self._spool_files())}
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def _drop_one(self, incoming: str) -> bool:
+        """Make room for an incoming entry by dropping the oldest non-transcript event."""
+        for i, (_, entry) in enumerate(self._queue):
+            if entry["kind"] != "transcript":
+                del self._queue[i]
+                self._counters["dropped"] += 1
+                return True
+        if incoming == "transcript":
+            self._queue.popleft()
+            self._counters["dropped"] += 1
+            return True
+        return False
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self._replay_spool()
+                await self._flush()
+            except Exception as e:
+                logger.warning(f"Call log flush failed: {e}")
+
+    async def _flush(self) -> None:
+        while self._queue:
+            batch: dict[str, list[dict]] = {}
+            for _ in range(min(self._batch_size, len(self._queue))):
+                room_name, entry = self._queue.popleft()
+                batch.setdefault(room_name, []).append(entry)
+            for room_name, entries in batch.items():
+                await self._deliver(room_name, entries)
+
+    async def _deliver(self, room_name: str, entries: list[dict]) -> None:
+        """Send one room's entries, or spool them if the dashboard is down."""
+        async with self._room_lock(room_name):
+            if time.monotonic() < self._sink_down_until or await self._send(room_name, entries) == RETRY:
+                await asyncio.to_thread(self._spool, room_name, entries)
+
+    def _room_lock(self, room_name: str) -> asyncio.Lock:
+        lock = self._room_locks.get(room_name)
+        if lock is None:
+            lock = self._room_locks[room_name] = asyncio.Lock()
+        return lock
+
+    async def _send(self, room_name: str, entries: list[dict]) -> str:
+        """Send one room's batch; returns SENT, REFUSED or RETRY."""
+        try:
+            response = await http_pool.request(
+                "call_events", "POST", self._url, json={"room_name": room_name, "entries": entries}
+            )
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            if 400 <= status < 500 and status not in (408, 429):
+                # Resending won't change the answer, and the sink itself is up
+                self._counters["dropped"] += len(entries)
+                self._counters["rejected_batches"] += 1
+                logger.warning(f"Dashboard refused {len(entries)} call log entries for {room_name} ({status}); dropped")
+                return REFUSED
+            return self._sink_failed(e)
+        except Exception as e:
+            return self._sink_failed(e)
+        self._backoff = 0.0
+        self._counters["sent"] += len(entries)
+        self._counters["batches"] += 1
+        return SENT
+
+    def _sink_failed(self, error: Exception) -> str:
+        self._counters["send_failures"] += 1
+        self._backoff = min(self._max_backoff, max(1.0, self._backoff * 2))
+        self._sink_down_until = time.monotonic() + self._backoff
+        logger.warning(f"Call log send failed ({error}); retrying in {self._backoff:.0f}s")
+        return RETRY
+
+    async def _replay_spool(self) -> None:
+        """Resend spooled batches, oldest first, while the dashboard is up.
+
+        A file that fails goes back to the spool and replay moves on to the
+        next; it stops once a failure has marked the sink down.
+        """
+        await asyncio.to_thread(self._release_orphaned_claims)
+        for path in self._spool_files():
+            if time.monotonic() < self._sink_down_until:
+                return
+            # Claim the file first: every job process shares the spool directory
+            claimed = f"{path}.{os.getpid()}.sending"
+            try:
+                os.rename(path, claimed)
+                room_name, entries = await asyncio.to_thread(_read_spool, claimed)
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError) as e:
+                logger.warning(f"Discarding unreadable call log spool {path}: {e}")
+                _remove(claimed)
+                continue
+            async with self._room_lock(room_name):
+                outcome = await self._send(room_name, entries)
+            if outcome == RETRY:
+                os.rename(claimed, path)
+                continue
+            _remove(claimed)
+            if outcome == SENT:
+                self._counters["replayed"] += len(entries)
+
+    def _release_orphaned_claims(self) -> None:
+        """Return files claimed by a process that died mid-replay to the spool."""
+        for claimed in glob.glob(os.path.join(self._spool_dir, "*.jsonl.*.sending")):
+            path, pid, _ = claimed.rsplit(".", 2)
+            if not psutil.pid_exists(int(pid)):
+                try:
+                    os.rename(claimed, path)
+                except FileNotFoundError:
+                    pass  # Another process released it first
+
+    def _spool(self, room_name: str, entries: list[dict]) -> None:
+        os.makedirs(self._spool_dir, exist_ok=True)
+        path = os.path.join(self._spool_dir, f"{time.time_ns()}-{os.getpid()}.jsonl")
+        with open(path + ".tmp", "w") as f:
+            f.write(json.dumps({"room_name": room_name}) + "\n")
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(path + ".tmp", path)
+        self._counters["spooled"] += len(entries)
+
+    def _spool_files(self) -> list[str]:
+        # Names start with a timestamp, so sorting replays oldest first
+        return sorted(glob.glob(os.path.join(self._spool_dir, "*.jsonl")))
+
+
+def attach_call_log(session: AgentSession, room_name: str, writer: CallEventWriter) -> None:
+    """Record transcript turns, tool calls and turn timings from a session."""
+
+    @session.on("conversation_item_added")
+    def _on_item(ev) -> None:
+        item = ev.item
+        if not isinstance(item, llm.ChatMessage) or item.role not in ("user", "assistant"):
+            return
+        text = item.text_content
+        if text:
+            writer.record(room_name, "transcript", {
+                "role": "agent" if item.role == "assistant" else "user",
+                "text": text,
+                "interrupted": item.interrupted,
+            })
+
+    @session.on("function_tools_executed")
+    def _on_tools(ev) -> None:
+        for call, output in ev.zipped():
+            writer.record(room_name, "tool", {
+                "name": call.name,
+                "arguments": call.arguments,
+                "is_error": output.is_error if output is not None else None,
+                "seconds": round(ev.created_at - call.created_at, 3),
+            })
+
+    @session.on("metrics_collected")
+    def _on_metrics(ev) -> None:
+        m = ev.metrics
+        if isinstance(m, metrics.EOUMetrics):
+            timing = {"end_of_utterance_delay": m.end_of_utterance_delay, "transcription_delay": m.transcription_delay}
+        elif isinstance(m, metrics.LLMMetrics):
+            timing = {"llm_ttft": m.ttft}
+        elif isinstance(m, metrics.TTSMetrics):
+            timing = {"tts_ttfb": m.ttfb}
+        else:
+            return
+        writer.record(room_name, "timing", {k: round(v, 3) for k, v in timing.items()})
+
+
+def _read_spool(path: str) -> tuple[str, list[dict]]:
+    with open(path) as f:
+        header, *lines = f.read().splitlines()
+    return json.loads(header)["room_name"], [json.loads(line) for line in lines]
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
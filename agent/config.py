@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,16 +17,56 @@ class Config:
     ELEVEN_API_KEY = os.getenv("ELEVEN_API_KEY", "")
     GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 
+    # LLM routing by time-to-first-token (Groq joins when enabled and GROQ_API_KEY is set)
+    LLM_ROUTING_ENABLED = os.getenv("LLM_ROUTING_ENABLED", "false").lower() == "true"
+    GROQ_LLM_MODEL = os.getenv("GROQ_LLM_MODEL", "llama-3.3-70b-versatile")
+    LLM_RACE_FIRST_TOKEN = os.getenv("LLM_RACE_FIRST_TOKEN", "false").lower() == "true"  # Doubles LLM spend
+    LLM_FIRST_TOKEN_TIMEOUT = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT", "4.0"))  # seconds before failing over
+
     # Dashboard API
     NEXT_API_URL = os.getenv("NEXT_API_URL", "http://localhost:3000")
 
+    # Agent config cache (seconds). Stale configs are served while refreshing.
+    CONFIG_CACHE_TTL = float(os.getenv("CONFIG_CACHE_TTL", "60"))
+    CONFIG_CACHE_STALE_TTL = float(os.getenv("CONFIG_CACHE_STALE_TTL", "3600"))
+    CONFIG_CACHE_NEGATIVE_TTL = float(os.getenv("CONFIG_CACHE_NEGATIVE_TTL", "30"))
+    # Shared by the worker's job processes, which each start with an empty cache; "" turns it off
+    CONFIG_CACHE_SNAPSHOT = os.getenv(
+        "CONFIG_CACHE_SNAPSHOT", os.path.join(tempfile.gettempdir(), "truvo-agent-configs.json")
+    )
+
+    # Shared HTTP client pool
+    HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20"))
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+
+    # Outbound call resilience: per-host circuit breakers and hedged GETs past observed p95
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # consecutive failures
+    CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "15"))  # seconds before a probe
+    HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "true").lower() == "true"
+    # Breakers and latency samples shared by the worker's job processes
+    RESILIENCE_STATE_DIR = os.getenv("RESILIENCE_STATE_DIR", os.path.join(tempfile.gettempdir(), "truvo-resilience"))
+
     # Cal.com (legacy)
+    CAL_API_URL = os.getenv("CAL_API_URL", "https://api.cal.com")
     CAL_API_KEY = os.getenv("CAL_API_KEY", "")
     CAL_EVENT_TYPE_ID = os.getenv("CAL_EVENT_TYPE_ID", "")
+    BUSINESS_TIMEZONE = os.getenv("BUSINESS_TIMEZONE", "America/New_York")  # Bookings and "today" for callers
+    AVAILABILITY_CACHE_TTL = float(os.getenv("AVAILABILITY_CACHE_TTL", "60"))  # seconds
+    AVAILABILITY_PREFETCH_DAYS = int(os.getenv("AVAILABILITY_PREFETCH_DAYS", "2"))  # on the first availability question
+
+    # Write-behind booking queue (SQLite). Mount a volume here to keep bookings across restarts.
+    BOOKING_QUEUE_DB = os.getenv("BOOKING_QUEUE_DB", os.path.expanduser("~/.truvo/bookings.db"))
+    BOOKING_MAX_ATTEMPTS = int(os.getenv("BOOKING_MAX_ATTEMPTS", "8"))
 
     # Google Calendar
     GOOGLE_SERVICE_ACCOUNT_FILE = os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE", "")
     GOOGLE_CALENDAR_ID = os.getenv("GOOGLE_CALENDAR_ID", "")
+    GOOGLE_CALENDAR_WORKERS = int(os.getenv("GOOGLE_CALENDAR_WORKERS", "4"))  # Threads for blocking API calls
+    GOOGLE_CALENDAR_API_ENDPOINT = os.getenv("GOOGLE_CALENDAR_API_ENDPOINT", "")  # Override, e.g. a local fake
+
+    # Product facts for lookup_product_info, indexed in prewarm (path relative to agent/)
+    KNOWLEDGE_FILE = os.getenv("KNOWLEDGE_FILE", "truvo-site-scrape.json")
+    KNOWLEDGE_TOP_K = int(os.getenv("KNOWLEDGE_TOP_K", "3"))
 
     # Default agent settings (used if API fetch fails)
     DEFAULT_SYSTEM_PROMPT = """You are Sarah, a warm and friendly receptionist at Truvo Properties. You've worked here for 3 years and genuinely enjoy helping people find their perfect home.
@@ -62,3 +103,67 @@ You can check tour availability and book appointments. Collect their name, email
     # Rachel: 21m00Tcm4TlvDq8ikWAM, Bella: EXAVITQu4vr4xnSDxMaL
     # Josh: TxGEqnHWrfWFTfGW9XjX, Adam: pNInz6obpgDQGcFmaJgB
     DEFAULT_VOICE_ID = "iRJijZumQA1KkKmi0Dg6"
+
+    # Number of voices to build TTS clients for in prewarm (default voice first)
+    TTS_WARM_VOICES = int(os.getenv("TTS_WARM_VOICES", "3"))
+
+    # Pre-synthesized greeting audio (raw PCM on local disk, LRU-evicted)
+    GREETING_CACHE_DIR = os.getenv("GREETING_CACHE_DIR", os.path.join(tempfile.gettempdir(), "truvo-greetings"))
+    GREETING_CACHE_MAX_MB = int(os.getenv("GREETING_CACHE_MAX_MB", "64"))
+    # Seconds spent after a call synthesizing missing phrase clips; kept well under
+    # livekit's 10s shutdown_process_timeout, the rest is built after the next call
+    PHRASE_FILL_TIMEOUT = float(os.getenv("PHRASE_FILL_TIMEOUT", "4"))
+
+    # Call recording (opt-in): stereo Opus/OGG streamed to RECORDING_DIR (stand-in for object storage)
+    RECORDING_ENABLED = os.getenv("RECORDING_ENABLED", "false").lower() == "true"
+    RECORDING_DIR = os.getenv("RECORDING_DIR", os.path.join(tempfile.gettempdir(), "truvo-recordings"))
+    # Public prefix RECORDING_DIR is served from; unset, calls are recorded but no recording_url is reported
+    RECORDING_BASE_URL = os.getenv("RECORDING_BASE_URL", "")
+    RECORDING_WORKERS = int(os.getenv("RECORDING_WORKERS", "2"))  # Encoder threads shared by every call
+    RECORDING_SAMPLE_RATE = int(os.getenv("RECORDING_SAMPLE_RATE", "16000"))
+    RECORDING_RING_SECONDS = float(os.getenv("RECORDING_RING_SECONDS", "10"))  # Per-call buffer ahead of the encoder
+
+    # Starting endpointing/interruption delays (seconds); adaptive mode tunes them to each caller.
+    # Off until live response gaps show it helps; bench/endpointing_sim.py compares the two.
+    ENDPOINTING_ADAPTIVE = os.getenv("ENDPOINTING_ADAPTIVE", "false").lower() == "true"
+    MIN_ENDPOINTING_DELAY = float(os.getenv("MIN_ENDPOINTING_DELAY", "0.15"))
+    MAX_ENDPOINTING_DELAY = float(os.getenv("MAX_ENDPOINTING_DELAY", "2.0"))
+    MIN_INTERRUPTION_DURATION = float(os.getenv("MIN_INTERRUPTION_DURATION", "0.1"))
+
+    # Seconds a tool call may run before a cached filler phrase is played
+    TOOL_FILLER_DELAY = float(os.getenv("TOOL_FILLER_DELAY", "0.4"))
+
+    # Per-request context compaction: recent caller turns sent verbatim, older ones summarized
+    CONTEXT_KEEP_TURNS = int(os.getenv("CONTEXT_KEEP_TURNS", "6"))
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))  # History only, excluding instructions
+
+    # Call transcript/event writer. Batches spool to disk while the dashboard is down.
+    CALL_LOG_QUEUE_SIZE = int(os.getenv("CALL_LOG_QUEUE_SIZE", "2000"))
+    CALL_LOG_BATCH_SIZE = int(os.getenv("CALL_LOG_BATCH_SIZE", "50"))
+    CALL_LOG_FLUSH_INTERVAL = float(os.getenv("CALL_LOG_FLUSH_INTERVAL", "1.0"))  # seconds
+    CALL_LOG_SPOOL_DIR = os.getenv("CALL_LOG_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "truvo-call-log"))
+
+    # Worker load reported to LiveKit dispatch; each limit is the point its signal counts as saturated
+    WORKER_LOAD_THRESHOLD = float(os.getenv("WORKER_LOAD_THRESHOLD", "0.75"))  # Refuse jobs above this
+    WORKER_MAX_SESSIONS = int(os.getenv("WORKER_MAX_SESSIONS", "25"))
+    WORKER_MAX_LOOP_LAG_MS = float(os.getenv("WORKER_MAX_LOOP_LAG_MS", "100"))  # Worst job-process p95
+    WORKER_MAX_TURN_DETECTION_CPU = float(os.getenv("WORKER_MAX_TURN_DETECTION_CPU", "0.8"))  # cores
+    WORKER_MAX_MEMORY = float(os.getenv("WORKER_MAX_MEMORY", "0.9"))  # Fraction of RAM in use
+    WORKER_LOAD_STATE_DIR = os.getenv("WORKER_LOAD_STATE_DIR", os.path.join(tempfile.gettempdir(), "truvo-load"))
+    WORKER_DRAIN_TIMEOUT = int(os.getenv("WORKER_DRAIN_TIMEOUT", "1800"))  # seconds to let live calls finish
+
+    # Shared turn-detection service: one model per worker, requests from every job micro-batched
+    TURN_SERVICE_ENABLED = os.getenv("TURN_SERVICE_ENABLED", "true").lower() == "true"
+    TURN_SERVICE_SOCKET = os.getenv("TURN_SERVICE_SOCKET", os.path.join(tempfile.gettempdir(), "truvo-turn.sock"))
+    TURN_BATCH_MAX = int(os.getenv("TURN_BATCH_MAX", "16"))
+    TURN_BATCH_DELAY_MS = float(os.getenv("TURN_BATCH_DELAY_MS", "5"))  # Most a request waits for its batch to fill
+    TURN_SERVICE_THREADS = int(os.getenv("TURN_SERVICE_THREADS", "1"))  # ONNX already spreads one call over cores
+    # Beyond this many queued requests the service refuses new ones. Jobs then use local inference
+    # if the worker has an inference process, and otherwise end the turn on the endpointing delay
+    # alone (counted as fallback_local / fallback_endpointing in the turn-detection stats)
+    TURN_MAX_QUEUE = int(os.getenv("TURN_MAX_QUEUE", "256"))
+
+    # Prometheus-style metrics endpoint, served by the worker for all its job processes
+    METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))  # 0 disables
+    METRICS_STATE_DIR = os.getenv("METRICS_STATE_DIR", os.path.join(tempfile.gettempdir(), "truvo-metrics"))
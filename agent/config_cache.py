@@ -0,0 +1,199 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("truvo-agent")
+
+
+class AgentConfigCache:
+    """Agent config cache with stale-while-revalidate, shared through a snapshot file.
+
+    Fresh entries are served straight from memory. Stale entries are served
+    immediately while a single background refresh runs. Unknown agent IDs are
+    cached as negative entries so a bad room name can't hammer the dashboard.
+
+    Job processes are single-use, so memory alone starts empty on every call.
+    Each fetch is merged into the snapshot file with its fetch time, and a
+    process that has no fresh entry re-reads the snapshot before going to the
+    dashboard. A config another process fetched within ttl is then served
+    as fresh.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float,
+        negative_ttl: float,
+        snapshot_path: str = "",
+    ) -> None:
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl
+        self._negative_ttl = negative_ttl
+        self._snapshot_path = snapshot_path
+
+        # agent_id -> (config or None for unknown IDs, monotonic fetch time)
+        self._entries: dict[str, tuple[Optional[dict], float]] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+        }
+
+    async def get(
+        self,
+        agent_id: str,
+        loader: Callable[[str], Awaitable[Optional[dict]]],
+    ) -> Optional[dict]:
+        """Return the config for agent_id, loading it on a miss.
+
+        The loader returns the config dict, None for an unknown agent, or
+        raises on transport errors. Returns None when the agent is unknown.
+        """
+        entry = self._entries.get(agent_id)
+        if self._snapshot_path and (entry is None or time.monotonic() - entry[1] >= self._ttl):
+            await asyncio.to_thread(self.load_snapshot)  # Another process may have fetched it since
+            entry = self._entries.get(agent_id)
+        if entry is not None:
+            config, fetched_at = entry
+            age = time.monotonic() - fetched_at
+
+            if config is None:
+                if age < self._negative_ttl:
+                    self._counters["negative_hits"] += 1
+                    return None
+            elif age < self._ttl:
+                self._counters["hits"] += 1
+                return config
+            elif age < self._stale_ttl:
+                self._counters["stale_hits"] += 1
+                self._refresh(agent_id, loader)
+                return config
+
+        self._counters["misses"] += 1
+        try:
+            return await asyncio.shield(self._refresh(agent_id, loader))
+        except Exception:
+            # Dashboard is down - an expired config still beats the defaults
+            if entry is not None and entry[0] is not None:
+                return entry[0]
+            raise
+
+    def _refresh(
+        self,
+        agent_id: str,
+        loader: Callable[[str], Awaitable[Optional[dict]]],
+    ) -> asyncio.Task:
+        """Start (or join) the single in-flight load for agent_id."""
+        task = self._inflight.get(agent_id)
+        if task is None:
+            task = asyncio.create_task(self._load(agent_id, loader))
+            self._inflight[agent_id] = task
+            task.add_done_callback(lambda t: self._on_load_done(agent_id, t))
+        return task
+
+    def _on_load_done(self, agent_id: str, task: asyncio.Task) -> None:
+        self._inflight.pop(agent_id, None)
+        # Background refreshes have no awaiter; mark their errors as retrieved
+        if not task.cancelled():
+            task.exception()
+
+    async def _load(
+        self,
+        agent_id: str,
+        loader: Callable[[str], Awaitable[Optional[dict]]],
+    ) -> Optional[dict]:
+        self._counters["refreshes"] += 1
+        try:
+            config = await loader(agent_id)
+        except Exception as e:
+            self._counters["refresh_failures"] += 1
+            logger.warning(f"Agent config refresh failed for {agent_id}: {e}")
+            raise
+
+        self._entries[agent_id] = (config, time.monotonic())
+        if config is not None:
+            await asyncio.to_thread(self._save_snapshot)
+        return config
+
+    def invalidate(self, agent_id: str) -> None:
+        self._entries.pop(agent_id, None)
+
+    def configs(self) -> list[dict]:
+        """All known (non-negative) configs, most recently fetched first."""
+        entries = sorted(self._entries.values(), key=lambda e: e[1], reverse=True)
+        return [config for config, _ in entries if config is not None]
+
+    def stats(self) -> dict:
+        return {
+            **self._counters,
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+        }
+
+    def load_snapshot(self) -> None:
+        """Merge the on-disk snapshot into the cache, if one is configured.
+
+        Each entry keeps its age from the snapshot, so a config fetched
+        moments ago by another process is fresh here too. Entries older than
+        this process's own copy are ignored.
+        """
+        snapshot = self._read_snapshot()
+        now, monotonic_now = time.time(), time.monotonic()
+        loaded = 0
+        for agent_id, (config, fetched_at) in snapshot.items():
+            fetched = monotonic_now - max(0.0, now - fetched_at)
+            entry = self._entries.get(agent_id)
+            if entry is None or entry[1] < fetched:
+                self._entries[agent_id] = (config, fetched)
+                loaded += 1
+        if loaded:
+            logger.info(f"Loaded {loaded} agent configs from snapshot")
+
+    def _read_snapshot(self) -> dict[str, tuple[dict, float]]:
+        """agent_id -> (config, wall-clock fetch time) from the snapshot file."""
+        if not self._snapshot_path or not os.path.exists(self._snapshot_path):
+            return {}
+        try:
+            with open(self._snapshot_path) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable config snapshot: {e}")
+            return {}
+        return {
+            agent_id: (entry["config"], entry["fetched_at"])
+            for agent_id, entry in snapshot.items()
+            if isinstance(entry, dict) and isinstance(entry.get("config"), dict)
+        }
+
+    def _save_snapshot(self) -> None:
+        """Merge this process's configs into the snapshot; the newest fetch of each agent wins."""
+        if not self._snapshot_path:
+            return
+
+        tmp_path = f"{self._snapshot_path}.{os.getpid()}.tmp"  # Job processes write concurrently
+        try:
+            # Held from read to replace, so two writers can't drop each other's entries
+            with open(f"{self._snapshot_path}.lock", "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                now, monotonic_now = time.time(), time.monotonic()
+                snapshot = self._read_snapshot()  # Other processes' entries since we last looked
+                for agent_id, (config, fetched) in list(self._entries.items()):
+                    fetched_at = now - (monotonic_now - fetched)
+                    if config is not None and (agent_id not in snapshot or snapshot[agent_id][1] < fetched_at):
+                        snapshot[agent_id] = (config, fetched_at)
+                with open(tmp_path, "w") as f:
+                    json.dump({
+                        agent_id: {"config": config, "fetched_at": fetched_at}
+                        for agent_id, (config, fetched_at) in snapshot.items()
+                    }, f)
+                os.replace(tmp_path, self._snapshot_path)
+        except OSError as e:
+            logger.warning(f"Failed to write config snapshot: {e}")
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import logging
+import re
+from typing import Optional
+
+from livekit.agents import llm
+
+from speculation import MONTHS, WEEKDAYS
+
+logger = logging.getLogger("truvo-agent")
+
+SUMMARY_PROMPT = """You maintain a running summary of a phone call between a caller and a leasing assistant.
+Update the summary with the new lines. Keep facts the assistant will need later: what the caller wants,
+properties or unit sizes discussed, dates and times offered or chosen, questions still open, and what
+was booked. Write at most 5 short sentences. Reply with the summary only."""
+
+# Booking details pinned from tool calls and caller speech, in display order
+SLOT_FIELDS = ("name", "email", "phone", "date", "time", "preferred_time")
+BOOKING_TOOLS = ("check_availability", "book_tour", "book_demo")
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")
+PHONE_RE = re.compile(r"(?:\+?1[\s.-]?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}")
+NAME_RE = re.compile(r"\b(?i:my name is|this is|i'm|i am)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)")
+# Capitalized words that follow "this is" / "I'm" without being a name
+NOT_NAMES = {
+    *WEEKDAYS, *MONTHS, *(m[:3] for m in MONTHS),
+    "today", "tomorrow", "tonight", "morning", "afternoon", "evening", "weekend",
+    "just", "not", "still", "also", "actually", "really", "very", "so", "here", "there",
+    "calling", "looking", "interested", "wondering", "hoping", "trying", "thinking", "going", "gonna",
+    "good", "fine", "great", "okay", "ok", "sure", "sorry", "ready", "free", "available", "new",
+    "right", "correct", "perfect", "yes", "yeah", "no", "the", "a", "an", "it", "that", "in", "at", "on",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _item_text(item: llm.ChatItem) -> str:
+    if isinstance(item, llm.ChatMessage):
+        return item.text_content or ""
+    if isinstance(item, llm.FunctionCall):
+        return f"{item.name}({item.arguments})"
+    if isinstance(item, llm.FunctionCallOutput):
+        return item.output
+    return ""
+
+
+class ContextCompactor:
+    """Keeps each LLM request within a fixed token budget on long calls.
+
+    The instructions and the last keep_turns caller turns are sent verbatim.
+    Older items are replaced by a running summary, which the summarizer LLM
+    updates in the background after the agent finishes speaking. Items are
+    only dropped once the summary covers them. Booking details (name, email,
+    date, time...) are pinned from tool calls and caller speech and always
+    sent; the latest mention of a detail, spoken or in a tool call, wins.
+    """
+
+    def __init__(self, summarizer: llm.LLM, keep_turns: int = 6, token_budget: int = 1200) -> None:
+        self._summarizer = summarizer
+        self._keep_turns = keep_turns
+        self._token_budget = token_budget
+        self._summary = ""
+        self._summarized_through: Optional[str] = None  # id of the last item folded into the summary
+        self._summary_task: Optional[asyncio.Task] = None
+        self.pinned: dict[str, str] = {}
+        self._stats = {"summaries": 0, "summary_failures": 0, "compacted_turns": 0, "prompt_tokens": []}
+
+    def compact(self, chat_ctx: llm.ChatContext) -> llm.ChatContext:
+        """Return the context to send this turn. The session's own history is untouched."""
+        items = chat_ctx.items
+        self._pin_slots(items)
+        head = [item for item in items if _is_instructions(item)]
+        history = [item for item in items if not _is_instructions(item)]
+
+        cut = min(self._covered_count(history), self._window_start(history))
+        kept = history[cut:]
+
+        note = self._context_note()
+        compacted = chat_ctx.copy()
+        compacted.items[:] = head
+        if note:
+            compacted.add_message(role="system", content=note)
+        compacted.items.extend(kept)
+
+        tokens = sum(estimate_tokens(_item_text(item)) for item in compacted.items)
+        self._stats["prompt_tokens"].append(tokens)
+        if cut:
+            self._stats["compacted_turns"] += 1
+        return compacted
+
+    def summarize_in_background(self, chat_ctx: llm.ChatContext) -> None:
+        """Fold items that have left the verbatim window into the summary. Call between turns."""
+        if self._summary_task is not None and not self._summary_task.done():
+            return
+        history = [item for item in chat_ctx.items if not _is_instructions(item)]
+        start, end = self._covered_count(history), self._window_start(history)
+        if end <= start:
+            return
+        self._summary_task = asyncio.create_task(self._summarize(history[start:end]))
+
+    async def aclose(self) -> None:
+        if self._summary_task is not None and not self._summary_task.done():
+            self._summary_task.cancel()
+
+    def stats(self) -> dict:
+        prompt_tokens = self._stats["prompt_tokens"]
+        return {
+            "summaries": self._stats["summaries"],
+            "summary_failures": self._stats["summary_failures"],
+            "compacted_turns": self._stats["compacted_turns"],
+            "prompt_tokens_first": prompt_tokens[0] if prompt_tokens else 0,
+            "prompt_tokens_max": max(prompt_tokens, default=0),
+            "prompt_tokens_last": prompt_tokens[-1] if prompt_tokens else 0,
+            "pinned": len(self.pinned),
+        }
+
+    def _window_start(self, history: list[llm.ChatItem]) -> int:
+        """Index where the verbatim window starts: the last keep_turns caller turns, within budget."""
+        turn_starts = [i for i, item in enumerate(history) if isinstance(item, llm.ChatMessage) and item.role == "user"]
+        keep = self._keep_turns
+        while keep > 1 and len(turn_starts) >= keep:
+            start = turn_starts[-keep]
+            if sum(estimate_tokens(_item_text(item)) for item in history[start:]) <= self._token_budget:
+                return start
+            keep -= 1
+        if len(turn_starts) < keep:
+            return 0
+        return turn_starts[-keep]
+
+    def _covered_count(self, history: list[llm.ChatItem]) -> int:
+        """Number of leading history items the summary already covers."""
+        if self._summarized_through is None:
+            return 0
+        for i, item in enumerate(history):
+            if item.id == self._summarized_through:
+                return i + 1
+        return 0  # Summarized items no longer in this context; send it all
+
+    def _context_note(self) -> str:
+        parts = []
+        if self._summary:
+            parts.append(f"Summary of the call so far: {self._summary}")
+        if self.pinned:
+            details = ", ".join(f"{field}: {self.pinned[field]}" for field in SLOT_FIELDS if field in self.pinned)
+            parts.append(f"Booking details collected so far (keep using these): {details}")
+        return "\n".join(parts)
+
+    def _pin_slots(self, items: list[llm.ChatItem]) -> None:
+        for item in items:
+            if isinstance(item, llm.FunctionCall) and item.name in BOOKING_TOOLS:
+                try:
+                    args = json.loads(item.arguments or "{}")
+                except ValueError:
+                    continue
+                for field in SLOT_FIELDS:
+                    if args.get(field):
+                        self.pinned[field] = str(args[field])
+            elif isinstance(item, llm.ChatMessage) and item.role == "user":
+                text = item.text_content or ""
+                if match := EMAIL_RE.search(text):
+                    self.pinned["email"] = match.group(0)
+                if match := PHONE_RE.search(text):
+                    self.pinned["phone"] = match.group(0)
+                if name := _spoken_name(text):
+                    self.pinned["name"] = name
+
+    async def _summarize(self, items: list[llm.ChatItem]) -> None:
+        lines = []
+        for item in items:
+            if isinstance(item, llm.ChatMessage):
+                speaker = "Caller" if item.role == "user" else "Assistant"
+                lines.append(f"{speaker}: {item.text_content or ''}")
+            elif isinstance(item, llm.FunctionCallOutput):
+                lines.append(f"Tool {item.name} returned: {item.output}")
+
+        ctx = llm.ChatContext()
+        ctx.add_message(role="system", content=SUMMARY_PROMPT)
+        ctx.add_message(
+            role="user",
+            content=f"Current summary: {self._summary or '(none)'}\n\nNew lines:\n" + "\n".join(lines),
+        )
+        try:
+            summary = ""
+            async with self._summarizer.chat(chat_ctx=ctx) as stream:
+                async for chunk in stream:
+                    if chunk.delta and chunk.delta.content:
+                        summary += chunk.delta.content
+        except Exception as e:
+            self._stats["summary_failures"] += 1
+            logger.warning(f"Context summary failed: {e}")
+            return
+
+        if summary.strip():
+            self._summary = summary.strip()
+            self._summarized_through = items[-1].id
+            self._stats["summaries"] += 1
+
+
+def _spoken_name(text: str) -> Optional[str]:
+    """The last name the caller gives in text ("I'm Dana Smith"), if any."""
+    name = None
+    for match in NAME_RE.finditer(text):
+        words = match.group(1).split()
+        if words[0].lower() in NOT_NAMES:
+            continue
+        if len(words) > 1 and words[1].lower() in NOT_NAMES:
+            words = words[:1]
+        name = " ".join(words)
+    return name
+
+
+def _is_instructions(item: llm.ChatItem) -> bool:
+    return isinstance(item, llm.ChatMessage) and item.role in ("system", "developer")
@@ -0,0 +1,184 @@
+import logging
+from collections import Counter, deque
+from typing import Optional
+
+from livekit.agents import AgentSession
+
+from turn_metrics import MetricsRegistry, percentile
+
+logger = logging.getLogger("truvo-agent")
+
+# Process-wide endpointing outcomes, exported with the other per-call stats
+endpointing_totals: Counter = Counter()
+
+
+class EndpointingController:
+    """Learns a caller's pauses during the call and tunes endpointing to them.
+
+    A pause is the silence between two stretches of caller speech that
+    belong to one turn: either the caller resumed before the agent replied,
+    or resumed within resume_window of the reply starting, which means the
+    agent cut them off (an early endpoint). Once min_samples pauses are in:
+      - max_delay, the wait when the turn detector thinks the caller isn't
+        done, follows 1.5x their p95 pause, so a caller whose pauses are
+        short stops waiting the full default. After a recent cut-off it
+        covers their longest recent pause instead, so a slow talker's long
+        pauses relax it back toward the default.
+      - min_interruption_duration rises after each false interruption (noise
+        or a backchannel stopping the agent) and eases back on clean turns
+    min_delay, the floor every reply waits, is never raised, and max_delay
+    never goes past its configured value, so adapting can only shorten a
+    reply. With adaptive=False nothing is changed but the same stats are
+    kept, for comparing against fixed delays.
+    """
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        min_delay: float,
+        max_delay: float,
+        min_interruption: float,
+        adaptive: bool = False,
+        max_delay_floor: float = 0.8,
+        max_pause: float = 3.0,
+        interruption_bounds: tuple[float, float] = (0.1, 0.6),
+        min_samples: int = 3,
+        resume_window: float = 1.0,
+        window: int = 30,
+    ) -> None:
+        self._registry = registry
+        self.adaptive = adaptive
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_interruption = min_interruption
+        self._base_interruption = min_interruption
+        self._base_max_delay = max_delay
+        self._max_delay_floor = min(max_delay_floor, max_delay)
+        self._max_pause = max_pause
+        self._interruption_bounds = interruption_bounds
+        self._min_samples = min_samples
+        self._resume_window = resume_window
+        self._pauses: deque = deque(maxlen=window)
+        self._recent_cutoffs: deque = deque(maxlen=5)   # 1 per turn that ended in a cut-off
+        self._gaps: list[float] = []
+        self._session: Optional[AgentSession] = None
+        self._user_stopped_at: Optional[float] = None
+        self._reply_started_at: Optional[float] = None
+        self._agent_speaking = False
+        self._applied = (round(min_delay, 2), round(max_delay, 2), round(min_interruption, 2))
+        self._counters = Counter()
+
+    def attach(self, session: AgentSession) -> None:
+        self._session = session
+        session.on("user_state_changed", self._on_user_state)
+        session.on("agent_state_changed", self._on_agent_state)
+        session.on("agent_false_interruption", self._on_false_interruption)
+
+    def stats(self) -> dict:
+        pauses = list(self._pauses)
+
+        def ms(values: list[float], pct: float) -> Optional[int]:
+            return round(percentile(values, pct) * 1000) if values else None
+
+        return {
+            **self._counters,
+            "adaptive": self.adaptive,
+            "pause_p50_ms": ms(pauses, 50),
+            "pause_p95_ms": ms(pauses, 95),
+            "response_gap_p50_ms": ms(self._gaps, 50),
+            "response_gap_p95_ms": ms(self._gaps, 95),
+            "min_delay_ms": round(self.min_delay * 1000),
+            "max_delay_ms": round(self.max_delay * 1000),
+            "min_interruption_ms": round(self.min_interruption * 1000),
+        }
+
+    def _count(self, key: str) -> None:
+        self._counters[key] += 1
+        endpointing_totals[key] += 1
+
+    def _on_user_state(self, ev) -> None:
+        if ev.new_state == "speaking":
+            self._on_user_speaking(ev.created_at)
+        elif ev.old_state == "speaking" and ev.new_state == "listening":
+            self._user_stopped_at = ev.created_at
+            self._reply_started_at = None
+
+    def _on_user_speaking(self, now: float) -> None:
+        if self._agent_speaking:
+            self._count("interruptions")
+        if self._user_stopped_at is not None:
+            pause = now - self._user_stopped_at
+            if self._reply_started_at is None:
+                if pause <= self._max_pause:  # Longer means the caller moved on, not paused
+                    self._pauses.append(pause)
+                    self._count("pauses")
+                    self._adapt()
+            elif now - self._reply_started_at <= self._resume_window:
+                self._pauses.append(pause)
+                self._recent_cutoffs.append(1)
+                self._count("early_endpoints")
+                self._adapt()
+        self._user_stopped_at = None
+        self._reply_started_at = None
+
+    def _on_agent_state(self, ev) -> None:
+        self._agent_speaking = ev.new_state == "speaking"
+        if ev.new_state != "speaking" or self._user_stopped_at is None or self._reply_started_at is not None:
+            return
+        self._reply_started_at = ev.created_at
+        gap = ev.created_at - self._user_stopped_at
+        self._gaps.append(gap)
+        self._registry.observe(
+            "truvo_response_gap_seconds", gap, "Caller stops speaking to agent audio, by endpointing mode",
+            mode="adaptive" if self.adaptive else "fixed",
+        )
+        self._recent_cutoffs.append(0)
+        if self.min_interruption > self._base_interruption:
+            self.min_interruption = max(self._base_interruption, self.min_interruption - 0.02)
+            self._apply()
+
+    def _on_false_interruption(self, ev) -> None:
+        self._count("false_interruptions")
+        if not self.adaptive:
+            return
+        self.min_interruption = min(self._interruption_bounds[1], self.min_interruption + 0.1)
+        self._apply()
+
+    def _adapt(self) -> None:
+        if not self.adaptive or len(self._pauses) < self._min_samples:
+            return
+        pauses = list(self._pauses)
+        if any(self._recent_cutoffs):
+            target = max(pauses) * 1.5  # We cut them off: wait out their long pauses again
+        else:
+            target = percentile(pauses, 95) * 1.5
+        bounds = (max(self._max_delay_floor, self.min_delay), self._base_max_delay)
+        self.max_delay = _clamp(target, bounds)
+        self._apply()
+
+    def _apply(self) -> None:
+        if self._session is None:
+            return
+        applied = (round(self.min_delay, 2), round(self.max_delay, 2), round(self.min_interruption, 2))
+        if applied == self._applied:
+            return
+        self._applied = applied
+        self._count("updates")
+        logger.debug(f"Endpointing now min {self.min_delay:.2f}s, max {self.max_delay:.2f}s, "
+                     f"interruption {self.min_interruption:.2f}s")
+        try:
+            self._session.update_options(endpointing_opts={"min_delay": self.min_delay, "max_delay": self.max_delay})
+        except TypeError:  # livekit-agents releases before endpointing_opts
+            self._session.update_options(min_endpointing_delay=self.min_delay, max_endpointing_delay=self.max_delay)
+
+        # There is no setter for this one; the session reads it on every VAD event
+        options = self._session.options
+        interruption = getattr(options, "interruption", None)
+        if isinstance(interruption, dict):
+            interruption["min_duration"] = self.min_interruption
+        elif hasattr(options, "min_interruption_duration"):
+            options.min_interruption_duration = self.min_interruption
+
+
+def _clamp(value: float, bounds: tuple[float, float]) -> float:
+    return min(bounds[1], max(bounds[0], value))
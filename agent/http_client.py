@@ -0,0 +1,170 @@
+import logging
+from typing import Optional
+
+import httpx
+
+from config import Config
+from resilience import ResiliencePolicy
+
+logger = logging.getLogger("truvo-agent")
+
+# Per-tool timeout budgets. Connect is kept short so a dead host fails fast.
+TOOL_TIMEOUTS = {
+    "fetch_agent_config": httpx.Timeout(5.0, connect=2.0),
+    "check_availability": httpx.Timeout(10.0, connect=3.0),
+    "book_tour": httpx.Timeout(15.0, connect=3.0),
+    "call_events": httpx.Timeout(5.0, connect=2.0),
+}
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+
+# Total seconds a call may take, hedged retry included, before the tool falls back.
+# Kept well under the per-attempt timeouts for anything a caller is waiting on.
+TOOL_BUDGETS = {
+    "fetch_agent_config": 2.0,
+    "check_availability": 3.0,
+    "book_tour": 15.0,       # Submitted in the background by the booking queue
+    "call_events": 5.0,
+    "call_summary": 5.0,
+}
+
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class HttpClientPool:
+    """Process-wide pooled HTTP clients, one keep-alive pool per host.
+
+    Tools go through request() instead of opening an AsyncClient per call, so
+    a live conversation turn reuses warm TCP/TLS (and HTTP/2) connections.
+    """
+
+    def __init__(
+        self,
+        max_connections_per_host: int = 20,
+        max_keepalive_per_host: Optional[int] = None,
+        keepalive_expiry: float = 60.0,
+        http2: bool = True,
+        resilience: Optional[ResiliencePolicy] = None,
+    ) -> None:
+        self._resilience = resilience
+        self._limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            # Below max_connections, a burst closes connections as they free up and reopens them
+            max_keepalive_connections=max_keepalive_per_host or max_connections_per_host,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._http2 = http2 and _h2_available()
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._inflight: dict[str, int] = {}
+        self._requests: dict[str, int] = {}
+        self._errors: dict[str, int] = {}
+
+    def start(self, base_urls: list[str]) -> None:
+        """Create the pools for the hosts we know we'll talk to."""
+        for url in base_urls:
+            if url:
+                self.client(url)
+        logger.info(f"HTTP client pool ready for {list(self._clients)} (http2={self._http2})")
+
+    def client(self, url: str) -> httpx.AsyncClient:
+        """Return the shared client for url's host, creating it if needed."""
+        host = _origin(url)
+        client = self._clients.get(host)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=self._limits,
+                http2=self._http2,
+                timeout=DEFAULT_TIMEOUT,
+            )
+            self._clients[host] = client
+        return client
+
+    async def request(
+        self,
+        tool: str,
+        method: str,
+        url: str,
+        timeout: Optional[httpx.Timeout] = None,
+        **kwargs,
+    ) -> httpx.Response:
+        """Send a request on the pooled client, within the tool's timeout and latency budget."""
+        host = _origin(url)
+        client = self.client(url)
+
+        async def send() -> httpx.Response:
+            self._inflight[host] = self._inflight.get(host, 0) + 1
+            self._requests[host] = self._requests.get(host, 0) + 1
+            try:
+                return await client.request(
+                    method,
+                    url,
+                    timeout=timeout or TOOL_TIMEOUTS.get(tool, DEFAULT_TIMEOUT),
+                    **kwargs,
+                )
+            except httpx.HTTPError:
+                self._errors[host] = self._errors.get(host, 0) + 1
+                raise
+            finally:
+                self._inflight[host] -= 1
+
+        if self._resilience is None:
+            return await send()
+        return await self._resilience.call(tool, host, method.upper() in IDEMPOTENT_METHODS, send)
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+        if self._resilience is not None:
+            await self._resilience.aclose()  # Writes breaker changes not yet shared
+
+    def stats(self) -> dict:
+        """Per-host pool utilisation: open/idle connections and request counts."""
+        stats = {}
+        for host, client in self._clients.items():
+            connections = _pool_connections(client)
+            idle = sum(1 for conn in connections if conn.is_idle())
+            stats[host] = {
+                "connections": len(connections),
+                "idle": idle,
+                "active": len(connections) - idle,
+                "max_connections": self._limits.max_connections,
+                "inflight": self._inflight.get(host, 0),
+                "requests": self._requests.get(host, 0),
+                "errors": self._errors.get(host, 0),
+            }
+        return stats
+
+
+def _origin(url: str) -> str:
+    parsed = httpx.URL(url)
+    return f"{parsed.scheme}://{parsed.netloc.decode()}"
+
+
+def _pool_connections(client: httpx.AsyncClient) -> list:
+    # httpx doesn't expose its pool; read httpcore's connection list if present
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    return list(getattr(pool, "connections", []))
+
+
+def _h2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("h2 not installed; HTTP client pool falling back to HTTP/1.1")
+        return False
+    return True
+
+
+resilience = ResiliencePolicy(
+    budgets=TOOL_BUDGETS,
+    failure_threshold=Config.CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=Config.CIRCUIT_RESET_TIMEOUT,
+    hedging=Config.HEDGING_ENABLED,
+    state_dir=Config.RESILIENCE_STATE_DIR,
+)
+
+http_pool = HttpClientPool(
+    max_connections_per_host=Config.HTTP_MAX_CONNECTIONS_PER_HOST,
+    http2=Config.HTTP2_ENABLED,
+    resilience=resilience,
+)
@@ -0,0 +1,135 @@
+import json
+import logging
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+logger = logging.getLogger("truvo-agent")
+
+# Words too common in the scrape and in callers' questions to rank on
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it of on or our the to "
+    "what which with you your we us".split()
+)
+
+# Human-readable labels for scrape sections, prefixed to each snippet
+SECTION_LABELS = {
+    "gettruvo_product_features": "Feature",
+    "gettruvo_service_offerings": "Service",
+    "gettruvo_pricing": "Pricing",
+    "gettruvo_company_details": "Company",
+}
+
+
+@dataclass
+class Snippet:
+    text: str
+    section: str
+    citations: list[str]
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        if word in STOPWORDS:
+            continue
+        # Cheap plural folding so "integrations" matches "integrates"/"integration"
+        if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def load_snippets(path: str) -> list[Snippet]:
+    """Flatten the site scrape into one snippet per fact, merging duplicate facts."""
+    with open(path) as f:
+        scrape = json.load(f)
+
+    snippets: dict[str, Snippet] = {}
+
+    def add(text: str, section: str, citation) -> None:
+        key = " ".join(tokenize(text))
+        snippet = snippets.get(key)
+        if snippet is None:
+            snippets[key] = snippet = Snippet(f"{SECTION_LABELS.get(section, section)}: {text}", section, [])
+        if citation and citation not in snippet.citations:
+            snippet.citations.append(citation)
+
+    for section, value in scrape.items():
+        if isinstance(value, list):
+            for item in value:
+                if item.get("value"):
+                    add(item["value"], section, item.get("value_citation"))
+        elif isinstance(value, dict):
+            for field, field_value in value.items():
+                if field.endswith("_citation") or field_value is None:
+                    continue
+                add(f"{field.replace('_', ' ')} is {field_value}", section, value.get(f"{field}_citation"))
+    return list(snippets.values())
+
+
+class KnowledgeIndex:
+    """In-memory BM25 keyword index over product facts.
+
+    Built once per process in prewarm; search() is pure Python over a few
+    hundred short snippets, so a lookup takes well under a millisecond.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75) -> None:
+        self._k1 = k1
+        self._b = b
+        self._snippets: list[Snippet] = []
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._idf: dict[str, float] = {}
+        self._doc_lengths: list[int] = []
+        self._avg_length = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self._snippets)
+
+    def load(self, path: str) -> None:
+        try:
+            self.build(load_snippets(path))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load product knowledge from {path}: {e}")
+            return
+        logger.info(f"Product knowledge index built: {len(self._snippets)} snippets, {len(self._postings)} terms")
+
+    def build(self, snippets: list[Snippet]) -> None:
+        postings: dict[str, list[tuple[int, int]]] = {}
+        doc_lengths = []
+        for doc_id, snippet in enumerate(snippets):
+            terms = Counter(tokenize(snippet.text))
+            doc_lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        total = len(snippets)
+        self._idf = {
+            term: math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in postings.items()
+        }
+        self._snippets = snippets
+        self._postings = postings
+        self._doc_lengths = doc_lengths
+        self._avg_length = sum(doc_lengths) / total if total else 0.0
+
+    def search(self, query: str, k: int = 3) -> list[tuple[float, Snippet]]:
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self._postings[term]:
+                norm = self._k1 * (1 - self._b + self._b * self._doc_lengths[doc_id] / self._avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self._k1 + 1) / (tf + norm)
+        top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+        return [(score, self._snippets[doc_id]) for doc_id, score in top]
+
+    def stats(self) -> dict:
+        return {"snippets": len(self._snippets), "terms": len(self._postings)}
+
+
+knowledge_index = KnowledgeIndex()
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import random
+import time
+from typing import AsyncIterator, Optional
+
+from livekit.agents import NOT_GIVEN, APIConnectOptions, llm
+
+logger = logging.getLogger("truvo-agent")
+
+
+class LLMBackend:
+    """One provider/model with its running time-to-first-token and error rate."""
+
+    def __init__(self, name: str, client: llm.LLM, alpha: float) -> None:
+        self.name = name
+        self.client = client
+        self._alpha = alpha
+        self.ttft: Optional[float] = None  # EWMA seconds; None until the first sample
+        self.error_rate = 0.0              # EWMA of failed turns
+        self.observed_at = 0.0             # Last success or failure
+        self.unhealthy_until = 0.0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+    def record_ttft(self, seconds: float) -> None:
+        self.ttft = seconds if self.ttft is None else self._alpha * seconds + (1 - self._alpha) * self.ttft
+        self.error_rate *= 1 - self._alpha
+        self.observed_at = time.monotonic()
+
+    def record_error(self, cooldown_threshold: float, cooldown: float) -> None:
+        self.error_rate = self._alpha + (1 - self._alpha) * self.error_rate
+        self.observed_at = time.monotonic()
+        if self.error_rate >= cooldown_threshold and self.healthy(time.monotonic()):
+            self.unhealthy_until = time.monotonic() + cooldown
+            logger.warning(f"LLM backend {self.name} marked unhealthy for {cooldown:.0f}s "
+                           f"(error rate {self.error_rate:.2f})")
+
+
+class LLMRouter:
+    """Sends each turn to the backend with the lowest expected time-to-first-token.
+
+    Backends are ranked by their EWMA TTFT, inflated by their error rate. An
+    estimate not refreshed within stale_after is forgotten, and backends
+    without one go first, so a provider that lost once is measured again
+    rather than judged forever on an old sample. A small share of turns also
+    explores another backend. A backend whose error rate crosses the threshold
+    sits out for a cooldown. Failures before the first token fail over to the
+    next backend, since nothing has been spoken yet. With race=True the two
+    best backends both get the turn and the first to produce a token wins; the
+    other is cancelled.
+    """
+
+    def __init__(
+        self,
+        backends: list[tuple[str, llm.LLM]],
+        race: bool = False,
+        first_token_timeout: float = 4.0,
+        alpha: float = 0.3,
+        explore: float = 0.05,
+        error_threshold: float = 0.5,
+        cooldown: float = 30.0,
+        stale_after: float = 60.0,
+    ) -> None:
+        self.backends = [LLMBackend(name, client, alpha) for name, client in backends]
+        self._race = race
+        self._first_token_timeout = first_token_timeout
+        self._explore = explore
+        self._error_threshold = error_threshold
+        self._cooldown = cooldown
+        self._stale_after = stale_after
+        self._counters: dict[str, dict[str, int]] = {"routed": {}, "race_wins": {}, "failovers": {}}
+
+    def ranked(self) -> list[LLMBackend]:
+        """Healthy backends best first, then unhealthy ones as a last resort."""
+        now = time.monotonic()
+        for backend in self.backends:
+            if now - backend.observed_at > self._stale_after:
+                backend.ttft = None  # Too old to trust; the next turn re-measures it
+
+        def score(backend: LLMBackend) -> float:
+            if backend.ttft is None:
+                return -1.0
+            return backend.ttft * (1 + 4 * backend.error_rate)
+
+        healthy = sorted((b for b in self.backends if b.healthy(now)), key=score)
+        if len(healthy) > 1 and random.random() < self._explore:
+            healthy.insert(0, healthy.pop(random.randrange(1, len(healthy))))
+        sick = sorted((b for b in self.backends if not b.healthy(now)), key=lambda b: b.unhealthy_until)
+        return healthy + sick
+
+    async def chat(
+        self,
+        chat_ctx: llm.ChatContext,
+        tools: list,
+        tool_choice=NOT_GIVEN,
+        conn_options: Optional[APIConnectOptions] = None,
+    ) -> AsyncIterator[llm.ChatChunk]:
+        """Stream one turn from the routed backend."""
+        kwargs = {"chat_ctx": chat_ctx, "tools": tools, "tool_choice": tool_choice}
+        if conn_options is not None:
+            kwargs["conn_options"] = conn_options
+
+        ranked = self.ranked()
+        if self._race and len(ranked) > 1 and ranked[1].healthy(time.monotonic()):
+            backend, stream, first = await self._race_first(ranked[:2], kwargs)
+        else:
+            backend, stream, first = await self._first_with_failover(ranked, kwargs)
+        self._count("routed", backend.name)
+
+        try:
+            if first is None:
+                return
+            yield first
+            async for chunk in stream:
+                yield chunk
+        except Exception:
+            backend.record_error(self._error_threshold, self._cooldown)
+            raise
+        finally:
+            await stream.aclose()
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "ttft_ms": {b.name: round(b.ttft * 1000, 1) for b in self.backends if b.ttft is not None},
+            "error_rate": {b.name: round(b.error_rate, 3) for b in self.backends},
+            "healthy": {b.name: int(b.healthy(now)) for b in self.backends},
+            **{name: dict(values) for name, values in self._counters.items()},
+        }
+
+    async def _first_with_failover(self, ranked: list[LLMBackend], kwargs: dict):
+        error: Optional[BaseException] = None
+        for backend in ranked:
+            stream = backend.client.chat(**kwargs)
+            started = time.perf_counter()
+            try:
+                first = await asyncio.wait_for(_first_chunk(stream), self._first_token_timeout)
+            except Exception as e:
+                await stream.aclose()
+                backend.record_error(self._error_threshold, self._cooldown)
+                self._count("failovers", backend.name)
+                logger.warning(f"LLM backend {backend.name} failed before first token: {e!r}")
+                error = e
+                continue
+            backend.record_ttft(time.perf_counter() - started)
+            return backend, stream, first
+        raise error
+
+    async def _race_first(self, contenders: list[LLMBackend], kwargs: dict):
+        attempts = {}
+        for backend in contenders:
+            stream = backend.client.chat(**kwargs)
+            task = asyncio.ensure_future(asyncio.wait_for(_first_chunk(stream), self._first_token_timeout))
+            attempts[task] = (backend, stream, time.perf_counter())
+
+        winner = None
+        error: Optional[BaseException] = None
+        try:
+            pending = set(attempts)
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    backend, _, started = attempts[task]
+                    if task.exception() is not None:
+                        error = task.exception()
+                        backend.record_error(self._error_threshold, self._cooldown)
+                    elif winner is None:
+                        winner = task
+                        backend.record_ttft(time.perf_counter() - started)
+        finally:
+            for task, (_, stream, _) in attempts.items():
+                if task is not winner:
+                    task.cancel()  # The losing provider stops generating
+                    await stream.aclose()
+
+        if winner is None:
+            raise error
+        backend, stream, _ = attempts[winner]
+        self._count("race_wins", backend.name)
+        return backend, stream, winner.result()
+
+    def _count(self, counter: str, key: str) -> None:
+        values = self._counters[counter]
+        values[key] = values.get(key, 0) + 1
+
+
+async def _first_chunk(stream: llm.LLMStream) -> Optional[llm.ChatChunk]:
+    async for chunk in stream:
+        return chunk
+    return None
@@ -0,0 +1,231 @@
+import asyncio
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import psutil
+from livekit.agents import JobRequest
+from livekit.agents.utils.hw import get_cpu_monitor
+
+from turn_metrics import percentile
+
+logger = logging.getLogger("truvo-agent")
+
+
+class ProcessLoadReporter:
+    """Publishes this job process's event-loop lag and live sessions for the worker.
+
+    Jobs run in their own processes, so the worker's load monitor can't see
+    their event loops. Each job process samples how late its loop wakes a
+    sleeping task and writes the p95, with its session count, to a small JSON
+    file in state_dir about once a second.
+    """
+
+    def __init__(self, state_dir: str, interval: float = 0.1, publish_every: float = 1.0) -> None:
+        self._state_dir = state_dir
+        self._interval = interval
+        self._publish_every = publish_every
+        self._path = os.path.join(state_dir, f"{os.getpid()}.json")
+        self._lag_ms: deque = deque(maxlen=max(1, int(5.0 / interval)))  # last ~5 s
+        self._sessions = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start sampling (needs a running loop). Safe to call once per job."""
+        if self._task is not None and not self._task.done():
+            return
+        os.makedirs(self._state_dir, exist_ok=True)
+        self._path = os.path.join(self._state_dir, f"{os.getpid()}.json")
+        atexit.register(self._remove)
+        self._task = asyncio.create_task(self._run())
+
+    def session_started(self) -> None:
+        self._sessions += 1
+
+    def session_ended(self) -> None:
+        self._sessions = max(0, self._sessions - 1)
+
+    def stats(self) -> dict:
+        return {"sessions": self._sessions, "loop_lag_p95_ms": self._lag_p95()}
+
+    def _lag_p95(self) -> float:
+        return round(percentile(list(self._lag_ms), 95), 1) if self._lag_ms else 0.0
+
+    async def _run(self) -> None:
+        last_publish = 0.0
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            self._lag_ms.append(max(0.0, (time.perf_counter() - started - self._interval) * 1000))
+            if started - last_publish >= self._publish_every:
+                last_publish = started
+                self._publish()
+
+    def _publish(self) -> None:
+        state = {"pid": os.getpid(), "updated_at": time.time(), **self.stats()}
+        tmp_path = f"{self._path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self._path)  # Readers never see a half-written file
+        except OSError as e:
+            logger.warning(f"Failed to publish process load: {e}")
+
+    def _remove(self) -> None:
+        try:
+            os.remove(self._path)
+        except OSError:
+            pass
+
+
+class WorkerLoadMonitor:
+    """Worker load for LiveKit dispatch, from the signals that actually degrade calls.
+
+    Runs in the main worker process. A background thread combines, each
+    normalized so 1.0 means saturated:
+      - CPU of the worker's cgroup or host
+      - CPU of the turn-detection service (or, without it, LiveKit's
+        inference process), in cores; it saturates long before the host is busy
+      - worst event-loop lag p95 reported by the job processes
+      - live sessions against max_sessions
+      - memory in use
+    The load is the highest of these, so any one saturated resource marks the
+    worker full. LiveKit stops dispatching above load_threshold; request_fnc
+    also refuses jobs that arrive between load updates. While draining the
+    worker reports full load.
+    """
+
+    def __init__(
+        self,
+        state_dir: str,
+        threshold: float = 0.75,
+        max_sessions: int = 25,
+        max_loop_lag_ms: float = 100.0,
+        max_turn_detection_cpu: float = 0.8,
+        max_memory: float = 0.9,
+        sample_interval: float = 0.5,
+        stale_after: float = 5.0,
+    ) -> None:
+        self._state_dir = state_dir
+        self.threshold = threshold
+        self._limits = {
+            "sessions": float(max_sessions),
+            "loop_lag_ms": max_loop_lag_ms,
+            "turn_detection_cpu": max_turn_detection_cpu,
+            "memory": max_memory,
+            "cpu": 1.0,
+        }
+        self._sample_interval = sample_interval
+        self._stale_after = stale_after
+        self._server = None
+        self._components: dict[str, float] = {}
+        self._load = 0.0
+        self._refused = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._inference_proc: Optional[psutil.Process] = None
+        self._turn_detection_pid: Optional[int] = None
+
+    def load(self, server=None) -> float:
+        """load_fnc for WorkerOptions. LiveKit calls it from a thread every 0.5 s."""
+        if server is not None:
+            self._server = server
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._sample_forever, daemon=True, name="truvo-load-monitor")
+            self._thread.start()
+        if self._server is not None and getattr(self._server, "draining", False):
+            return 1.0
+        with self._lock:
+            return self._load
+
+    async def request_fnc(self, req: JobRequest) -> None:
+        """Accept the job unless the worker is already over its threshold."""
+        load = self.load()
+        if load >= self.threshold:
+            self._refused += 1
+            logger.warning(f"Refusing job {req.id}: load {load:.2f} >= {self.threshold} ({self.components()})")
+            await req.reject(terminate=False)  # Let the server offer it to another worker
+            return
+        await req.accept()
+
+    def watch_turn_detection(self, pid: int) -> None:
+        """Count this process's CPU as turn detection instead of LiveKit's inference process."""
+        self._turn_detection_pid = pid
+
+    def components(self) -> dict:
+        with self._lock:
+            return dict(self._components)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"load": round(self._load, 3), "refused": self._refused, "components": dict(self._components)}
+
+    def sample(self, cpu: float) -> dict:
+        """Recompute the load given the latest CPU fraction. Returns the raw components."""
+        jobs = self._read_job_states()
+        raw = {
+            "cpu": cpu,
+            "turn_detection_cpu": self._turn_detection_cpu(),
+            "loop_lag_ms": max((job["loop_lag_p95_ms"] for job in jobs), default=0.0),
+            "sessions": float(sum(job["sessions"] for job in jobs)),
+            "memory": psutil.virtual_memory().percent / 100,
+        }
+        normalized = {name: round(value / self._limits[name], 3) for name, value in raw.items()}
+        with self._lock:
+            self._components = normalized
+            self._load = min(1.0, max(normalized.values()))
+        return raw
+
+    def _sample_forever(self) -> None:
+        cpu_monitor = get_cpu_monitor()
+        while True:
+            try:
+                self.sample(cpu_monitor.cpu_percent(interval=self._sample_interval))
+            except Exception as e:
+                logger.warning(f"Load sample failed: {e}")
+                time.sleep(self._sample_interval)
+
+    def _read_job_states(self) -> list[dict]:
+        states = []
+        now = time.time()
+        try:
+            names = [name for name in os.listdir(self._state_dir) if name.endswith(".json")]
+        except FileNotFoundError:
+            return states
+        for name in names:
+            path = os.path.join(self._state_dir, name)
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if now - state.get("updated_at", 0) > self._stale_after:
+                if not psutil.pid_exists(state.get("pid", -1)):
+                    try:
+                        os.remove(path)  # Left behind by a process that was killed
+                    except OSError:
+                        pass
+                continue
+            states.append(state)
+        return states
+
+    def _turn_detection_cpu(self) -> float:
+        """Cores used by the process running turn-detector inference, if the worker has one."""
+        executor = getattr(self._server, "_inference_executor", None)
+        pid = self._turn_detection_pid or getattr(executor, "pid", None)
+        if pid is None:
+            return 0.0
+        try:
+            if self._inference_proc is None or self._inference_proc.pid != pid:
+                self._inference_proc = psutil.Process(pid)
+                self._inference_proc.cpu_percent()  # First call only primes the counter
+                return 0.0
+            return self._inference_proc.cpu_percent() / 100
+        except psutil.Error:
+            self._inference_proc = None
+            return 0.0
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import os
+import re
+from typing import AsyncIterable, AsyncIterator, Optional
+
+from livekit import rtc
+from livekit.agents import tts
+
+from audio_cache import CachedAudio, GreetingAudioCache
+from config import Config
+
+logger = logging.getLogger("truvo-agent")
+
+# Stock openers the default system prompt steers the model toward
+OPENER_PHRASES = [
+    "Sure thing!",
+    "Absolutely!",
+    "Of course!",
+    "Got it.",
+    "I see.",
+    "Okay.",
+    "Perfect!",
+    "Great!",
+]
+
+# Played while a slow tool call is still running, instead of dead air
+TOOL_FILLERS = {
+    "check_availability": "Let me check that for you.",
+    "book_tour": "One moment while I book that.",
+    "book_demo": "Give me just a second to set that up.",
+}
+
+
+class PhraseClip:
+    """A short phrase for one voice, memory-mapped from the on-disk audio cache."""
+
+    def __init__(self, text: str, audio: CachedAudio) -> None:
+        self.text = text
+        self._audio = audio
+
+    def frames(self) -> AsyncIterator[rtc.AudioFrame]:
+        return self._audio.frames()
+
+
+class PhraseCache:
+    """Audio for recurring openers and tool-wait fillers, per voice.
+
+    Clips are stored through a GreetingAudioCache keyed like the greeting (text,
+    voice, TTS model and settings), so they outlive the single-use job process
+    and only a clip missing from disk is ever sent to TTS. During a call the
+    clips are only read from disk; missing ones are synthesized after the call
+    on a TTS client of their own, so the live reply never waits behind them.
+    """
+
+    def __init__(self, openers: list[str], fillers: dict[str, str], store: GreetingAudioCache) -> None:
+        self._openers = openers
+        self._fillers = fillers
+        self._store = store
+        # Opener words (case-insensitive) ending a sentence. "Sure thing," is left
+        # to live TTS since the cached clip has sentence-final intonation.
+        self._opener_patterns = [
+            (phrase, re.compile(rf"\s*{re.escape(phrase.rstrip('.!'))}[.!]+(?=\s|$)", re.IGNORECASE))
+            for phrase in openers
+        ]
+        self._max_opener_len = max((len(p) for p in openers), default=0)
+        self._clips: dict[tuple[str, str], PhraseClip] = {}
+        self._warming: dict[str, asyncio.Task] = {}
+        self._counters = {
+            "opener_hits": 0,
+            "opener_misses": 0,
+            "filler_hits": 0,
+            "chars_saved": 0,
+            "clips_from_disk": 0,
+            "chars_synthesized": 0,  # TTS spent building clips; weigh against chars_saved
+        }
+
+    def warm(self, voice_id: str, model: str, settings: dict) -> None:
+        """Load voice_id's phrases from disk in the background. Nothing is synthesized."""
+        if voice_id in self._warming:
+            return
+        self._warming[voice_id] = asyncio.create_task(asyncio.to_thread(self._load, voice_id, model, settings))
+
+    def _load(self, voice_id: str, model: str, settings: dict) -> None:
+        for text in self._phrases():
+            audio = self._store.get(GreetingAudioCache.key(text, voice_id, model, settings))
+            if audio is not None:
+                self._counters["clips_from_disk"] += 1
+                self._clips[(voice_id, text)] = PhraseClip(text, audio)
+
+    async def fill(self, voice_id: str, tts_engine: tts.TTS, model: str, settings: dict) -> int:
+        """Synthesize the phrases for voice_id that aren't on disk yet, one at a time.
+
+        Meant for after the call, on a TTS client no session uses. Returns how
+        many clips were built; whatever is left is built after the next call.
+        """
+        synthesized = 0
+        for text in self._phrases():
+            key = GreetingAudioCache.key(text, voice_id, model, settings)
+            build = self._store.ensure(key, text, tts_engine)
+            if build is None:
+                continue  # Already on disk
+            await build
+            if self._store.has(key):
+                synthesized += 1
+                self._counters["chars_synthesized"] += len(text)
+        if synthesized:
+            logger.info(f"Phrase cache filled for voice {voice_id} ({synthesized} clip(s) synthesized)")
+        return synthesized
+
+    def _phrases(self) -> list[str]:
+        return [*self._openers, *self._fillers.values()]
+
+    def filler(self, voice_id: str, tool: str) -> Optional[PhraseClip]:
+        text = self._fillers.get(tool)
+        clip = self._clips.get((voice_id, text)) if text else None
+        if clip is not None:
+            self._counters["filler_hits"] += 1
+            self._counters["chars_saved"] += len(clip.text)
+        return clip
+
+    async def split_opener(
+        self, voice_id: str, text: AsyncIterable[str]
+    ) -> tuple[Optional[PhraseClip], AsyncIterable[str]]:
+        """Peel a cached opener off the start of a reply.
+
+        Reads just enough of the text stream to decide, then returns the cached
+        clip (or None) and a stream of the remaining text for live TTS.
+        """
+        it = text.__aiter__()
+        buffered = ""
+        exhausted = False
+        # Opener plus a following character tells us where the fragment ends
+        while len(buffered.lstrip()) <= self._max_opener_len and self._could_be_opener(buffered):
+            try:
+                buffered += await it.__anext__()
+            except StopAsyncIteration:
+                exhausted = True
+                break
+
+        clip = None
+        for phrase, pattern in self._opener_patterns:
+            match = pattern.match(buffered)
+            if match and (voice_id, phrase) in self._clips:
+                clip = self._clips[(voice_id, phrase)]
+                buffered = buffered[match.end():].lstrip()
+                break
+
+        if clip is not None:
+            self._counters["opener_hits"] += 1
+            self._counters["chars_saved"] += len(clip.text)
+        else:
+            self._counters["opener_misses"] += 1
+
+        async def remainder() -> AsyncIterator[str]:
+            if buffered:
+                yield buffered
+            if not exhausted:
+                async for chunk in it:
+                    yield chunk
+
+        return clip, remainder()
+
+    def _could_be_opener(self, buffered: str) -> bool:
+        start = buffered.lstrip().lower()
+        for phrase in self._openers:
+            core = phrase.rstrip(".!").lower()
+            if core.startswith(start) or start.startswith(core):
+                return True
+        return False
+
+    def stats(self) -> dict:
+        lookups = self._counters["opener_hits"] + self._counters["opener_misses"]
+        hit_rate = self._counters["opener_hits"] / lookups if lookups else 0.0
+        return {**self._counters, "opener_hit_rate": round(hit_rate, 3), "clips": len(self._clips)}
+
+
+phrase_cache = PhraseCache(
+    OPENER_PHRASES,
+    TOOL_FILLERS,
+    GreetingAudioCache(
+        cache_dir=os.path.join(Config.GREETING_CACHE_DIR, "phrases"),
+        max_bytes=Config.GREETING_CACHE_MAX_MB * 1024 * 1024,
+    ),
+)
@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import Executor
+from typing import Callable, Optional
+
+import av
+import numpy as np
+from livekit import rtc
+
+logger = logging.getLogger("truvo-agent")
+
+CALLER, AGENT = 0, 1  # Left and right channel of the recording
+
+# Process-wide recording outcomes, exported with the other per-call stats
+recording_totals: Counter = Counter()
+
+
+def recording_key(room_name: str) -> str:
+    """Storage key for a new recording of the room, one per call."""
+    return f"{re.sub(r'[^A-Za-z0-9_.-]', '_', room_name)}/{time.strftime('%Y%m%dT%H%M%S')}.ogg"
+
+
+class LocalRecordingStorage:
+    """Recordings as files under root, written in chunks as they are encoded.
+
+    Object storage fits the same two calls: append() maps to a multipart
+    upload part and complete() to completing the upload. Both run on the
+    encoder pool, never on the event loop. Without a base_url the files
+    are only on this host, so there is no URL the dashboard could serve.
+    """
+
+    def __init__(self, root: str, base_url: str = "") -> None:
+        self._root = root
+        self._base_url = base_url.rstrip("/")
+
+    def append(self, key: str, data: bytes) -> None:
+        path = os.path.join(self._root, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as f:
+            f.write(data)
+
+    def complete(self, key: str) -> Optional[str]:
+        """URL of the finished recording, or None if it isn't served from anywhere."""
+        if self._base_url:
+            return f"{self._base_url}/{key}"
+        return None
+
+
+class _ChunkSink:
+    """Write-only file for the OGG muxer; the encoder takes what it wrote after each block."""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+
+    def take(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class CallRecorder:
+    """Records a call as stereo Opus/OGG (caller left, agent right) in constant memory.
+
+    Frames from each side are copied once, on the event loop, into a fixed
+    ring of ring_seconds per channel, at the sample position where they
+    arrived, so gaps (the agent not talking) stay silent. Every chunk_seconds
+    the settled part of the ring is copied out and encoded on the shared
+    executor, and the new OGG pages go straight to storage. Only one block per
+    call is in flight; while it is, the ring keeps filling. Audio that would
+    overrun the ring or that arrives after its place was encoded is dropped
+    and counted: the voice pipeline never waits on the recording.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        storage: LocalRecordingStorage,
+        executor: Executor,
+        sample_rate: int = 16000,
+        bitrate: int = 32000,
+        ring_seconds: float = 10.0,
+        chunk_seconds: float = 1.0,
+        settle_seconds: float = 0.3,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.key = key
+        self._storage = storage
+        self._executor = executor
+        self._sample_rate = sample_rate
+        self._bitrate = bitrate
+        self._capacity = int(ring_seconds * sample_rate)
+        self._ring = np.zeros((2, self._capacity), dtype=np.int16)
+        self._chunk_seconds = chunk_seconds
+        self._settle = int(settle_seconds * sample_rate)
+        self._tolerance = int(0.1 * sample_rate)  # Jitter absorbed into a continuous run
+        self._clock = clock
+        self._t0: Optional[float] = None
+        self._cursor = 0                          # Samples handed to the encoder so far
+        self._next_pos = [None, None]             # Where each channel's run continues
+        self._container = None
+        self._stream = None
+        self._sink = _ChunkSink()
+        self._in_flight: Optional[asyncio.Future] = None
+        self._tick_task: Optional[asyncio.Task] = None
+        self._readers: list[asyncio.Task] = []
+        self._streams: list[rtc.AudioStream] = []
+        self._closed = False
+        self._counters = Counter({"samples": 0, "late_samples": 0, "overrun_samples": 0, "bytes": 0, "encode_ms": 0})
+
+    def start(self) -> None:
+        """Begin the timeline. Needs a running event loop."""
+        if self._t0 is not None:
+            return
+        self._t0 = self._clock()
+        self._tick_task = asyncio.create_task(self._tick())
+
+    def attach(self, room: rtc.Room) -> None:
+        """Record the caller's audio and the agent's published audio from the room."""
+        self.start()
+        for participant in room.remote_participants.values():
+            for publication in participant.track_publications.values():
+                if publication.track is not None and publication.kind == rtc.TrackKind.KIND_AUDIO:
+                    self._record_track(publication.track, CALLER)
+        for publication in room.local_participant.track_publications.values():
+            if publication.track is not None and publication.kind == rtc.TrackKind.KIND_AUDIO:
+                self._record_track(publication.track, AGENT)
+
+        @room.on("track_subscribed")
+        def _on_track_subscribed(track, publication, participant):
+            if track.kind == rtc.TrackKind.KIND_AUDIO:
+                self._record_track(track, CALLER)
+
+        @room.on("local_track_published")
+        def _on_local_track_published(publication, track):
+            if track.kind == rtc.TrackKind.KIND_AUDIO:
+                self._record_track(track, AGENT)
+
+    def push(self, channel: int, frame: rtc.AudioFrame) -> None:
+        """Place a mono frame at the sample position it arrived at. Never blocks."""
+        if self._t0 is None or self._closed:
+            return
+        samples = np.frombuffer(frame.data, dtype=np.int16)  # A view of the frame, not a copy
+        n = len(samples)
+        arrived = max(0, round((self._clock() - self._t0) * self._sample_rate) - n)
+        pos = self._next_pos[channel]
+        if pos is None or abs(arrived - pos) > self._tolerance:
+            pos = arrived  # New run, e.g. the agent started speaking again
+        self._next_pos[channel] = pos + n
+
+        if pos + n <= self._cursor:
+            self._count("late_samples", n)  # Its place was already encoded
+            return
+        if pos < self._cursor:
+            samples = samples[self._cursor - pos:]
+            self._count("late_samples", self._cursor - pos)
+            pos = self._cursor
+        if pos + len(samples) > self._cursor + self._capacity:
+            self._count("overrun_samples", len(samples))  # Encoder behind by a whole ring
+            return
+
+        start = pos % self._capacity
+        first = min(len(samples), self._capacity - start)
+        self._ring[channel, start:start + first] = samples[:first]
+        if first < len(samples):
+            self._ring[channel, :len(samples) - first] = samples[first:]
+        self._counters["samples"] += len(samples)
+
+    async def aclose(self) -> Optional[str]:
+        """Stop recording, encode what is left and return the recording's URL, if storage gives one."""
+        if self._t0 is None or self._closed:
+            return None
+        self._closed = True
+        for task in (self._tick_task, *self._readers):
+            task.cancel()
+        for stream in self._streams:
+            await stream.aclose()
+        if self._in_flight is not None:
+            await asyncio.wait([self._in_flight])
+
+        end = round((self._clock() - self._t0) * self._sample_rate)
+        block = self._take(end)
+        loop = asyncio.get_running_loop()
+        try:
+            url = await loop.run_in_executor(self._executor, self._finish, block)
+        except Exception as e:
+            self._count("failed")
+            logger.warning(f"Recording {self.key} failed to finish: {e}")
+            return None
+        self._count("recordings")
+        return url
+
+    def stats(self) -> dict:
+        seconds = self._cursor / self._sample_rate
+        return {
+            **self._counters,
+            "seconds": round(seconds, 1),
+            "ring_bytes": self._ring.nbytes,
+        }
+
+    def _count(self, key: str, n: int = 1) -> None:
+        self._counters[key] += n
+        recording_totals[key] += n
+
+    def _record_track(self, track: rtc.Track, channel: int) -> None:
+        if self._closed:
+            return
+        stream = rtc.AudioStream(track, sample_rate=self._sample_rate, num_channels=1)
+        self._streams.append(stream)
+        self._readers.append(asyncio.create_task(self._read(stream, channel)))
+
+    async def _read(self, stream: rtc.AudioStream, channel: int) -> None:
+        async for event in stream:
+            self.push(channel, event.frame)
+
+    async def _tick(self) -> None:
+        while True:
+            await asyncio.sleep(self._chunk_seconds)
+            if self._in_flight is not None and not self._in_flight.done():
+                continue  # The ring absorbs the backlog until the encoder catches up
+            end = round((self._clock() - self._t0) * self._sample_rate) - self._settle
+            if end > self._cursor:
+                self._in_flight = asyncio.get_running_loop().run_in_executor(
+                    self._executor, self._encode, self._take(end)
+                )
+                self._in_flight.add_done_callback(self._on_encoded)
+
+    def _on_encoded(self, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            self._count("encode_errors")
+            logger.warning(f"Recording {self.key} chunk failed: {future.exception()}")
+
+    def _take(self, end: int) -> np.ndarray:
+        """Copy [cursor, end) out of the ring and clear it for the next lap."""
+        end = min(end, self._cursor + self._capacity)
+        n = max(0, end - self._cursor)
+        start = self._cursor % self._capacity
+        first = min(n, self._capacity - start)
+        block = np.empty((2, n), dtype=np.int16)
+        block[:, :first] = self._ring[:, start:start + first]
+        block[:, first:] = self._ring[:, :n - first]
+        self._ring[:, start:start + first] = 0
+        self._ring[:, :n - first] = 0
+        self._cursor += n
+        return block
+
+    def _encode(self, block: np.ndarray) -> None:
+        """Runs on the executor: encode a block and append the new pages to storage."""
+        started = time.perf_counter()
+        if self._container is None:
+            self._container = av.open(self._sink, mode="w", format="ogg")
+            self._stream = self._container.add_stream("libopus", rate=self._sample_rate, layout="stereo")
+            self._stream.bit_rate = self._bitrate
+        if block.shape[1]:
+            frame = av.AudioFrame.from_ndarray(block, format="s16p", layout="stereo")
+            frame.sample_rate = self._sample_rate
+            for packet in self._stream.encode(frame):
+                self._container.mux(packet)
+        self._flush_pages()
+        self._counters["encode_ms"] += round((time.perf_counter() - started) * 1000)
+
+    def _finish(self, block: np.ndarray) -> Optional[str]:
+        self._encode(block)
+        for packet in self._stream.encode(None):
+            self._container.mux(packet)
+        self._container.close()
+        self._flush_pages()
+        return self._storage.complete(self.key)
+
+    def _flush_pages(self) -> None:
+        data = self._sink.take()
+        if data:
+            self._storage.append(self.key, data)
+            self._count("bytes", len(data))
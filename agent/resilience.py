@@ -0,0 +1,471 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from turn_metrics import percentile
+
+logger = logging.getLogger("truvo-agent")
+
+Send = Callable[[], Awaitable[httpx.Response]]
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Rejected without a network call: the host's circuit breaker is open."""
+
+
+class BudgetExceeded(httpx.TimeoutException):
+    """The call (including any hedged retry) ran past its tool's latency budget."""
+
+
+class SharedResilienceState:
+    """Breaker states and latency samples shared by every job process on the host.
+
+    Each call runs in its own short-lived process, which on its own would start
+    with a closed breaker for a host that is already down and never collect
+    enough latency samples to hedge. Breakers are kept in one small JSON file
+    per host, and each process writes its recent latencies to its own file;
+    readers merge those of the last max_age seconds. The request path only
+    touches memory: a background task writes breaker changes as soon as they
+    happen, re-reads the other processes' state every refresh seconds and
+    writes this process's latencies every publish_every seconds, all through
+    asyncio.to_thread. The half-open probe is claimed with an exclusive lock
+    file, so one process tests the host; that claim, like the first read of a
+    host's breaker, is awaited off the loop.
+    """
+
+    def __init__(
+        self, state_dir: str, refresh: float = 0.5, max_age: float = 600.0, publish_every: float = 2.0
+    ) -> None:
+        self._state_dir = state_dir
+        self._refresh = refresh
+        self._max_age = max_age
+        self._publish_every = publish_every
+        self._breakers: dict[str, Optional[dict]] = {}
+        self._latencies: dict[str, list[float]] = {}
+        self._samples: Optional[dict[str, deque]] = None
+        # Written by the sync task; swapped out before each flush
+        self._pending_breakers: dict[str, dict] = {}
+        self._pending_releases: set[str] = set()
+        self._latencies_read_at = 0.0
+        self._published_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._closing = False
+
+    async def load_breaker(self, host: str) -> Optional[dict]:
+        """The host's shared breaker state, read from disk the first time this process sees the host."""
+        if host not in self._breakers:
+            self._breakers[host] = await asyncio.to_thread(_read_json, self._path("breaker", host))
+        self._ensure_sync()
+        return self._breakers[host]
+
+    def breaker(self, host: str) -> Optional[dict]:
+        return self._breakers.get(host)
+
+    def publish_breaker(self, host: str, state: dict) -> None:
+        self._breakers[host] = state
+        self._pending_breakers[host] = state
+        self._flush_soon()
+
+    async def claim_probe(self, host: str, ttl: float) -> bool:
+        """Claim the half-open probe for host; a claim older than ttl is taken over."""
+        return await asyncio.to_thread(self._claim_probe, self._path("probe", host), host, ttl)
+
+    def release_probe(self, host: str) -> None:
+        self._pending_releases.add(host)
+        self._flush_soon()
+
+    def latencies(self, tool: str) -> list[float]:
+        """Recent samples for tool from the other processes on the host."""
+        self._ensure_sync()
+        return self._latencies.get(tool, [])
+
+    def publish_latencies(self, samples: dict[str, deque]) -> None:
+        self._samples = samples  # Written by the sync task every publish_every seconds
+        self._ensure_sync()
+
+    async def aclose(self) -> None:
+        """Stop the sync task, writing what it hasn't yet."""
+        task, self._task = self._task, None
+        if task is not None:
+            self._closing = True
+            self._wake.set()
+            await task
+            self._closing = False
+        self._published_at = 0.0  # Leave this process's latencies for the next ones
+        await self._sync_once()
+
+    def _ensure_sync(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    def _flush_soon(self) -> None:
+        self._ensure_sync()
+        self._wake.set()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while not self._closing:
+            try:
+                await self._sync_once()
+            except Exception as e:
+                logger.warning(f"Failed to sync resilience state: {e}")
+            # A timer rather than wait_for: on 3.11 wait_for can swallow a cancel
+            # that lands as the event is set, leaving this task unkillable
+            timer = loop.call_later(self._refresh, self._wake.set)
+            try:
+                await self._wake.wait()
+            finally:
+                timer.cancel()
+            self._wake.clear()
+
+    async def _sync_once(self) -> None:
+        breakers, self._pending_breakers = self._pending_breakers, {}
+        releases, self._pending_releases = self._pending_releases, set()
+        samples = None
+        if self._samples is not None and time.monotonic() - self._published_at >= self._publish_every:
+            self._published_at = time.monotonic()
+            samples = {tool: list(values) for tool, values in self._samples.items()}
+        read_latencies = time.monotonic() - self._latencies_read_at >= self._refresh * 4
+        hosts = [host for host in self._breakers if host not in breakers]
+
+        states, latencies = await asyncio.to_thread(
+            self._sync_files, breakers, releases, samples, hosts, read_latencies
+        )
+        for host, state in states.items():
+            if host not in self._pending_breakers:  # Not changed here while we were reading
+                self._breakers[host] = state
+        if latencies is not None:
+            self._latencies = latencies
+            self._latencies_read_at = time.monotonic()
+
+    def _sync_files(
+        self,
+        breakers: dict[str, dict],
+        releases: set[str],
+        samples: Optional[dict[str, list[float]]],
+        hosts: list[str],
+        read_latencies: bool,
+    ) -> tuple[dict[str, Optional[dict]], Optional[dict[str, list[float]]]]:
+        for host, state in breakers.items():
+            _write_json(self._path("breaker", host), state)
+        for host in releases:
+            try:
+                os.remove(self._path("probe", host))
+            except FileNotFoundError:
+                pass
+        if samples is not None:
+            _write_json(os.path.join(self._state_dir, f"latency-{os.getpid()}.json"), samples)
+        states = {host: _read_json(self._path("breaker", host)) for host in hosts}
+        return states, self._read_latencies() if read_latencies else None
+
+    @staticmethod
+    def _claim_probe(path: str, host: str, ttl: float) -> bool:
+        for _ in range(2):
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) < ttl:
+                        return False
+                    os.remove(path)  # Left by a process that died mid-probe
+                except FileNotFoundError:
+                    pass
+            except OSError as e:
+                logger.warning(f"Failed to claim circuit probe for {host}: {e}")
+                return True  # Fall back to probing from this process
+        return False
+
+    def _read_latencies(self) -> dict[str, list[float]]:
+        merged: dict[str, list[float]] = {}
+        own = f"latency-{os.getpid()}.json"
+        try:
+            names = [n for n in os.listdir(self._state_dir) if n.startswith("latency-") and n != own]
+        except FileNotFoundError:
+            return merged
+        for name in names:
+            path = os.path.join(self._state_dir, name)
+            try:
+                if time.time() - os.path.getmtime(path) > self._max_age:
+                    os.remove(path)
+                    continue
+            except OSError:
+                continue
+            for tool, values in (_read_json(path) or {}).items():
+                merged.setdefault(tool, []).extend(values)
+        return merged
+
+    def _path(self, kind: str, host: str) -> str:
+        return os.path.join(self._state_dir, f"{kind}-{hashlib.sha1(host.encode()).hexdigest()[:16]}.json")
+
+
+class CircuitBreaker:
+    """Per-host breaker: opens after consecutive failures, probes once after a cooldown.
+
+    With a SharedResilienceState, the failure count and open/closed state are
+    shared with the host's other job processes.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        host: str,
+        failure_threshold: int,
+        reset_timeout: float,
+        shared: Optional[SharedResilienceState] = None,
+    ) -> None:
+        self.host = host
+        self.state = self.CLOSED
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._shared = shared
+        self._failures = 0
+        self._opened_at = 0.0  # Wall clock, so other processes can compare it
+        self._updated_at = 0.0
+        self._probe_inflight = False
+
+    async def allow(self) -> bool:
+        if self._shared is not None:
+            await self._shared.load_breaker(self.host)
+        self._sync()
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.time() - self._opened_at < self._reset_timeout:
+                return False
+            if self._shared is not None and not await self._shared.claim_probe(self.host, self._reset_timeout):
+                return False  # Another process is testing the host
+            self.state = self.HALF_OPEN
+            self._probe_inflight = False
+        if self._probe_inflight:
+            return False
+        self._probe_inflight = True  # Let exactly one request test the host
+        return True
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.host} closed")
+        was_probe = self.state == self.HALF_OPEN
+        had_failures = self._failures > 0 or self.state != self.CLOSED
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probe_inflight = False
+        if had_failures:
+            self._publish()
+        if was_probe and self._shared is not None:
+            self._shared.release_probe(self.host)
+
+    def release_probe(self) -> None:
+        """The probe was cancelled before it could tell us anything; allow another."""
+        if self._probe_inflight and self.state == self.HALF_OPEN and self._shared is not None:
+            self._shared.release_probe(self.host)
+        self._probe_inflight = False
+
+    def record_failure(self) -> None:
+        self._sync()
+        was_probe = self.state == self.HALF_OPEN
+        self._failures += 1
+        if was_probe or self._failures >= self._failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit for {self.host} opened after {self._failures} failures")
+            self.state = self.OPEN
+            self._opened_at = time.time()
+            self._probe_inflight = False
+        self._publish()
+        if was_probe and self._shared is not None:
+            self._shared.release_probe(self.host)
+
+    def _sync(self) -> None:
+        """Adopt a newer state written by another process, as last read by the sync task."""
+        if self._shared is None:
+            return
+        shared = self._shared.breaker(self.host)
+        if not shared or shared.get("updated_at", 0.0) <= self._updated_at:
+            return
+        self._updated_at = shared["updated_at"]
+        self._failures = shared.get("failures", 0)
+        if shared.get("state") == self.OPEN:
+            if self.state != self.HALF_OPEN or shared.get("opened_at", 0.0) > self._opened_at:
+                self.state = self.OPEN
+                self._opened_at = shared.get("opened_at", 0.0)
+        elif self.state != self.CLOSED:
+            self.state = self.CLOSED
+            self._probe_inflight = False
+
+    def _publish(self) -> None:
+        if self._shared is None:
+            return
+        self._updated_at = time.time()
+        self._shared.publish_breaker(self.host, {
+            "state": self.OPEN if self.state == self.OPEN else self.CLOSED,
+            "failures": self._failures,
+            "opened_at": self._opened_at,
+            "updated_at": self._updated_at,
+        })
+
+
+class ResiliencePolicy:
+    """Latency budgets, hedged retries and circuit breakers for outbound HTTP calls.
+
+    Each call runs under its tool's total budget. Once a tool has enough
+    samples, an idempotent request still waiting past the tool's observed p95
+    gets one hedged duplicate, and whichever answers first wins. Transport
+    errors, budget overruns and 5xx responses count against the host's breaker.
+    While the breaker is open, calls fail immediately with CircuitOpenError,
+    which the tools turn into their usual fallback replies. With a state_dir,
+    breakers and latency samples are shared by the host's job processes.
+    """
+
+    def __init__(
+        self,
+        budgets: dict[str, float],
+        failure_threshold: int = 5,
+        reset_timeout: float = 15.0,
+        hedging: bool = True,
+        min_hedge_delay: float = 0.05,
+        min_samples: int = 20,
+        state_dir: Optional[str] = None,
+    ) -> None:
+        self._budgets = budgets
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._hedging = hedging
+        self._min_hedge_delay = min_hedge_delay
+        self._min_samples = min_samples
+        self._shared = SharedResilienceState(state_dir) if state_dir else None
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._latencies: dict[str, deque] = {}
+        self._counters: dict[str, dict[str, int]] = {
+            "hedges": {}, "hedge_wins": {}, "budget_exceeded": {}, "rejected": {},
+        }
+
+    async def call(self, tool: str, host: str, idempotent: bool, send: Send) -> httpx.Response:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(
+                host, self._failure_threshold, self._reset_timeout, self._shared
+            )
+        if not await breaker.allow():
+            self._count("rejected", host)
+            raise CircuitOpenError(f"Circuit open for {host}")
+
+        budget = self._budgets.get(tool)
+        try:
+            attempt = self._hedged(tool, send) if idempotent and self._hedging else self._timed(tool, send)
+            response = await asyncio.wait_for(attempt, budget)
+        except asyncio.TimeoutError:
+            breaker.record_failure()
+            self._count("budget_exceeded", tool)
+            raise BudgetExceeded(f"{tool} exceeded its {budget}s budget") from None
+        except httpx.HTTPError:
+            breaker.record_failure()
+            raise
+        except asyncio.CancelledError:
+            breaker.release_probe()
+            raise
+
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def hedge_delay(self, tool: str) -> Optional[float]:
+        """Observed p95 for tool, or None until there are enough samples to trust it."""
+        samples = list(self._latencies.get(tool, ()))
+        if self._shared is not None:
+            samples += self._shared.latencies(tool)
+        if len(samples) < self._min_samples:
+            return None
+        return max(self._min_hedge_delay, percentile(samples, 95))
+
+    async def aclose(self) -> None:
+        if self._shared is not None:
+            await self._shared.aclose()
+
+    def stats(self) -> dict:
+        state_values = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 0.5, CircuitBreaker.OPEN: 1}
+        hedge_win_rate = {
+            tool: round(self._counters["hedge_wins"].get(tool, 0) / hedges, 3)
+            for tool, hedges in self._counters["hedges"].items()
+        }
+        return {
+            "breaker_open": {host: state_values[b.state] for host, b in self._breakers.items()},
+            **{name: dict(values) for name, values in self._counters.items()},
+            "hedge_win_rate": hedge_win_rate,
+        }
+
+    async def _timed(self, tool: str, send: Send) -> httpx.Response:
+        started = time.perf_counter()
+        response = await send()
+        self._latencies.setdefault(tool, deque(maxlen=200)).append(time.perf_counter() - started)
+        if self._shared is not None:
+            self._shared.publish_latencies(self._latencies)
+        return response
+
+    async def _hedged(self, tool: str, send: Send) -> httpx.Response:
+        delay = self.hedge_delay(tool)
+        primary = asyncio.ensure_future(self._timed(tool, send))
+        if delay is None:
+            try:
+                return await primary
+            finally:
+                primary.cancel()
+
+        attempts = {primary}
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                self._count("hedges", tool)
+                hedge = asyncio.ensure_future(self._timed(tool, send))
+                attempts.add(hedge)
+
+            pending = set(attempts)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._count("hedge_wins", tool)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in attempts:
+                task.cancel()  # The losing attempt, if any
+
+    def _count(self, counter: str, key: str) -> None:
+        values = self._counters[counter]
+        values[key] = values.get(key, 0) + 1
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path: str, data: dict) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)  # Readers never see a half-written file
+    except OSError as e:
+        logger.warning(f"Failed to write resilience state {path}: {e}")
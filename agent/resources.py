@@ -0,0 +1,161 @@
+import logging
+from collections import Counter
+from typing import Optional
+
+from livekit.plugins import deepgram, openai, elevenlabs, groq
+from livekit.plugins.turn_detector.multilingual import MultilingualModel
+
+from config import Config
+from llm_router import LLMRouter
+from turn_detection import SharedTurnDetector, TurnDetectionClient
+
+logger = logging.getLogger("truvo-agent")
+
+# TTS model and voice settings shared by every voice; also part of audio cache keys
+TTS_MODEL = "eleven_turbo_v2_5"
+TTS_VOICE_SETTINGS = {
+    "stability": 0.5,
+    "similarity_boost": 0.75,
+    "style": 0.3,
+    "use_speaker_boost": True,
+}
+
+
+class ResourcePool:
+    """Per-process STT/TTS/LLM clients and turn detector shared by every session.
+
+    Built once in prewarm so sessions skip client construction and reuse warm
+    provider connections. TTS instances are keyed by voice_id.
+    """
+
+    def __init__(self) -> None:
+        self._llm: Optional[openai.LLM] = None
+        self._summarizer_llm: Optional[openai.LLM] = None
+        self._llm_router: Optional[LLMRouter] = None
+        self._stt: Optional[deepgram.STT] = None
+        self._turn_detector: Optional[MultilingualModel] = None
+        self.turn_detection_client = TurnDetectionClient(Config.TURN_SERVICE_SOCKET)
+        self._tts: dict[str, elevenlabs.TTS] = {}
+        self._connections_warmed = False
+
+    def build(self, voice_ids: list[str]) -> None:
+        """Construct the shared clients and TTS for the most-used voices."""
+        self.llm_router
+        self.stt
+        for voice_id in voice_ids:
+            self.tts(voice_id)
+        logger.info(f"Resource pool built with TTS voices: {list(self._tts)}")
+
+    def warm_connections(self) -> None:
+        """Open provider connections. Needs a running event loop, so call it from a job."""
+        if self._connections_warmed:
+            return
+        self._connections_warmed = True
+        llms = [backend.client for backend in self.llm_router.backends]
+        for client in (*llms, self.stt, *self._tts.values()):
+            try:
+                client.prewarm()
+            except Exception as e:
+                logger.warning(f"Failed to prewarm {type(client).__name__}: {e}")
+
+    @property
+    def llm(self) -> openai.LLM:
+        if self._llm is None:
+            # OpenAI for better conversation quality
+            self._llm = openai.LLM(
+                model="gpt-4o-mini",
+                temperature=0.7,  # Balanced for coherent yet natural responses
+            )
+        return self._llm
+
+    @property
+    def summarizer_llm(self) -> openai.LLM:
+        """A separate client for background context summaries.
+
+        Sessions listen to the agent's own LLM for metrics, so summaries
+        sent through it would be counted as conversation turns.
+        """
+        if self._summarizer_llm is None:
+            self._summarizer_llm = openai.LLM(model="gpt-4o-mini", temperature=0.3)
+        return self._summarizer_llm
+
+    @property
+    def llm_router(self) -> LLMRouter:
+        """Routes turns across OpenAI and, when a key is set, Groq."""
+        if self._llm_router is None:
+            backends = [("openai/gpt-4o-mini", self.llm)]
+            if Config.GROQ_API_KEY and Config.LLM_ROUTING_ENABLED:
+                backends.append((
+                    f"groq/{Config.GROQ_LLM_MODEL}",
+                    groq.LLM(model=Config.GROQ_LLM_MODEL, temperature=0.7),
+                ))
+            self._llm_router = LLMRouter(
+                backends,
+                race=Config.LLM_RACE_FIRST_TOKEN,
+                first_token_timeout=Config.LLM_FIRST_TOKEN_TIMEOUT,
+            )
+        return self._llm_router
+
+    @property
+    def stt(self) -> deepgram.STT:
+        if self._stt is None:
+            # Low-latency settings
+            self._stt = deepgram.STT(
+                model="nova-3",
+                language="en",
+                detect_language=False,      # Skip language detection for speed
+                interim_results=True,       # Stream partial results
+                smart_format=True,          # Better formatting
+            )
+        return self._stt
+
+    def turn_detector(self) -> MultilingualModel:
+        """One turn detector per process.
+
+        Built on the first job rather than in prewarm because it binds to the
+        job context's inference executor. With the shared service enabled,
+        inference goes to the worker's batched turn-detection process and the
+        executor is only the fallback.
+        """
+        if self._turn_detector is None:
+            if Config.TURN_SERVICE_ENABLED:
+                self._turn_detector = SharedTurnDetector(self.turn_detection_client)
+            else:
+                self._turn_detector = MultilingualModel()
+        return self._turn_detector
+
+    def tts(self, voice_id: str) -> elevenlabs.TTS:
+        """The shared TTS for voice_id, building it on first use."""
+        tts = self._tts.get(voice_id)
+        if tts is None:
+            tts = self.new_tts(voice_id)
+            self._tts[voice_id] = tts
+            if self._connections_warmed:
+                tts.prewarm()
+        return tts
+
+    @staticmethod
+    def new_tts(voice_id: str) -> elevenlabs.TTS:
+        """A TTS for voice_id that no session shares; the caller closes it."""
+        # Low latency model
+        return elevenlabs.TTS(
+            voice_id=voice_id,
+            model=TTS_MODEL,
+            voice_settings=elevenlabs.VoiceSettings(**TTS_VOICE_SETTINGS),
+        )
+
+    def stats(self) -> dict:
+        return {
+            "tts_voices": list(self._tts),
+            "turn_detector_loaded": self._turn_detector is not None,
+        }
+
+
+def most_used_voices(configs: list[dict], limit: int) -> list[str]:
+    """Voices to warm: the default voice plus the most common in known configs."""
+    counts = Counter(c.get("voice_id") for c in configs if c.get("voice_id"))
+    voices = [Config.DEFAULT_VOICE_ID]
+    for voice_id, _ in counts.most_common():
+        if voice_id not in voices:
+            voices.append(voice_id)
+    return voices[:limit]
@@ -0,0 +1,236 @@
+import json
+import logging
+import re
+from collections import Counter
+from datetime import date as date_cls, timedelta
+from typing import Optional
+
+from livekit.agents import AgentSession
+
+from availability_cache import AvailabilityCache, SlotLoader, business_today
+
+logger = logging.getLogger("truvo-agent")
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+ORDINAL_WORDS = {
+    word: i + 1
+    for i, word in enumerate(
+        "first second third fourth fifth sixth seventh eighth ninth tenth eleventh twelfth thirteenth "
+        "fourteenth fifteenth sixteenth seventeenth eighteenth nineteenth twentieth".split()
+    )
+}
+ORDINAL_WORDS.update({f"twenty {w}": 20 + n for w, n in list(ORDINAL_WORDS.items())[:9]})
+ORDINAL_WORDS.update({"thirtieth": 30, "thirty first": 31})
+
+_MONTH = r"(?P<month>" + "|".join(m[:3] + r"(?:" + m[3:] + r")?" for m in MONTHS) + r")\.?"
+_DAY = r"(?P<day>\d{1,2})(?:st|nd|rd|th)?"
+_ORD = r"(?:\d{1,2}(?:st|nd|rd|th)|" + "|".join(sorted(ORDINAL_WORDS, key=len, reverse=True)) + ")"
+_ORDINAL = rf"(?P<ordinal>{_ORD})"
+# "the 3rd, 4th and 5th", "the second or third of the month"
+_ORDINALS = rf"(?P<ordinals>{_ORD}(?:(?:\s*,\s*|\s+(?:or|and|to|through)\s+)(?:the\s+)?{_ORD})*)"
+_ON = r"(?:(?P<on>on)\s+)?"
+
+PATTERNS = [
+    ("iso", re.compile(r"\b(?P<y>\d{4})-(?P<m>\d{2})-(?P<d>\d{2})\b")),
+    ("relative", re.compile(r"\b(?P<word>today|tonight|day after tomorrow|tomorrow)\b")),
+    ("weekday", re.compile(r"\b(?:(?P<mod>this|next|coming)\s+)?(?P<weekday>" + "|".join(WEEKDAYS) + r")\b")),
+    ("month_day", re.compile(rf"\b{_MONTH}\s+(?:the\s+)?{_DAY}\b")),
+    ("day_of_month", re.compile(rf"\bthe\s+{_ORDINAL}\s+of\s+{_MONTH}")),
+    ("numeric", re.compile(rf"\b{_ON}(?P<m>1[0-2]|0?[1-9])/(?P<d>3[01]|[12]\d|0?[1-9])\b")),
+    ("ordinal", re.compile(rf"\b{_ON}(?P<the>the\s+)?{_ORDINALS}(?P<of_month>\s+of\s+(?:the|this)\s+month)?\b")),
+]
+# m/d and bare numeric ordinals without "the" only count as dates after "on" or
+# near one of these words, so "3/4 of the way" doesn't trigger a fetch. "The 14th"
+# is a date on its own; spelled-out ordinals need a month or "of the month" after
+# them, so "on the first available slot" isn't the 1st.
+MONTH_WORDS = {*MONTHS, *(m[:3] for m in MONTHS)} - {"may"}  # Usually the verb
+DATE_CONTEXT_WORDS = {*WEEKDAYS, *MONTH_WORDS}
+CONTEXT_WINDOW = 3  # words either side
+
+# A caller asking about openings at all, before naming a day
+AVAILABILITY_INTENT = re.compile(
+    r"\b(?:availab\w*|openings?|slots?|tours?|schedul\w*|book\w*|appointments?|visit|come (?:in|by|see))\b"
+)
+
+# Process-wide speculation outcomes, exported with the other cache stats
+speculation_totals: Counter = Counter()
+
+
+def parse_dates(text: str, today: Optional[date_cls] = None) -> list[str]:
+    """Resolve date expressions in a (possibly partial) transcript to YYYY-MM-DD.
+
+    Ambiguous phrases yield every plausible date, e.g. "next Tuesday" on a
+    Monday gives both tomorrow and the Tuesday after. today defaults to the
+    date in the business's timezone.
+    """
+    today = today or business_today()
+    text = text.lower()
+    found: list[date_cls] = []
+    consumed: list[tuple[int, int]] = []
+
+    for kind, pattern in PATTERNS:
+        for match in pattern.finditer(text):
+            # Skip "the 14th" inside an already matched "the 14th of May"
+            if any(start <= match.start() < end for start, end in consumed):
+                continue
+            if kind in ("numeric", "ordinal") and not _has_date_context(kind, text, match):
+                continue
+            candidates = _resolve(kind, match, today)
+            if candidates:
+                consumed.append(match.span())
+                found.extend(candidates)
+
+    dates = []
+    for day in found:
+        if day >= today and day.isoformat() not in dates:
+            dates.append(day.isoformat())
+    return dates
+
+
+def _resolve(kind: str, match: re.Match, today: date_cls) -> list[date_cls]:
+    try:
+        if kind == "iso":
+            return [date_cls(int(match["y"]), int(match["m"]), int(match["d"]))]
+        if kind == "relative":
+            offset = {"today": 0, "tonight": 0, "tomorrow": 1, "day after tomorrow": 2}[match["word"]]
+            return [today + timedelta(days=offset)]
+        if kind == "weekday":
+            ahead = (WEEKDAYS.index(match["weekday"]) - today.weekday()) % 7 or 7
+            if match["mod"] == "next" and ahead < 7:
+                return [today + timedelta(days=ahead), today + timedelta(days=ahead + 7)]
+            return [today + timedelta(days=ahead)]
+        if kind in ("month_day", "day_of_month"):
+            month = _month_index(match["month"])
+            day = int(match["day"]) if kind == "month_day" else _ordinal(match["ordinal"])
+            candidate = date_cls(today.year, month, day)
+            return [candidate if candidate >= today else date_cls(today.year + 1, month, day)]
+        if kind == "numeric":
+            candidate = date_cls(today.year, int(match["m"]), int(match["d"]))
+            return [candidate if candidate >= today else date_cls(today.year + 1, candidate.month, candidate.day)]
+        if kind == "ordinal":
+            next_month = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+            dates = []
+            for token in _ordinal_tokens(match):
+                day = _ordinal(token)
+                try:
+                    dates.append(today.replace(day=day) if day >= today.day else next_month.replace(day=day))
+                except ValueError:
+                    continue  # "the 31st" in a 30-day month
+            return dates
+    except ValueError:
+        pass  # Impossible dates such as "February 30th"
+    return []
+
+
+def _has_date_context(kind: str, text: str, match: re.Match) -> bool:
+    if kind == "ordinal":
+        if not all(token[0].isdigit() for token in _ordinal_tokens(match)):
+            after = text[match.end():].split()[:CONTEXT_WINDOW]
+            return bool(match["of_month"]) or any(word.strip(".,!?;:") in MONTH_WORDS for word in after)
+        if match["the"]:
+            return True
+    if match["on"]:
+        return True
+    before = text[:match.start()].split()[-CONTEXT_WINDOW:]
+    after = text[match.end():].split()[:CONTEXT_WINDOW]
+    return any(word.strip(".,!?;:") in DATE_CONTEXT_WORDS for word in before + after)
+
+
+def _ordinal_tokens(match: re.Match) -> list[str]:
+    return re.findall(_ORD, match["ordinals"])
+
+
+def _month_index(name: str) -> int:
+    return next(i + 1 for i, month in enumerate(MONTHS) if month.startswith(name[:3]))
+
+
+def _ordinal(token: str) -> int:
+    return ORDINAL_WORDS.get(token) or int(re.match(r"\d+", token).group(0))
+
+
+class AvailabilitySpeculator:
+    """Warms availability for dates the caller is mentioning, before the LLM asks.
+
+    Listens to interim and final transcripts. Each new date is fetched into the
+    call's AvailabilityCache, at most max_dates per caller turn. intent_dates
+    (e.g. today and the next business day) are fetched once, on the first
+    transcript that asks about availability, so calls that never get there
+    cost Cal.com nothing. A guess that
+    drops out of a later transcript (the caller corrected themselves, or STT
+    revised the interim) is cancelled if nobody is waiting on it. Each guess is
+    later scored against the dates check_availability was actually called with.
+    """
+
+    def __init__(
+        self,
+        cache: AvailabilityCache,
+        event_type_id: str,
+        loader: SlotLoader,
+        max_dates: int = 3,
+        intent_dates: Optional[list[str]] = None,
+    ) -> None:
+        self._cache = cache
+        self._event_type_id = event_type_id
+        self._loader = loader
+        self._max_dates = max_dates
+        self._intent_dates = intent_dates or []   # Fetched once the caller first asks about availability
+        self._turn: list[str] = []           # Dates speculated on this caller turn
+        self._pending: set[str] = set()      # Speculated dates not yet used by a tool call
+        self._counters = Counter()
+
+    def attach(self, session: AgentSession) -> None:
+        session.on("user_input_transcribed", self._on_transcript)
+        session.on("function_tools_executed", self._on_tools)
+
+    def stats(self) -> dict:
+        speculations = self._counters["speculations"]
+        hit_rate = self._counters["hits"] / speculations if speculations else 0.0
+        return {**self._counters, "unused": len(self._pending), "hit_rate": round(hit_rate, 3)}
+
+    def _count(self, key: str, n: int = 1) -> None:
+        self._counters[key] += n
+        speculation_totals[key] += n
+
+    def _on_transcript(self, ev) -> None:
+        if self._intent_dates and AVAILABILITY_INTENT.search(ev.transcript.lower()):
+            started = self._cache.prefetch(self._event_type_id, self._intent_dates, self._loader)
+            self._count("intent_prefetches", len(started))
+            self._intent_dates = []
+
+        dates = parse_dates(ev.transcript)
+
+        # Cancel guesses the latest transcript no longer supports
+        for date in self._turn:
+            if date not in dates and self._cache.cancel(self._event_type_id, date):
+                self._pending.discard(date)
+                self._count("cancelled")
+        self._turn = [date for date in self._turn if date in dates]
+
+        for date in dates:
+            if date in self._turn or len(self._turn) >= self._max_dates:
+                continue
+            self._turn.append(date)
+            if date in self._pending or self._cache.is_fresh(self._event_type_id, date):
+                continue
+            if self._cache.prefetch(self._event_type_id, [date], self._loader):
+                self._pending.add(date)
+                self._count("speculations")
+
+        if ev.is_final:
+            self._turn = []
+
+    def _on_tools(self, ev) -> None:
+        for call in ev.function_calls:
+            if call.name != "check_availability":
+                continue
+            try:
+                date = json.loads(call.arguments or "{}").get("date")
+            except ValueError:
+                continue
+            if date in self._pending:
+                self._pending.discard(date)
+                self._count("hits")
+            else:
+                self._count("unspeculated_lookups")
@@ -1,3 +1,59 @@
-from .booking import check_availability, book_tour
+import importlib
+import logging
+from types import ModuleType
+from typing import Iterable, Optional
 
-__all__ = ["check_availability", "book_tour"]
+from booking_queue import BookingQueue
+
+logger = logging.getLogger("truvo-agent")
+
+# tools_enabled name -> module defining a @function_tool of the same name. A module is
+# imported the first time an agent enables one of its tools, so a worker only loads the
+# backends its agents use.
+TOOL_MODULES = {
+    "check_availability": "tools.booking",
+    "book_tour": "tools.booking",
+    "book_demo": "tools.demo",
+    "lookup_product_info": "tools.product",
+}
+
+# Booking queue backend -> module whose submit() sends its bookings
+BOOKING_BACKENDS = {
+    "cal_com": "tools.booking",
+    "google_calendar": "tools.demo",
+}
+
+
+def tool_module(name: str) -> Optional[ModuleType]:
+    """Import and return the module defining a tool, or None if the name is unknown."""
+    module = TOOL_MODULES.get(name)
+    return importlib.import_module(module) if module else None
+
+
+def load_tools(names: Iterable[str]) -> list:
+    """The function tools for an agent's tools_enabled, in order; unknown or unloadable names are skipped."""
+    tools = []
+    for name in dict.fromkeys(names):
+        try:
+            module = tool_module(name)
+        except ImportError as e:
+            logger.error(f"Tool {name!r} unavailable: {e}")
+            continue
+        if module is None:
+            logger.warning(f"Unknown tool {name!r} in agent config, skipping")
+            continue
+        tools.append(getattr(module, name))
+    return tools
+
+
+def register_booking_backends(queue: BookingQueue) -> None:
+    """Register every backend's submitter; its module is imported when its first booking is sent."""
+    for backend, module in BOOKING_BACKENDS.items():
+        queue.register(backend, _lazy_submitter(module))
+
+
+def _lazy_submitter(module: str):
+    async def submit(payload: dict, attempt: int) -> None:
+        await importlib.import_module(module).submit(payload, attempt)
+
+    return submit
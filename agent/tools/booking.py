@@ -1,110 +1,162 @@
-import httpx
-from datetime import datetime, timedelta
-from livekit.agents import llm
-from config import Config
-
+import logging
 
-@llm.ai_callable(
-    description="Check available tour times for a specific date. Use this before booking to see what times are open."
-)
-async def check_availability(
-    date: str = llm.TypeInfo(description="The date to check availability for, in YYYY-MM-DD format")
-) -> str:
-    """Check available tour slots for a given date via Cal.com API."""
+from livekit.agents import RunContext, function_tool
 
+from availability_cache import availability_cache
+from booking_queue import BookingRejected, booking_key, booking_queue
+from config import Config
+from http_client import http_pool
+from tools.common import booking_problem, with_tool_filler
+
+logger = logging.getLogger("truvo-agent")
+
+
+async def load_slots(date: str) -> list[dict]:
+    """Fetch one day's open slots from Cal.com."""
+    from datetime import datetime, timedelta
+    check_date = datetime.strptime(date, "%Y-%m-%d")
+    start_time = check_date.replace(hour=0, minute=0, second=0).isoformat() + "Z"
+    end_time = (check_date + timedelta(days=1)).replace(hour=0, minute=0, second=0).isoformat() + "Z"
+
+    response = await http_pool.request(
+        "check_availability",
+        "GET",
+        f"{Config.CAL_API_URL}/v1/availability",
+        params={
+            "apiKey": Config.CAL_API_KEY,
+            "eventTypeId": Config.CAL_EVENT_TYPE_ID,
+            "startTime": start_time,
+            "endTime": end_time,
+        },
+    )
+    response.raise_for_status()
+    return response.json().get("slots", {}).get(date, [])
+
+
+async def submit(payload: dict, attempt: int = 1) -> None:
+    """Booking queue submitter for Cal.com."""
+    # Cal.com doesn't enforce our idempotency key: an earlier attempt whose response
+    # was lost (a timeout after Cal.com booked) must not be sent again
+    if attempt > 1 and await find_booking(payload):
+        logger.info(f"Cal.com already has booking {payload['metadata']['idempotency_key'][:12]}; not resending")
+        return
+
+    response = await http_pool.request(
+        "book_tour",
+        "POST",
+        f"{Config.CAL_API_URL}/v1/bookings",
+        params={"apiKey": Config.CAL_API_KEY},
+        json=payload,
+    )
+    if response.status_code in (200, 201):
+        return
+    if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+        raise BookingRejected(f"Cal.com returned {response.status_code}: {response.text[:200]}")
+    raise RuntimeError(f"Cal.com returned {response.status_code}")
+
+
+async def find_booking(payload: dict) -> bool:
+    """Whether Cal.com already has a live booking for this attendee, event type and slot."""
+    from datetime import datetime, timedelta, timezone
+    from zoneinfo import ZoneInfo
+
+    start = datetime.fromisoformat(payload["start"]).replace(tzinfo=ZoneInfo(payload["timeZone"]))
+    start = start.astimezone(timezone.utc)
+    response = await http_pool.request(
+        "book_tour",
+        "GET",
+        f"{Config.CAL_API_URL}/v1/bookings",
+        params={
+            "apiKey": Config.CAL_API_KEY,
+            "attendeeEmail": payload["responses"]["email"],
+            "dateFrom": (start - timedelta(days=1)).date().isoformat(),
+            "dateTo": (start + timedelta(days=1)).date().isoformat(),
+        },
+    )
+    response.raise_for_status()  # Unknown: fail this attempt rather than risk a duplicate
+    email = payload["responses"]["email"].strip().lower()
+    for booking in response.json().get("bookings", []):
+        if str(booking.get("eventTypeId")) != str(payload["eventTypeId"]):
+            continue
+        if str(booking.get("status", "")).upper() in ("CANCELLED", "REJECTED"):
+            continue
+        attendees = {str(a.get("email", "")).strip().lower() for a in booking.get("attendees", [])}
+        try:
+            booked_at = datetime.fromisoformat(str(booking.get("startTime", "")).replace("Z", "+00:00"))
+        except ValueError:
+            continue
+        if email in attendees and booked_at == start:
+            return True
+    return False
+
+
+@function_tool
+async def check_availability(context: RunContext, date: str) -> str:
+    """Check available tour times for a specific date. Use this before booking to see what times are open.
+
+    Args:
+        date: The date to check availability for, in YYYY-MM-DD format
+    """
     if not Config.CAL_API_KEY:
-        # Demo mode - return mock availability
         return f"Available times for {date}: 10:00 AM, 11:30 AM, 2:00 PM, 3:30 PM. Which time works best for you?"
 
     try:
-        async with httpx.AsyncClient() as client:
-            # Parse the date
-            check_date = datetime.strptime(date, "%Y-%m-%d")
-            start_time = check_date.replace(hour=0, minute=0, second=0).isoformat() + "Z"
-            end_time = (check_date + timedelta(days=1)).replace(hour=0, minute=0, second=0).isoformat() + "Z"
-
-            response = await client.get(
-                f"https://api.cal.com/v1/availability",
-                params={
-                    "apiKey": Config.CAL_API_KEY,
-                    "eventTypeId": Config.CAL_EVENT_TYPE_ID,
-                    "startTime": start_time,
-                    "endTime": end_time,
-                },
-                timeout=10.0
-            )
-
-            if response.status_code == 200:
-                data = response.json()
-                slots = data.get("slots", {}).get(date, [])
-
-                if not slots:
-                    return f"Sorry, there are no available times on {date}. Would you like to check another date?"
-
-                # Format times nicely
-                times = []
-                for slot in slots[:6]:  # Limit to 6 options
-                    slot_time = datetime.fromisoformat(slot["time"].replace("Z", "+00:00"))
-                    times.append(slot_time.strftime("%I:%M %p"))
-
-                times_str = ", ".join(times[:-1]) + f", or {times[-1]}" if len(times) > 1 else times[0]
-                return f"Available times on {date}: {times_str}. Which time works for you?"
-            else:
-                return "I'm having trouble checking availability right now. Could you try again in a moment?"
-
-    except Exception as e:
-        return f"I'm having trouble checking availability right now. Could you try again in a moment?"
-
-
-@llm.ai_callable(
-    description="Book a property tour appointment. Use this after confirming the date, time, and getting the visitor's name."
-)
-async def book_tour(
-    date: str = llm.TypeInfo(description="Tour date in YYYY-MM-DD format"),
-    time: str = llm.TypeInfo(description="Tour time in HH:MM format (24-hour)"),
-    name: str = llm.TypeInfo(description="Full name of the person booking the tour"),
-    email: str = llm.TypeInfo(description="Email address for confirmation"),
-    phone: str = llm.TypeInfo(description="Phone number for the booking", default="")
-) -> str:
-    """Book a tour via Cal.com API."""
+        from datetime import datetime
+        datetime.strptime(date, "%Y-%m-%d")  # Reject malformed dates before they're cached
+        slots = await with_tool_filler(
+            context,
+            "check_availability",
+            availability_cache.get_slots(Config.CAL_EVENT_TYPE_ID, date, load_slots),
+        )
+        if not slots:
+            return f"Sorry, there are no available times on {date}. Would you like to check another date?"
+        times = [datetime.fromisoformat(s["time"].replace("Z", "+00:00")).strftime("%I:%M %p") for s in slots[:6]]
+        times_str = ", ".join(times[:-1]) + f", or {times[-1]}" if len(times) > 1 else times[0]
+        return f"Available times on {date}: {times_str}. Which time works for you?"
+    except Exception:
+        pass
+    return "I'm having trouble checking availability right now. Could you try again in a moment?"
+
+
+@function_tool
+async def book_tour(context: RunContext, date: str, time: str, name: str, email: str, phone: str = "") -> str:
+    """Book a property tour appointment. Use this after confirming the date, time, and getting the visitor's information.
+
+    Args:
+        date: Tour date in YYYY-MM-DD format
+        time: Tour time in HH:MM format (24-hour)
+        name: Full name of the person booking the tour
+        email: Email address for confirmation
+        phone: Phone number for the booking (optional)
+    """
+    problem = booking_problem(date, time, email)
+    if problem:
+        return problem
 
     if not Config.CAL_API_KEY:
-        # Demo mode - return success
         return f"I've booked your tour for {date} at {time}. You'll receive a confirmation email at {email}. We look forward to showing you around!"
 
     try:
-        async with httpx.AsyncClient() as client:
-            # Combine date and time
-            start_datetime = f"{date}T{time}:00"
-
-            booking_data = {
-                "eventTypeId": int(Config.CAL_EVENT_TYPE_ID),
-                "start": start_datetime,
-                "responses": {
-                    "name": name,
-                    "email": email,
-                    "phone": phone or "",
-                    "notes": "Booked via Truvo AI Assistant"
-                },
-                "timeZone": "America/New_York",  # TODO: Make configurable
-                "language": "en",
-                "metadata": {
-                    "source": "truvo-voice-agent"
-                }
-            }
-
-            response = await client.post(
-                f"https://api.cal.com/v1/bookings",
-                params={"apiKey": Config.CAL_API_KEY},
-                json=booking_data,
-                timeout=15.0
-            )
-
-            if response.status_code in [200, 201]:
-                return f"Excellent! I've booked your property tour for {date} at {time}. A confirmation email has been sent to {email}. Is there anything else I can help you with?"
-            else:
-                error = response.json().get("message", "Unknown error")
-                return f"I wasn't able to complete the booking. {error}. Would you like to try a different time?"
-
+        key = booking_key("cal_com", Config.CAL_EVENT_TYPE_ID, email, date, time)
+        booking_data = {
+            "eventTypeId": int(Config.CAL_EVENT_TYPE_ID),
+            "start": f"{date}T{time}:00",
+            "responses": {
+                "name": name,
+                "email": email,
+                "phone": phone or "",
+                "notes": "Booked via Truvo AI Assistant"
+            },
+            "timeZone": Config.BUSINESS_TIMEZONE,
+            "language": "en",
+            "metadata": {"source": "truvo-voice-agent", "idempotency_key": key}
+        }
+
+        # Recorded durably and submitted by the worker; a repeated call is a no-op
+        await with_tool_filler(context, "book_tour", booking_queue.enqueue("cal_com", key, booking_data))
+        # Fetch the day again on the next lookup rather than offer the slot just taken
+        availability_cache.invalidate(Config.CAL_EVENT_TYPE_ID, date)
+        return f"Excellent! I've booked your property tour for {date} at {time}. A confirmation email will be sent to {email}. Is there anything else I can help you with?"
     except Exception as e:
-        return "I'm having trouble completing the booking right now. Would you like me to try again, or would you prefer to call back later?"
+        logger.error(f"Failed to queue tour booking: {e}")
+    return "I'm having trouble completing the booking right now. Would you like me to try again?"
@@ -0,0 +1,52 @@
+import asyncio
+import re
+from typing import Awaitable, TypeVar
+
+from livekit.agents import RunContext
+
+from config import Config
+from phrase_cache import phrase_cache
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+")
+
+T = TypeVar("T")
+
+
+async def with_tool_filler(context: RunContext, tool: str, aw: Awaitable[T]) -> T:
+    """Await a tool's slow call as a timed span, playing a cached filler phrase if it runs long."""
+    agent = context.session.current_agent
+    call_metrics = getattr(agent, "call_metrics", None)  # Only TruvoAgent times its tools
+    if call_metrics is None:
+        return await aw
+
+    with call_metrics.tool_span(tool):
+        task = asyncio.ensure_future(aw)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=Config.TOOL_FILLER_DELAY)
+            if not done:
+                clip = phrase_cache.filler(agent.voice_id, tool)
+                if clip is not None:
+                    agent.record_phrase("filler_hits", clip)
+                    context.session.say(clip.text, audio=clip.frames(), add_to_chat_ctx=False)
+            return await task
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+
+
+def booking_problem(date: str | None, time: str | None, email: str) -> str | None:
+    """Check a booking request before it is queued; returns what to ask the caller, or None."""
+    from datetime import datetime
+    from zoneinfo import ZoneInfo
+
+    if not EMAIL_RE.fullmatch(email.strip()):
+        return "That email address doesn't look quite right. Could you spell it out for me?"
+    if date is not None and time is not None:
+        try:
+            start = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
+        except ValueError:
+            return "I didn't catch the date and time. Which day and time would you like?"
+        # Bookings are made in the office's timezone, not the worker's
+        if start < datetime.now(ZoneInfo(Config.BUSINESS_TIMEZONE)).replace(tzinfo=None):
+            return "That time has already passed. Which upcoming day and time would work for you?"
+    return None
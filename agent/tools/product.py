@@ -0,0 +1,17 @@
+from livekit.agents import RunContext, function_tool
+
+from config import Config
+from knowledge import knowledge_index
+
+
+@function_tool
+async def lookup_product_info(context: RunContext, query: str) -> str:
+    """Look up facts about Truvo: features, integrations, industries served and contact details. Use this whenever the caller asks what Truvo does or supports, instead of guessing.
+
+    Args:
+        query: What the caller wants to know, in a few keywords (e.g. "Yardi integration")
+    """
+    results = knowledge_index.search(query, k=Config.KNOWLEDGE_TOP_K)
+    if not results:
+        return "I couldn't find that in our product info. Offer to have the team follow up, or to book a demo."
+    return "\n".join(f"- {snippet.text}" for _, snippet in results)
@@ -0,0 +1,420 @@
+import asyncio
+import atexit
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from livekit.agents import llm
+from livekit.agents.inference_runner import _InferenceRunner
+from livekit.plugins.turn_detector.base import MAX_HISTORY_TOKENS, MAX_HISTORY_TURNS, _EUORunnerBase
+from livekit.plugins.turn_detector.multilingual import MultilingualModel, _EUORunnerMultilingual
+
+from turn_metrics import percentile
+
+logger = logging.getLogger("truvo-agent")
+
+SERVICE_ENTRY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "turn_service.py")
+
+PredictBatch = Callable[[list[list[dict]]], list[float]]
+
+
+class ServiceOverloaded(Exception):
+    """The turn-detection queue is full; the caller should fall back."""
+
+
+class EOUBatcher:
+    """Gathers end-of-utterance requests into micro-batches run on a thread pool.
+
+    When nothing is running, a request goes straight to a thread. While a
+    batch is in flight, the next one closes when it reaches max_batch or when
+    its oldest request has waited max_delay, so batching never adds more than
+    max_delay to a decision. While every thread is busy, new requests pile up
+    and the next batch is simply larger. Past max_queue waiting requests, new ones are refused
+    instead of queueing behind work that would make them late anyway.
+    """
+
+    def __init__(
+        self,
+        predict_batch: PredictBatch,
+        max_batch: int = 16,
+        max_delay: float = 0.005,
+        threads: int = 1,
+        max_queue: int = 256,
+    ) -> None:
+        self._predict_batch = predict_batch
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._max_queue = max_queue
+        self._threads = threads
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="eou")
+        self._queue: Optional[asyncio.Queue] = None
+        self._free: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = 0
+        self._counters = {"requests": 0, "batches": 0, "rejected": 0, "errors": 0}
+        self._queue_ms: deque = deque(maxlen=2000)
+        self._infer_ms: deque = deque(maxlen=2000)
+        self._batch_sizes: deque = deque(maxlen=2000)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._free = asyncio.Semaphore(self._threads)
+            self._task = asyncio.create_task(self._run())
+
+    async def predict(self, messages: list[dict]) -> float:
+        self.start()
+        if self._queue.qsize() >= self._max_queue:
+            self._counters["rejected"] += 1
+            raise ServiceOverloaded(f"{self._queue.qsize()} turn-detection requests queued")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((messages, future, time.perf_counter()))
+        self._counters["requests"] += 1
+        return await future
+
+    def stats(self) -> dict:
+        def pct(values: deque) -> dict:
+            return {f"p{p}": round(percentile(list(values), p), 2) for p in (50, 95)} if values else {}
+
+        return {
+            **self._counters,
+            "avg_batch": round(sum(self._batch_sizes) / len(self._batch_sizes), 2) if self._batch_sizes else 0.0,
+            "queue_ms": pct(self._queue_ms),
+            "infer_ms": pct(self._infer_ms),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            first = await self._queue.get()
+            await self._free.acquire()  # Wait for a thread; requests keep queueing meanwhile
+            batch = [first]
+            # Idle: run now rather than wait for company. Busy: let a batch form.
+            deadline = first[2] + self._max_delay if self._running else 0.0
+            while len(batch) < self._max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            self._running += 1
+            asyncio.create_task(self._execute(batch))
+
+    async def _execute(self, batch: list) -> None:
+        started = time.perf_counter()
+        try:
+            probabilities = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._predict_batch, [messages for messages, _, _ in batch]
+            )
+        except Exception as e:
+            self._counters["errors"] += 1
+            logger.warning(f"Turn-detection batch of {len(batch)} failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._running -= 1
+            self._free.release()
+
+        self._counters["batches"] += 1
+        self._batch_sizes.append(len(batch))
+        self._infer_ms.append((time.perf_counter() - started) * 1000)
+        for (_, future, enqueued), probability in zip(batch, probabilities):
+            self._queue_ms.append((started - enqueued) * 1000)
+            if not future.done():
+                future.set_result(probability)
+
+
+class OnnxEOUModel:
+    """The turn-detector plugin's multilingual ONNX model, run on batches.
+
+    Loaded once in the turn-detection process. Contexts in a batch are
+    tokenized, grouped by token length and each group runs as one ONNX call.
+    The model takes no attention mask, so only equal-length inputs can share a
+    call without padding changing the result.
+    """
+
+    def __init__(self) -> None:
+        self._runner = None
+        self._batched = True
+
+    def load(self) -> None:
+        self._runner = _EUORunnerMultilingual()
+        self._runner.initialize()
+
+    def __call__(self, contexts: list[list[dict]]) -> list[float]:
+        import numpy as np
+
+        ids = []
+        for messages in contexts:
+            text = self._runner._format_chat_ctx([dict(m) for m in messages])  # It edits messages in place
+            tokens = self._runner._tokenizer(
+                text, add_special_tokens=False, return_tensors="np", max_length=MAX_HISTORY_TOKENS, truncation=True
+            )
+            ids.append(tokens["input_ids"][0].astype("int64"))
+
+        probabilities = [0.0] * len(ids)
+        groups: dict[int, list[int]] = {}
+        for i, row in enumerate(ids):
+            groups.setdefault(len(row), []).append(i)
+        for indices in groups.values():
+            if self._batched and len(indices) > 1:
+                try:
+                    outputs = self._runner._session.run(None, {"input_ids": np.stack([ids[i] for i in indices])})
+                    for row, i in enumerate(indices):
+                        probabilities[i] = float(outputs[0][row].flatten()[-1])
+                    continue
+                except Exception as e:
+                    self._batched = False  # Model exported with a fixed batch size of 1
+                    logger.warning(f"Batched turn-detector inference unsupported, running singly: {e}")
+            for i in indices:
+                outputs = self._runner._session.run(None, {"input_ids": ids[i][None, :]})
+                probabilities[i] = float(outputs[0].flatten()[-1])
+        return probabilities
+
+
+def load_livekit_model() -> PredictBatch:
+    model = OnnxEOUModel()
+    model.load()
+    return model
+
+
+async def _serve(socket_path: str, batcher: EOUBatcher, parent_pid: Optional[int] = None) -> None:
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        async def answer(request: dict) -> None:
+            response = {"id": request.get("id")}
+            try:
+                if request.get("op") == "stats":
+                    response["stats"] = batcher.stats()
+                else:
+                    response["p"] = await batcher.predict(request["chat_ctx"])
+            except Exception as e:
+                response["error"] = str(e) or type(e).__name__
+            writer.write(json.dumps(response).encode() + b"\n")
+
+        try:
+            while line := await reader.readline():
+                asyncio.create_task(answer(json.loads(line)))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)  # Left by an earlier worker
+    server = await asyncio.start_unix_server(handle, path=socket_path, limit=1 << 20)
+    batcher.start()
+    logger.info(f"Turn-detection service listening on {socket_path}")
+    async with server:
+        if parent_pid is None:
+            await server.serve_forever()
+        while os.getppid() == parent_pid:  # Also covers a worker that was killed outright
+            await asyncio.sleep(1.0)
+        logger.info("Worker exited, stopping the turn-detection service")
+
+
+def serve(socket_path: str, model_factory: Callable[[], PredictBatch], max_batch: int, max_delay: float,
+          threads: int, max_queue: int, parent_pid: Optional[int] = None) -> None:
+    """Service entry point: load the model once, then answer every job on this worker."""
+    logging.basicConfig(level=logging.INFO)
+    try:
+        predict_batch = model_factory()
+    except Exception as e:
+        logger.error(f"Turn-detection service could not load its model, jobs will fall back: {e}")
+        return
+    batcher = EOUBatcher(predict_batch, max_batch=max_batch, max_delay=max_delay, threads=threads,
+                         max_queue=max_queue)
+    asyncio.run(_serve(socket_path, batcher, parent_pid))
+
+
+def start_service(
+    socket_path: str,
+    model: str = "turn_detection:load_livekit_model",
+    max_batch: int = 16,
+    max_delay: float = 0.005,
+    threads: int = 1,
+    max_queue: int = 256,
+) -> subprocess.Popen:
+    """Start the per-worker turn-detection process. It exits with the worker.
+
+    The service runs turn_service.py in a fresh interpreter rather than as a
+    multiprocessing child, which would import the worker's main module (agent.py)
+    again. model is the "module:function" that loads the model in the service.
+    """
+    proc = subprocess.Popen(
+        [
+            sys.executable, SERVICE_ENTRY,
+            "--socket", socket_path,
+            "--model", model,
+            "--max-batch", str(max_batch),
+            "--max-delay", str(max_delay),
+            "--threads", str(threads),
+            "--max-queue", str(max_queue),
+            "--parent-pid", str(os.getpid()),
+        ],
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(path for path in sys.path if path)},
+    )
+    atexit.register(_stop_service, proc)
+    return proc
+
+
+def _stop_service(proc: subprocess.Popen) -> None:
+    if proc.poll() is None:
+        proc.terminate()
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def disable_plugin_inference() -> None:
+    """Keep LiveKit from loading the turn-detector model in its own inference process.
+
+    The plugin registers its English and multilingual runners on import, and
+    the worker starts an inference process while any runner is registered.
+    Call before the worker starts, while the service answers for the plugin.
+    """
+    runners = _InferenceRunner.registered_runners
+    for method, runner in list(runners.items()):
+        if issubclass(runner, _EUORunnerBase):
+            del runners[method]
+
+
+class TurnDetectionClient:
+    """One job process's connection to the turn-detection service, shared by its sessions."""
+
+    def __init__(self, socket_path: str) -> None:
+        self._socket_path = socket_path
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: dict[int, asyncio.Future] = {}
+        self._next_id = 0
+        self._connect_lock: Optional[asyncio.Lock] = None
+        self._latency_ms: deque = deque(maxlen=2000)
+        # fallback_*: turns decided without the service, by local inference or the endpointing delay alone
+        self._counters = {"requests": 0, "failures": 0, "fallback_local": 0, "fallback_endpointing": 0}
+
+    async def predict(self, messages: list[dict], timeout: Optional[float] = 3.0) -> float:
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(self._request({"chat_ctx": messages}), timeout)
+        except Exception:
+            self._counters["failures"] += 1
+            raise
+        self._counters["requests"] += 1
+        self._latency_ms.append((time.perf_counter() - started) * 1000)
+        return response["p"]
+
+    def record_fallback(self, kind: str) -> None:
+        self._counters[f"fallback_{kind}"] += 1
+
+    async def service_stats(self) -> dict:
+        return (await self._request({"op": "stats"}))["stats"]
+
+    def stats(self) -> dict:
+        latency = list(self._latency_ms)
+        return {
+            **self._counters,
+            "latency_ms": {f"p{p}": round(percentile(latency, p), 2) for p in (50, 95)} if latency else {},
+        }
+
+    async def aclose(self) -> None:
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = self._reader_task = None
+
+    async def _request(self, body: dict) -> dict:
+        await self._connect()
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            self._writer.write(json.dumps({"id": request_id, **body}).encode() + b"\n")
+            response = await future
+        finally:
+            self._pending.pop(request_id, None)
+        if "error" in response:
+            raise ServiceOverloaded(response["error"])
+        return response
+
+    def _connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing() and self._loop is asyncio.get_running_loop()
+
+    async def _connect(self) -> None:
+        if self._connected():
+            return
+        if self._connect_lock is None or self._loop is not asyncio.get_running_loop():
+            self._loop = asyncio.get_running_loop()  # A connection can't outlive the job's event loop
+            self._connect_lock = asyncio.Lock()
+            self._writer = None
+        async with self._connect_lock:
+            if self._connected():
+                return
+            reader, self._writer = await asyncio.open_unix_connection(self._socket_path, limit=1 << 20)
+            self._reader_task = asyncio.create_task(self._read(reader))
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while line := await reader.readline():
+                response = json.loads(line)
+                future = self._pending.get(response.get("id"))
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            error = ConnectionError("Turn-detection service connection closed")
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            if self._writer is not None:
+                self._writer.close()
+
+
+def eou_messages(chat_ctx: llm.ChatContext) -> list[dict]:
+    """The recent user/assistant turns the turn detector looks at."""
+    messages = [
+        {"role": msg.role, "content": msg.text_content}
+        for msg in chat_ctx.messages()
+        if msg.role in ("user", "assistant") and msg.text_content
+    ]
+    return messages[-MAX_HISTORY_TURNS:]
+
+
+class SharedTurnDetector(MultilingualModel):
+    """A MultilingualModel whose inference goes to the shared service.
+
+    Language thresholds still come from the plugin. If the service is down or
+    overloaded, the decision falls back to the plugin's own inference process,
+    or, when the worker runs without one, to the endpointing delay alone.
+    """
+
+    def __init__(self, client: TurnDetectionClient, *, unlikely_threshold: Optional[float] = None) -> None:
+        super().__init__(unlikely_threshold=unlikely_threshold)
+        self._client = client
+
+    async def predict_end_of_turn(self, chat_ctx: llm.ChatContext, *, timeout: Optional[float] = 3) -> float:
+        try:
+            return await self._client.predict(eou_messages(chat_ctx), timeout=timeout)
+        except (OSError, ServiceOverloaded) as e:  # A timeout already spent the budget; don't retry locally
+            if self._executor is None:
+                self._client.record_fallback("endpointing")
+                logger.warning(f"Turn-detection service unavailable ({e!r}); ending the turn on the endpointing delay")
+                return 1.0  # Same as the plugin's answer when it has no prediction
+            self._client.record_fallback("local")
+            logger.warning(f"Turn-detection service unavailable ({e!r}); using local inference")
+            return await super().predict_end_of_turn(chat_ctx, timeout=timeout)
@@ -0,0 +1,396 @@
+import asyncio
+import atexit
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+import psutil
+from livekit.agents import AgentSession, metrics
+
+logger = logging.getLogger("truvo-agent")
+
+# Voice pipeline latencies are tens of ms to a few seconds
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus text-format sense."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float) -> None:
+        self._counts[bisect.bisect_left(self._buckets, value)] += 1
+        self._sum += value
+        self._count += 1
+
+    def snapshot(self) -> dict:
+        return {"counts": list(self._counts), "sum": self._sum, "count": self._count}
+
+    def merge(self, snapshot: dict) -> None:
+        for i, count in enumerate(snapshot["counts"]):
+            self._counts[i] += count
+        self._sum += snapshot["sum"]
+        self._count += snapshot["count"]
+
+    def render(self, name: str, labels: dict[str, str]) -> list[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip([*self._buckets, "+Inf"], self._counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': str(bound)})} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {self._sum}")
+        lines.append(f"{name}_count{_labels(labels)} {self._count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Per-process histograms plus gauge collectors, rendered as Prometheus text."""
+
+    def __init__(self) -> None:
+        self._histograms: dict[tuple[str, tuple], Histogram] = {}
+        self._help: dict[str, str] = {}
+        self._collectors: list[tuple[str, Callable[[], dict]]] = []
+
+    def observe(self, name: str, value: float, help: str = "", **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = Histogram()
+            self._help.setdefault(name, help)
+        histogram.observe(value)
+
+    def add_collector(self, prefix: str, collect: Callable[[], dict]) -> None:
+        """Export a subsystem's numeric stats() as gauges named {prefix}_{key}."""
+        self._collectors.append((prefix, collect))
+
+    def snapshot(self) -> dict:
+        """Histograms and collected gauges as JSON-serializable data, for merge() elsewhere."""
+        return {
+            "histograms": [
+                {"name": name, "labels": dict(labels), "help": self._help.get(name, ""), **histogram.snapshot()}
+                for (name, labels), histogram in self._histograms.items()
+            ],
+            "gauges": {prefix: values for prefix, values in _collect(self._collectors)},
+        }
+
+    def merge_histograms(self, snapshot: dict) -> None:
+        """Add another registry's histogram counts to this one."""
+        for entry in snapshot.get("histograms", []):
+            key = (entry["name"], tuple(sorted(entry["labels"].items())))
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+                self._help.setdefault(entry["name"], entry["help"])
+            histogram.merge(entry)
+
+    def render(self) -> str:
+        lines = []
+        seen = set()
+        for (name, labels), histogram in sorted(self._histograms.items()):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {self._help.get(name, '')}")
+                lines.append(f"# TYPE {name} histogram")
+            lines.extend(histogram.render(name, dict(labels)))
+
+        for prefix, values in _collect(self._collectors):
+            lines.extend(_gauges(prefix, values, {}))
+        return "\n".join(lines) + "\n"
+
+
+def _collect(collectors: list[tuple[str, Callable[[], dict]]]) -> list[tuple[str, dict]]:
+    collected = []
+    for prefix, collect in collectors:
+        try:
+            collected.append((prefix, _numeric(collect())))
+        except Exception as e:
+            logger.warning(f"Metrics collector {prefix} failed: {e}")
+    return collected
+
+
+def _numeric(values: dict) -> dict:
+    """The int/float leaves of a stats() dict, nesting kept."""
+    numeric = {}
+    for key, value in values.items():
+        if isinstance(value, dict):
+            numeric[str(key)] = _numeric(value)
+        elif isinstance(value, (int, float)):
+            numeric[str(key)] = value
+    return numeric
+
+
+def _merge_gauges(into: dict, values: dict) -> None:
+    """Combine one process's gauges into another's: summed, except rates, percentiles and limits."""
+    for key, value in values.items():
+        if isinstance(value, dict):
+            _merge_gauges(into.setdefault(key, {}), value)
+        elif key not in into:
+            into[key] = value
+        elif "rate" in key or key.startswith("max_") or key.endswith("_ms") or key == "load":
+            into[key] = max(into[key], value)
+        else:
+            into[key] += value
+
+
+def _gauges(prefix: str, values: dict, labels: dict[str, str]) -> list[str]:
+    lines = []
+    for key, value in values.items():
+        if isinstance(value, dict):
+            # Nested stats (e.g. per host) become a label on the same metric family
+            lines.extend(_gauges(prefix, value, {**labels, "key": str(key)}))
+        elif isinstance(value, (int, float)):
+            lines.append(f"{prefix}_{key}{_labels(labels)} {float(value)}")
+    return lines
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class CallMetrics:
+    """Per-call turn timings, fed from AgentSession events.
+
+    Measured from the end of the caller's speech: transcription_delay (final
+    transcript), end_of_utterance_delay (endpoint decision) and
+    response_latency (agent audio starts). llm_ttft and tts_ttfb are the
+    durations of the individual LLM and TTS requests, from request to first
+    token or audio byte. Tool calls are recorded as spans via tool_span().
+    """
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self._registry = registry
+        self._stages: dict[str, list[float]] = {}
+        self._user_stopped_at: Optional[float] = None
+
+    def attach(self, session: AgentSession) -> None:
+        session.on("metrics_collected", self._on_metrics)
+        session.on("user_state_changed", self._on_user_state)
+        session.on("agent_state_changed", self._on_agent_state)
+
+    def record(self, stage: str, seconds: float) -> None:
+        self._stages.setdefault(stage, []).append(seconds)
+        self._registry.observe(
+            "truvo_turn_stage_seconds", seconds, "Voice pipeline latency per turn stage", stage=stage
+        )
+
+    @contextmanager
+    def tool_span(self, tool: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._stages.setdefault(f"tool:{tool}", []).append(elapsed)
+            self._registry.observe(
+                "truvo_tool_call_seconds", elapsed, "Function tool call duration", tool=tool
+            )
+
+    def summary(self) -> dict:
+        """p50/p95 per stage for this call, in milliseconds."""
+        return {
+            stage: {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 50) * 1000),
+                "p95_ms": round(percentile(values, 95) * 1000),
+            }
+            for stage, values in self._stages.items()
+            if values
+        }
+
+    def _on_metrics(self, ev) -> None:
+        m = ev.metrics
+        if isinstance(m, metrics.EOUMetrics):
+            self.record("transcription_delay", m.transcription_delay)
+            self.record("end_of_utterance_delay", m.end_of_utterance_delay)
+        elif isinstance(m, metrics.LLMMetrics) and m.ttft >= 0:
+            self.record("llm_ttft", m.ttft)
+        elif isinstance(m, metrics.TTSMetrics) and m.ttfb >= 0:
+            self.record("tts_ttfb", m.ttfb)
+
+    def _on_user_state(self, ev) -> None:
+        if ev.old_state == "speaking" and ev.new_state == "listening":
+            self._user_stopped_at = ev.created_at
+
+    def _on_agent_state(self, ev) -> None:
+        if ev.new_state == "speaking" and self._user_stopped_at is not None:
+            self.record("response_latency", ev.created_at - self._user_stopped_at)
+            self._user_stopped_at = None
+
+
+class MetricsPublisher:
+    """Writes this job process's registry to state_dir for the worker to serve.
+
+    Jobs run in single-use processes whose histograms die with them, so each
+    publishes a snapshot to {pid}.json every interval seconds and when its call
+    ends. The worker's MetricsAggregator folds them into one set of metrics.
+    """
+
+    def __init__(self, registry: MetricsRegistry, state_dir: str, interval: float = 5.0) -> None:
+        self._registry = registry
+        self._state_dir = state_dir
+        self._interval = interval
+        self._path = ""
+        self._started_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start publishing (needs a running loop). Safe to call once per job."""
+        if self._task is not None and not self._task.done():
+            return
+        os.makedirs(self._state_dir, exist_ok=True)
+        self._path = os.path.join(self._state_dir, f"{os.getpid()}.json")
+        self._started_at = psutil.Process().create_time()
+        atexit.register(self.publish)
+        self._task = asyncio.create_task(self._run())
+
+    def publish(self) -> None:
+        if not self._path:
+            return
+        state = {"pid": os.getpid(), "started_at": self._started_at, **self._registry.snapshot()}
+        tmp_path = f"{self._path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self._path)  # Readers never see a half-written file
+        except OSError as e:
+            logger.warning(f"Failed to publish metrics: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            self.publish()
+
+
+class MetricsAggregator:
+    """Worker-side metrics: every job process's histograms and gauges in one place.
+
+    Reads the snapshots MetricsPublisher leaves in state_dir. Histograms are
+    cumulative since the worker started: when a job process has exited its
+    last snapshot is folded into the totals and its file removed. Gauges cover
+    the live job processes, summed (the max for rates, percentiles and limits),
+    plus the worker's own collectors.
+    """
+
+    def __init__(self, state_dir: str) -> None:
+        self._state_dir = state_dir
+        self._finished = MetricsRegistry()
+        self._collectors: list[tuple[str, Callable[[], dict]]] = []
+        self._lock = threading.Lock()
+        # Snapshots left by an earlier worker aren't this worker's totals
+        for path, _ in self._read_states():
+            _remove(path)
+
+    def add_collector(self, prefix: str, collect: Callable[[], dict]) -> None:
+        self._collectors.append((prefix, collect))
+
+    def render(self) -> str:
+        with self._lock:
+            merged = MetricsRegistry()
+            merged.merge_histograms(self._finished.snapshot())
+            gauges: dict = {}
+            for path, state in self._read_states():
+                if _alive(state):
+                    merged.merge_histograms(state)
+                    _merge_gauges(gauges, state.get("gauges", {}))
+                else:
+                    self._finished.merge_histograms(state)
+                    merged.merge_histograms(state)
+                    _remove(path)
+        # The worker's own stats may share a prefix with the jobs' (e.g. the booking queue)
+        for prefix, values in _collect(self._collectors):
+            _merge_gauges(gauges.setdefault(prefix, {}), values)
+        for prefix, values in gauges.items():
+            merged.add_collector(prefix, lambda values=values: values)
+        return merged.render()
+
+    def _read_states(self) -> list[tuple[str, dict]]:
+        states = []
+        try:
+            names = [name for name in os.listdir(self._state_dir) if name.endswith(".json")]
+        except FileNotFoundError:
+            return states
+        for name in names:
+            path = os.path.join(self._state_dir, name)
+            try:
+                with open(path) as f:
+                    states.append((path, json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return states
+
+
+def _alive(state: dict) -> bool:
+    # A recycled pid belongs to a different process, so compare start times too
+    try:
+        return abs(psutil.Process(state["pid"]).create_time() - state["started_at"]) < 1.0
+    except (psutil.Error, KeyError):
+        return False
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class MetricsServer:
+    """Serves a registry (or the worker's MetricsAggregator) at /metrics from a daemon thread."""
+
+    def __init__(self, registry, host: str, port: int) -> None:
+        self._registry = registry
+        self._host = host
+        self._port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> None:
+        if self._server is not None or not self._port:
+            return
+
+        registry = self._registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer((self._host, self._port), Handler)
+        except OSError as e:
+            logger.warning(f"Can't serve metrics on port {self._port}: {e}")
+            return
+
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"Serving metrics on http://{self._host}:{self._server.server_port}/metrics")
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,33 @@
+"""Entry point of the per-worker turn-detection service.
+
+turn_detection.start_service() runs this file in its own interpreter, so the
+service imports the detector and nothing else: no agent.py, none of its
+module-level caches and queues.
+
+    python turn_service.py --socket /tmp/truvo-turn.sock --parent-pid <worker pid>
+"""
+
+import argparse
+import importlib
+
+from turn_detection import serve
+
+
+def load_factory(spec: str):
+    """Resolve "module:function" to the function that loads the model."""
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--model", default="turn_detection:load_livekit_model")
+    parser.add_argument("--max-batch", type=int, default=16)
+    parser.add_argument("--max-delay", type=float, default=0.005)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--max-queue", type=int, default=256)
+    parser.add_argument("--parent-pid", type=int, help="Exit when this process (the worker) does")
+    args = parser.parse_args()
+    serve(args.socket, load_factory(args.model), args.max_batch, args.max_delay, args.threads, args.max_queue,
+          args.parent_pid)
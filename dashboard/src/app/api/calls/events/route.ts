@@ -0,0 +1,62 @@
+import { NextRequest, NextResponse } from "next/server";
+import { createAdminClient } from "@/lib/supabase/admin";
+import type { TranscriptEntry } from "@/types/database";
+
+interface CallEventEntry {
+  seq: number;
+  kind: "transcript" | "tool" | "timing";
+  timestamp: string;
+  [key: string]: unknown;
+}
+
+// POST /api/calls/events - Append a batch of worker-recorded transcript lines and call events
+// Called by the Python agent's call log writer; safe to retry
+export async function POST(request: NextRequest) {
+  try {
+    const body = await request.json();
+    const { room_name, entries } = body as {
+      room_name?: string;
+      entries?: CallEventEntry[];
+    };
+
+    if (!room_name || !Array.isArray(entries)) {
+      return NextResponse.json(
+        { error: "room_name and entries are required" },
+        { status: 400 }
+      );
+    }
+
+    const transcript: TranscriptEntry[] = entries
+      .filter((entry) => entry.kind === "transcript")
+      .map((entry) => ({
+        seq: entry.seq,
+        role: entry.role as TranscriptEntry["role"],
+        text: String(entry.text ?? ""),
+        timestamp: entry.timestamp,
+      }));
+    const events = entries.filter((entry) => entry.kind !== "transcript");
+
+    // Appended in the database (merge_by_seq, under a row lock) so concurrent
+    // batches for one call can't overwrite each other's lines
+    const supabase = createAdminClient();
+    const { data: callId, error } = await supabase.rpc("append_call_events", {
+      p_room_name: room_name,
+      p_transcript: transcript,
+      p_events: events,
+    });
+
+    if (error) {
+      return NextResponse.json({ error: error.message }, { status: 500 });
+    }
+    if (!callId) {
+      return NextResponse.json({ error: "Call not found" }, { status: 404 });
+    }
+
+    return NextResponse.json({ received: entries.length });
+  } catch (error) {
+    return NextResponse.json(
+      { error: "Failed to record call events" },
+      { status: 500 }
+    );
+  }
+}
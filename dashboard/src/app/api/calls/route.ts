@@ -71,3 +71,43 @@ export async function POST(request: NextRequest) {
     );
   }
 }
+
+// PATCH /api/calls - Merge worker-reported metadata into the latest call for a room
+// Called by the Python agent at the end of a call (e.g. per-call latency summary, recording URL)
+export async function PATCH(request: NextRequest) {
+  try {
+    const body = await request.json();
+    const { room_name, metadata, recording_url } = body;
+
+    if (!room_name || !metadata) {
+      return NextResponse.json(
+        { error: "room_name and metadata are required" },
+        { status: 400 }
+      );
+    }
+
+    // Merged in the database so it can't clobber events appended concurrently
+    const supabase = createAdminClient();
+    const { data, error } = await supabase
+      .rpc("merge_call_metadata", {
+        p_room_name: room_name,
+        p_metadata: metadata,
+        p_recording_url: recording_url || null,
+      })
+      .maybeSingle();
+
+    if (error) {
+      return NextResponse.json({ error: error.message }, { status: 500 });
+    }
+    if (!data) {
+      return NextResponse.json({ error: "Call not found" }, { status: 404 });
+    }
+
+    return NextResponse.json(data as Call);
+  } catch (error) {
+    return NextResponse.json(
+      { error: "Failed to update call" },
+      { status: 500 }
+    );
+  }
+}
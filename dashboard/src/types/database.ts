@@ -22,6 +22,7 @@ export interface Call {
 }
 
 export interface TranscriptEntry {
+  seq?: number; // Per-call order, set by the voice agent
   role: "user" | "agent";
   text: string;
   timestamp: string;
@@ -49,6 +49,69 @@ CREATE TRIGGER update_agents_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
+-- Merge two JSONB arrays of call entries by "seq": drops entries already
+-- present (retried batches) and keeps the result in seq order
+CREATE OR REPLACE FUNCTION merge_by_seq(existing JSONB, incoming JSONB)
+RETURNS JSONB AS $$
+    SELECT COALESCE(jsonb_agg(entry ORDER BY (entry->>'seq')::BIGINT NULLS FIRST), '[]'::JSONB)
+    FROM (
+        SELECT entry FROM jsonb_array_elements(COALESCE(existing, '[]'::JSONB)) AS entry
+        UNION ALL
+        SELECT DISTINCT ON (entry->'seq') entry
+        FROM jsonb_array_elements(COALESCE(incoming, '[]'::JSONB)) AS entry
+        WHERE NOT EXISTS (
+            SELECT 1 FROM jsonb_array_elements(COALESCE(existing, '[]'::JSONB)) AS old
+            WHERE old->'seq' = entry->'seq'
+        )
+    ) merged;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Append worker-recorded transcript lines and events to the latest call for a room.
+-- The row is locked, so concurrent batches for one call apply one after another
+-- instead of overwriting each other. Returns the call id, or NULL if there is none.
+CREATE OR REPLACE FUNCTION append_call_events(p_room_name TEXT, p_transcript JSONB, p_events JSONB)
+RETURNS UUID AS $$
+DECLARE
+    call_id UUID;
+BEGIN
+    SELECT id INTO call_id FROM calls
+    WHERE room_name = p_room_name
+    ORDER BY started_at DESC
+    LIMIT 1
+    FOR UPDATE;
+
+    IF call_id IS NULL THEN
+        RETURN NULL;
+    END IF;
+
+    UPDATE calls
+    SET transcript = merge_by_seq(transcript, p_transcript),
+        metadata = jsonb_set(
+            COALESCE(metadata, '{}'::JSONB),
+            '{events}',
+            merge_by_seq(metadata->'events', p_events)
+        )
+    WHERE id = call_id;
+    RETURN call_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Merge worker-reported metadata into the latest call for a room, in one statement
+CREATE OR REPLACE FUNCTION merge_call_metadata(p_room_name TEXT, p_metadata JSONB, p_recording_url TEXT)
+RETURNS SETOF calls AS $$
+    UPDATE calls
+    SET metadata = COALESCE(metadata, '{}'::JSONB) || p_metadata,
+        recording_url = COALESCE(p_recording_url, recording_url)
+    WHERE id = (
+        SELECT id FROM calls
+        WHERE room_name = p_room_name
+        ORDER BY started_at DESC
+        LIMIT 1
+        FOR UPDATE
+    )
+    RETURNING *;
+$$ LANGUAGE sql;
+
 -- Row Level Security (RLS) policies
 -- For a single-tenant MVP, we'll allow all authenticated operations
 -- Add tenant isolation later when moving to multi-tenant